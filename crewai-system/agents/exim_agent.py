@@ -1,8 +1,9 @@
 """
 EXIM Agent for trade data analysis
 """
-import os
-from pymongo import MongoClient
+from db.connection import get_mongo_client
+from telemetry.timing import timed
+from telemetry.metrics import mock_fallback
 from dotenv import load_dotenv
 import random
 from datetime import datetime, timedelta
@@ -11,13 +12,6 @@ import re
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
-
 def extract_medical_condition(query):
     """
     Extract medical condition from user query
@@ -67,6 +61,7 @@ def extract_medical_condition(query):
     # Default fallback
     return "medical condition"
 
+@timed("agent.exim")
 def get_trade_by_hs(hs_code, year_from=None, year_to=None, top_n=10, database_name="pharma_hub"):
     """
     Get trade partners and volumes for HS codes
@@ -117,9 +112,61 @@ def get_trade_by_hs(hs_code, year_from=None, year_to=None, top_n=10, database_na
         print(f"Error in EXIM agent: {str(e)}")
         # Return mock data as fallback
         return get_mock_trade_data(hs_code, top_n)
-    finally:
-        if 'client' in locals():
-            client.close()
+
+@timed("agent.exim")
+def get_trade_by_hs_batch(hs_codes, year_from=None, year_to=None, top_n=10, database_name="pharma_hub"):
+    """
+    Get top trade partners for several HS codes with a single aggregation
+
+    Args:
+        hs_codes (list): HS codes for the products
+        year_from (int): Starting year for filtering
+        year_to (int): Ending year for filtering
+        top_n (int): Number of top partners per HS code
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        dict: HS code -> list of trade partners with values (same shape as get_trade_by_hs)
+    """
+    hs_codes = [str(code) for code in hs_codes]
+    try:
+        client = get_mongo_client()
+        db = client[database_name]
+
+        # Check if we have data in the database
+        count = db["comtrade"].count_documents({})
+        if count == 0:
+            print("No EXIM data found in database, returning mock data")
+            return {code: get_mock_trade_data(code, top_n) for code in hs_codes}
+
+        # Build query
+        query = {"hs_code": {"$in": hs_codes}}
+        if year_from or year_to:
+            query["year"] = {}
+            if year_from:
+                query["year"]["$gte"] = int(year_from)
+            if year_to:
+                query["year"]["$lte"] = int(year_to)
+
+        # Total per (HS code, partner), then keep the top partners of each HS code
+        pipeline = [
+            {"$match": query},
+            {"$group": {"_id": {"hs_code": "$hs_code", "partner": "$partner"}, "total": {"$sum": "$value"}}},
+            {"$sort": {"_id.hs_code": 1, "total": -1}},
+            {"$group": {"_id": "$_id.hs_code", "partners": {"$push": {"partner": "$_id.partner", "value": "$total"}}}},
+            {"$project": {"partners": {"$slice": ["$partners", top_n]}}}
+        ]
+
+        result = {code: [] for code in hs_codes}
+        for r in db["comtrade"].aggregate(pipeline):
+            result[str(r["_id"])] = r["partners"]
+
+        return result
+
+    except Exception as e:
+        print(f"Error in EXIM agent batch: {str(e)}")
+        # Return mock data as fallback
+        return {code: get_mock_trade_data(code, top_n) for code in hs_codes}
 
 def get_trade_trends(hs_code, country=None, database_name="pharma_hub"):
     """
@@ -164,10 +211,8 @@ def get_trade_trends(hs_code, country=None, database_name="pharma_hub"):
         print(f"Error in EXIM agent trend analysis: {str(e)}")
         # Return mock data as fallback
         return get_mock_trade_trends(hs_code)
-    finally:
-        if 'client' in locals():
-            client.close()
 
+@mock_fallback("exim")
 def get_mock_trade_data(hs_code, top_n=10):
     """
     Generate mock trade data for testing
@@ -226,6 +271,7 @@ def get_mock_trade_data(hs_code, top_n=10):
     
     return mock_data
 
+@mock_fallback("exim")
 def get_mock_trade_trends(hs_code):
     """
     Generate mock trade trends for testing
@@ -276,4 +322,5 @@ def get_mock_trade_trends(hs_code):
 
 # Example usage:
 # partners = get_trade_by_hs("3004", year_from=2020, top_n=5)
-# trends = get_trade_trends("3004", country="India")
\ No newline at end of file
+# trends = get_trade_trends("3004", country="India")
+# batch = get_trade_by_hs_batch(["3002", "3004"], top_n=5)
\ No newline at end of file
@@ -1,8 +1,9 @@
 """
 Internal Documents Agent for processing internal knowledge
 """
-import os
-from pymongo import MongoClient
+from db.connection import get_mongo_client
+from telemetry.timing import timed
+from telemetry.metrics import mock_fallback
 from dotenv import load_dotenv
 import random
 from datetime import datetime, timedelta
@@ -10,14 +11,17 @@ from datetime import datetime, timedelta
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
+# Document field -> stored field it is built from
+DOCUMENT_FIELDS = {
+    "doc_id": "doc_id",
+    "title": "title",
+    "text_excerpt": "text",
+    "uploaded_by": "uploaded_by",
+    "uploaded_at": "uploaded_at"
+}
 
-def search_internal_documents(query, top_n=5, database_name="pharma_hub"):
+@timed("agent.internal-docs")
+def search_internal_documents(query, top_n=5, database_name="pharma_hub", fields=None):
     """
     Search internal documents by query
     
@@ -25,6 +29,7 @@ def search_internal_documents(query, top_n=5, database_name="pharma_hub"):
         query (str): Search query
         top_n (int): Number of results to return
         database_name (str): Name of the MongoDB database
+        fields (list): Document fields to read and return (None for all)
     
     Returns:
         list: List of documents
@@ -36,8 +41,11 @@ def search_internal_documents(query, top_n=5, database_name="pharma_hub"):
         # Build text search query
         mongo_query = {"$text": {"$search": query}}
         
-        # Find documents
-        documents = list(db["internal_docs"].find(mongo_query).limit(top_n))
+        # Find documents, reading only the stored fields behind the requested ones
+        selected = fields or list(DOCUMENT_FIELDS)
+        projection = {DOCUMENT_FIELDS[name]: 1 for name in selected}
+        projection["_id"] = 0
+        documents = list(db["internal_docs"].find(mongo_query, projection).limit(top_n))
         
         # Format results
         formatted_docs = []
@@ -49,16 +57,13 @@ def search_internal_documents(query, top_n=5, database_name="pharma_hub"):
                 "uploaded_by": doc.get("uploaded_by"),
                 "uploaded_at": doc.get("uploaded_at")
             }
-            formatted_docs.append(formatted_doc)
+            formatted_docs.append({name: formatted_doc[name] for name in selected})
         
         return formatted_docs
         
     except Exception as e:
         print(f"Error in Internal Documents agent: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def get_document_by_id(doc_id, database_name="pharma_hub"):
     """
@@ -92,9 +97,6 @@ def get_document_by_id(doc_id, database_name="pharma_hub"):
     except Exception as e:
         print(f"Error retrieving document: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def upload_document(title, text, uploaded_by, database_name="pharma_hub"):
     """
@@ -132,10 +134,8 @@ def upload_document(title, text, uploaded_by, database_name="pharma_hub"):
     except Exception as e:
         print(f"Error uploading document: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
+@mock_fallback("internal-docs")
 def get_mock_internal_documents(query, count=3):
     """
     Generate mock internal documents for testing
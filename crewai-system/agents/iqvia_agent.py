@@ -3,7 +3,9 @@ IQVIA Agent (using mock data since real IQVIA API is not publicly available)
 """
 import random
 from datetime import datetime
+from telemetry.timing import timed
 
+@timed("agent.iqvia")
 def get_market_stats(therapy_area=None, years=5):
     """
     Get market size and CAGR for a therapy area
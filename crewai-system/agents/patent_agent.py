@@ -1,13 +1,46 @@
 """
 Patent Agent for searching patent information
 """
-import os
 from dotenv import load_dotenv
 from data_sources import pubmed_patents, openalex_papers
+from telemetry.timing import timed
+from api.fields import select_fields
 
 # Load environment variables
 load_dotenv()
 
+# Patent field -> OpenAlex work fields it is built from
+OPENALEX_SELECT = {
+    "patent_id": ["id"],
+    "title": ["title"],
+    "assignee": ["authorships"],
+    "filing_date": ["publication_date"],
+    "grant_date": ["publication_date"],
+    "expiry_date": [],
+    "ipc_codes": ["concepts"]
+}
+
+PATENT_FIELDS = list(OPENALEX_SELECT)
+
+def openalex_select(fields):
+    """
+    Translate patent fields into the OpenAlex ``select`` list
+
+    Args:
+        fields (list): Patent field names, or None for everything
+
+    Returns:
+        list: OpenAlex work fields (always includes the ID), or None
+    """
+    if not fields:
+        return None
+    select = ["id"]
+    for name in fields:
+        for work_field in OPENALEX_SELECT[name]:
+            if work_field not in select:
+                select.append(work_field)
+    return select
+
 def format_patent_as_text(patent_data):
     """
     Format patent data as readable text
@@ -58,7 +91,66 @@ def format_patent_as_text(patent_data):
     
     return "\n".join(text_parts)
 
-def search_patents(query, assignee=None, ipc_code=None, top_n=10):
+def paper_to_patent(paper):
+    """
+    Convert an OpenAlex paper record into the patent format
+    
+    Args:
+        paper (dict): Paper record from openalex_papers
+        
+    Returns:
+        dict: Patent-like entry
+    """
+    return {
+        "patent_id": paper.get("paper_id", "").split("/")[-1] if paper.get("paper_id") else f"OA{__import__('random').randint(10000000, 99999999)}",
+        "title": paper.get("title", ""),
+        "assignee": ", ".join([author["author_name"] for author in paper.get("authorships", [])[:3]]) if paper.get("authorships") else "Unknown Authors",
+        "filing_date": paper.get("publication_date", "Unknown"),
+        "grant_date": paper.get("publication_date", "Unknown"),
+        "expiry_date": "N/A (Academic Paper)",
+        "ipc_codes": [concept["name"] for concept in paper.get("concepts", [])[:3]] if paper.get("concepts") else ["Academic Research"]
+    }
+
+def build_patent_result(patents, source, query, assignee=None, ipc_code=None, top_n=10, fields=None, next_page=None):
+    """
+    Filter, trim and summarize one page of patents
+    
+    Args:
+        patents (list): Patent entries from a source
+        source (str): Source label
+        query (str): Search query
+        assignee (str): Assignee name to filter by
+        ipc_code (str): IPC code to filter by
+        top_n (int): Number of results to return
+        fields (list): Patent fields to return (None for all)
+        next_page (dict): Source position of the following page, or None
+        
+    Returns:
+        dict: Search results with metadata
+    """
+    # Filter by assignee if specified
+    if assignee:
+        patents = [p for p in patents if assignee.lower() in p.get('assignee', '').lower()]
+    
+    # Filter by IPC code if specified
+    if ipc_code:
+        patents = [p for p in patents if ipc_code in str(p.get('ipc_codes', []))]
+    
+    # Create both structured and text representations
+    structured_data = select_fields(patents[:top_n], fields)
+    text_representation = "\n\n".join([format_patent_as_text(patent) for patent in structured_data])
+    
+    return {
+        "data": structured_data,
+        "text_summary": text_representation,
+        "source": source,
+        "query": f"Patent search for {query}",
+        "next_page": next_page,
+        "timestamp": __import__('datetime').datetime.now().isoformat()
+    }
+
+@timed("agent.patents")
+def search_patents(query, assignee=None, ipc_code=None, top_n=10, fields=None):
     """
     Search for patents using multiple data sources
     
@@ -67,71 +159,43 @@ def search_patents(query, assignee=None, ipc_code=None, top_n=10):
         assignee (str): Assignee name to filter by
         ipc_code (str): IPC code to filter by
         top_n (int): Number of results to return
+        fields (list): Patent fields to return (None for all); also narrows the
+                       OpenAlex request and the text summary
         
     Returns:
         dict: Search results with metadata
     """
     try:
         # Try to get data from PubMed first
-        pubmed_results = pubmed_patents.search_patents_pubmed(query, top_n)
+        try:
+            pubmed_page = pubmed_patents.search_patents_pubmed_page(query, top_n)
+        except Exception as e:
+            print(f"Error in PubMed patent search: {str(e)}")
+            pubmed_page = {"patents": [], "next": None}
         
         # If PubMed returns results, use them
-        if pubmed_results and len(pubmed_results) > 0:
-            print(f"Found {len(pubmed_results)} patents from PubMed")
-            # Filter by assignee if specified
-            if assignee:
-                pubmed_results = [p for p in pubmed_results if assignee.lower() in p.get('assignee', '').lower()]
-            
-            # Filter by IPC code if specified
-            if ipc_code:
-                pubmed_results = [p for p in pubmed_results if ipc_code in str(p.get('ipc_codes', []))]
-            
-            # Create both structured and text representations
-            structured_data = pubmed_results[:top_n]
-            text_representation = "\n\n".join([format_patent_as_text(patent) for patent in pubmed_results[:top_n]])
-            
-            return {
-                "data": structured_data,
-                "text_summary": text_representation,
-                "source": "PubMed",
-                "query": f"Patent search for {query}",
-                "timestamp": __import__('datetime').datetime.now().isoformat()
-            }
+        if pubmed_page["patents"]:
+            print(f"Found {len(pubmed_page['patents'])} patents from PubMed")
+            next_page = dict(pubmed_page["next"], source="pubmed") if pubmed_page["next"] else None
+            return build_patent_result(pubmed_page["patents"], "PubMed", query, assignee, ipc_code, top_n, fields, next_page)
         
         # If no PubMed results, try OpenAlex as fallback
         print("No PubMed results found, trying OpenAlex as fallback")
-        openalex_results = openalex_papers.search_papers_openalex(query, top_n)
+        try:
+            openalex_page = openalex_papers.search_papers_openalex_page(query, top_n, select=openalex_select(fields))
+        except Exception as e:
+            print(f"Error searching papers in OpenAlex: {str(e)}")
+            openalex_page = {"papers": [], "next_cursor": None}
         
-        if openalex_results and len(openalex_results) > 0:
-            print(f"Found {len(openalex_results)} papers from OpenAlex")
-            # Convert papers to patent-like format
-            patent_like_results = []
-            for paper in openalex_results[:top_n]:
-                patent_entry = {
-                    "patent_id": paper.get("paper_id", "").split("/")[-1] if paper.get("paper_id") else f"OA{__import__('random').randint(10000000, 99999999)}",
-                    "title": paper.get("title", ""),
-                    "assignee": ", ".join([author["author_name"] for author in paper.get("authorships", [])[:3]]) if paper.get("authorships") else "Unknown Authors",
-                    "filing_date": paper.get("publication_date", "Unknown"),
-                    "grant_date": paper.get("publication_date", "Unknown"),
-                    "expiry_date": "N/A (Academic Paper)",
-                    "ipc_codes": [concept["name"] for concept in paper.get("concepts", [])[:3]] if paper.get("concepts") else ["Academic Research"]
-                }
-                patent_like_results.append(patent_entry)
-            
-            # Create both structured and text representations
-            text_representation = "\n\n".join([format_patent_as_text(patent) for patent in patent_like_results])
-            
-            return {
-                "data": patent_like_results,
-                "text_summary": text_representation,
-                "source": "OpenAlex (converted to patent format)",
-                "query": f"Patent search for {query}",
-                "timestamp": __import__('datetime').datetime.now().isoformat()
-            }
+        if openalex_page["papers"]:
+            print(f"Found {len(openalex_page['papers'])} papers from OpenAlex")
+            next_page = {"source": "openalex", "cursor": openalex_page["next_cursor"]} if openalex_page["next_cursor"] else None
+            patent_like_results = [paper_to_patent(paper) for paper in openalex_page["papers"][:top_n]]
+            return build_patent_result(patent_like_results, "OpenAlex (converted to patent format)", query, None, None, top_n, fields, next_page)
         
         # If no results from either source, return mock data
         print("No results from PubMed or OpenAlex, returning mock data")
-        mock_data = pubmed_patents.get_mock_patent_data(query, top_n)
+        mock_data = select_fields(pubmed_patents.get_mock_patent_data(query, top_n), fields)
         text_representation = "\n\n".join([format_patent_as_text(patent) for patent in mock_data])
         
         return {
@@ -145,7 +209,7 @@ def search_patents(query, assignee=None, ipc_code=None, top_n=10):
     except Exception as e:
         print(f"Error in patent search: {str(e)}")
         # Return mock data as final fallback
-        mock_data = pubmed_patents.get_mock_patent_data(query, top_n)
+        mock_data = select_fields(pubmed_patents.get_mock_patent_data(query, top_n), fields)
         text_representation = "\n\n".join([format_patent_as_text(patent) for patent in mock_data])
         
         return {
@@ -157,5 +221,42 @@ def search_patents(query, assignee=None, ipc_code=None, top_n=10):
             "error": str(e)
         }
 
+@timed("agent.patents")
+def get_patents_page(query, next_page, assignee=None, ipc_code=None, top_n=10, fields=None):
+    """
+    Fetch a later page of a patent search started by search_patents
+    
+    Each page costs one upstream request: a PubMed efetch against the
+    stored WebEnv, or an OpenAlex request with the stored cursor.
+    
+    Args:
+        query (str): Search query of the original search
+        next_page (dict): "next_page" returned with the previous page
+        assignee (str): Assignee name to filter by
+        ipc_code (str): IPC code to filter by
+        top_n (int): Page size
+        fields (list): Patent fields to return (None for all)
+        
+    Returns:
+        dict: Page of results with the position of the page after it
+    """
+    if next_page.get("source") == "pubmed":
+        page = pubmed_patents.search_patents_pubmed_page(
+            query, top_n,
+            retstart=int(next_page["retstart"]),
+            webenv=next_page["webenv"],
+            query_key=next_page["query_key"]
+        )
+        following = dict(page["next"], source="pubmed") if page["next"] else None
+        return build_patent_result(page["patents"], "PubMed", query, assignee, ipc_code, top_n, fields, following)
+    
+    if next_page.get("source") == "openalex":
+        page = openalex_papers.search_papers_openalex_page(query, top_n, cursor=next_page["cursor"], select=openalex_select(fields))
+        following = {"source": "openalex", "cursor": page["next_cursor"]} if page["next_cursor"] else None
+        patents = [paper_to_patent(paper) for paper in page["papers"][:top_n]]
+        return build_patent_result(patents, "OpenAlex (converted to patent format)", query, None, None, top_n, fields, following)
+    
+    raise ValueError(f"Unknown patent page source: {next_page.get('source')}")
+
 # Example usage:
 # results = search_patents("diabetes treatment", top_n=5)
\ No newline at end of file
@@ -1,8 +1,10 @@
 """
 Clinical Trials Agent
 """
-import os
-from pymongo import MongoClient
+from db.connection import get_mongo_client
+from telemetry.timing import timed
+from telemetry.metrics import mock_fallback
+from api.fields import select_fields
 from dotenv import load_dotenv
 import random
 from datetime import datetime, timedelta
@@ -10,16 +12,16 @@ import re
 
 # Import ClinicalTrials.gov API integration
 from data_sources import clinicaltrials_api
+from data_sources import clinicaltrials_mirror
 
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
+# Trial fields that can be requested (fields=)
+TRIAL_FIELDS = list(clinicaltrials_api.STUDY_FIELDS)
+
+# Trial fields stored in the clinical_trials collection
+STORED_TRIAL_FIELDS = ["nct_id", "title", "condition", "phase", "status", "sponsor"]
 
 def extract_medical_condition(query):
     """
@@ -70,9 +72,101 @@ def extract_medical_condition(query):
     # Default fallback
     return "medical condition"
 
-def search_trials(condition, phase=None, status=None, top_n=10, database_name="pharma_hub"):
+def trial_fetch_fields(fields, phase=None, status=None):
+    """
+    Get the trial fields to fetch for a search
+    
+    Filters are applied after fetching, so their fields are fetched too.
+    
+    Args:
+        fields (list): Requested trial fields, or None for all
+        phase (str): Optional phase filter
+        status (str): Optional status filter
+    
+    Returns:
+        list: Fields to fetch, or None for all
+    """
+    if not fields:
+        return None
+    fetch_fields = list(fields)
+    for name, value in (("phase", phase), ("status", status)):
+        if value and name not in fetch_fields:
+            fetch_fields.append(name)
+    return fetch_fields
+
+def filter_trials(trials, phase=None, status=None):
     """
-    Search clinical trials by condition using ClinicalTrials.gov API with fallback to database and mock data
+    Apply the optional phase and status filters to fetched trials
+    
+    Args:
+        trials (list): Formatted trials
+        phase (str): Optional phase filter
+        status (str): Optional status filter
+    
+    Returns:
+        list: Matching trials
+    """
+    if phase:
+        trials = [t for t in trials if phase.lower() in t.get('phase', '').lower()]
+    if status:
+        trials = [t for t in trials if status.lower() in t.get('status', '').lower()]
+    return trials
+
+def mirror_result(condition, page):
+    """
+    Build search results from a page of the ClinicalTrials.gov mirror
+    
+    Args:
+        condition (str): Medical condition as given by the caller
+        page (dict): Page returned by clinicaltrials_mirror.search_mirror
+    
+    Returns:
+        dict: Search results with metadata
+    """
+    return {
+        "data": page["studies"],
+        "source": "ClinicalTrials.gov Mirror",
+        "query": f"Clinical trials search for {condition}",
+        "next_page_token": page["next_page_token"],
+        "synced_at": page["synced_at"],
+        "timestamp": datetime.now().isoformat()
+    }
+
+def search_mirror_trials(condition, clean_condition, phase=None, status=None, top_n=10, fields=None,
+                         database_name="pharma_hub", max_staleness_h=clinicaltrials_mirror.CT_MIRROR_MAX_STALENESS_H):
+    """
+    Search the local ClinicalTrials.gov mirror
+    
+    Args:
+        condition (str): Medical condition as given by the caller
+        clean_condition (str): Condition extracted from it
+        phase (str): Optional phase filter
+        status (str): Optional status filter
+        top_n (int): Number of results to return
+        fields (list): Trial fields to return (None for all)
+        database_name (str): Name of the MongoDB database
+        max_staleness_h (float): Oldest acceptable mirror in hours (None for any age)
+    
+    Returns:
+        dict: Search results with metadata, or None if the mirror has no fresh enough match
+    """
+    try:
+        page = clinicaltrials_mirror.search_mirror(
+            clean_condition, phase, status, top_n, fields, 0, max_staleness_h, database_name
+        )
+    except Exception as mirror_error:
+        print(f"Error searching ClinicalTrials.gov mirror: {str(mirror_error)}")
+        return None
+    if not page or not page["studies"]:
+        return None
+    print(f"Found {len(page['studies'])} trials in the ClinicalTrials.gov mirror")
+    return mirror_result(condition, page)
+
+@timed("agent.trials")
+def search_trials(condition, phase=None, status=None, top_n=10, database_name="pharma_hub", fields=None, deep=False):
+    """
+    Search clinical trials by condition, local mirror first, then ClinicalTrials.gov API
+    with fallback to a stale mirror, the database and mock data
     
     Args:
         condition (str): Medical condition to search for
@@ -80,37 +174,47 @@ def search_trials(condition, phase=None, status=None, top_n=10, database_name="p
         status (str): Optional status filter (e.g., "Recruiting", "Completed")
         top_n (int): Number of results to return
         database_name (str): Name of the MongoDB database
+        fields (list): Trial fields to fetch and return (None for all)
+        deep (bool): Re-fetch each trial's full record from ClinicalTrials.gov
     
     Returns:
         dict: Search results with metadata
     """
+    fetch_fields = trial_fetch_fields(fields, phase, status)
+    # Extract clean medical condition from query
+    clean_condition = extract_medical_condition(condition)
     try:
-        # First, try to get data from ClinicalTrials.gov API
+        # First, serve the search from the local mirror if it is fresh
+        # (deep searches always want the live records)
+        if not deep:
+            result = search_mirror_trials(condition, clean_condition, phase, status, top_n, fields, database_name)
+            if result:
+                return result
+        
+        # Otherwise get data from ClinicalTrials.gov API
         print(f"Searching ClinicalTrials.gov API for: {condition}")
         try:
-            # Extract clean medical condition from query
-            clean_condition = extract_medical_condition(condition)
-            
             # Search using ClinicalTrials.gov API
-            trials = clinicaltrials_api.search_clinical_trials(clean_condition, max_results=top_n)
+            page = clinicaltrials_api.search_clinical_trials_page(clean_condition, page_size=top_n, fields=fetch_fields, deep=deep)
+            trials = page["studies"]
             
             if trials and len(trials) > 0:
                 print(f"Found {len(trials)} trials from ClinicalTrials.gov API")
                 
-                # Apply filters if specified
-                if phase:
-                    trials = [t for t in trials if phase.lower() in t.get('phase', '').lower()]
-                if status:
-                    trials = [t for t in trials if status.lower() in t.get('status', '').lower()]
-                
                 return {
-                    "data": trials[:top_n],
+                    "data": select_fields(filter_trials(trials, phase, status)[:top_n], fields),
                     "source": "ClinicalTrials.gov API",
                     "query": f"Clinical trials search for {condition}",
+                    "next_page_token": page["next_page_token"],
                     "timestamp": datetime.now().isoformat()
                 }
         except Exception as api_error:
             print(f"Error fetching from ClinicalTrials.gov API: {str(api_error)}")
+            # The API is failing: a stale mirror beats the fallbacks below
+            result = search_mirror_trials(condition, clean_condition, phase, status, top_n, fields, database_name,
+                                          max_staleness_h=None)
+            if result:
+                return result
         
         # If API fails, try to get data from MongoDB
         print("Trying to get data from MongoDB...")
@@ -127,24 +231,17 @@ def search_trials(condition, phase=None, status=None, top_n=10, database_name="p
             if status:
                 query["status"] = {"$regex": status, "$options": "i"}
             
-            # Find trials
-            trials = list(db["clinical_trials"].find(query).limit(top_n))
+            # Find trials, reading only the fields that will be returned
+            projection = {name: 1 for name in (fields or STORED_TRIAL_FIELDS)}
+            projection["_id"] = 0
+            trials = list(db["clinical_trials"].find(query, projection).limit(top_n))
             
             # Format results
             formatted_trials = []
             for trial in trials:
-                formatted_trial = {
-                    "nct_id": trial.get("nct_id"),
-                    "title": trial.get("title"),
-                    "condition": trial.get("condition"),
-                    "phase": trial.get("phase"),
-                    "status": trial.get("status"),
-                    "sponsor": trial.get("sponsor")
-                }
+                formatted_trial = {name: trial.get(name) for name in STORED_TRIAL_FIELDS if not fields or name in fields}
                 formatted_trials.append(formatted_trial)
             
-            client.close()
-            
             if formatted_trials:
                 return {
                     "data": formatted_trials,
@@ -153,13 +250,11 @@ def search_trials(condition, phase=None, status=None, top_n=10, database_name="p
                     "timestamp": datetime.now().isoformat()
                 }
         
-        client.close()
-        
         # If no data in database, return mock data
         print("No data found in API or database, returning mock data")
         mock_data = get_mock_trials(condition, phase, status, top_n)
         return {
-            "data": mock_data,
+            "data": select_fields(mock_data, fields),
             "source": "Mock Data",
             "query": f"Clinical trials search for {condition}",
             "timestamp": datetime.now().isoformat()
@@ -170,13 +265,55 @@ def search_trials(condition, phase=None, status=None, top_n=10, database_name="p
         # Return mock data as final fallback
         mock_data = get_mock_trials(condition, phase, status, top_n)
         return {
-            "data": mock_data,
+            "data": select_fields(mock_data, fields),
             "source": "Mock Data (Error Fallback)",
             "query": f"Clinical trials search for {condition}",
             "timestamp": datetime.now().isoformat(),
             "error": str(e)
         }
 
+@timed("agent.trials")
+def get_trials_page(condition, page_token, phase=None, status=None, top_n=10, fields=None, deep=False):
+    """
+    Fetch a later page of a search started by search_trials
+    
+    Mirror page tokens are answered from the mirror whatever its age, so a
+    search keeps one source across pages. Unlike the first page there is no
+    database or mock fallback: other tokens only have meaning to
+    ClinicalTrials.gov.
+    
+    Args:
+        condition (str): Medical condition of the original search
+        page_token (str): next_page_token returned with the previous page
+        phase (str): Optional phase filter
+        status (str): Optional status filter
+        top_n (int): Page size
+        fields (list): Trial fields to fetch and return (None for all)
+        deep (bool): Re-fetch each trial's full record from ClinicalTrials.gov
+    
+    Returns:
+        dict: Page of results with the token of the page after it
+    """
+    clean_condition = extract_medical_condition(condition)
+    offset = clinicaltrials_mirror.parse_mirror_token(page_token)
+    if offset is not None:
+        page = clinicaltrials_mirror.search_mirror(clean_condition, phase, status, top_n, fields, offset, None)
+        return mirror_result(condition, page)
+    page = clinicaltrials_api.search_clinical_trials_page(
+        clean_condition,
+        page_size=top_n,
+        fields=trial_fetch_fields(fields, phase, status),
+        page_token=page_token,
+        deep=deep
+    )
+    return {
+        "data": select_fields(filter_trials(page["studies"], phase, status), fields),
+        "source": "ClinicalTrials.gov API",
+        "query": f"Clinical trials search for {condition}",
+        "next_page_token": page["next_page_token"],
+        "timestamp": datetime.now().isoformat()
+    }
+
 def get_trial_statistics(database_name="pharma_hub"):
     """
     Get statistics about clinical trials in the database
@@ -229,7 +366,6 @@ def get_trial_statistics(database_name="pharma_hub"):
             "top_sponsors": [{"sponsor": item["_id"], "count": item["count"]} for item in top_sponsors]
         }
         
-        client.close()
         return stats
         
     except Exception as e:
@@ -237,6 +373,7 @@ def get_trial_statistics(database_name="pharma_hub"):
         # Return mock data as fallback
         return get_mock_trial_statistics()
 
+@mock_fallback("trials")
 def get_mock_trials(condition, phase=None, status=None, top_n=10):
     """
     Generate mock clinical trials data for testing
@@ -301,6 +438,7 @@ def get_mock_trials(condition, phase=None, status=None, top_n=10):
     
     return mock_trials
 
+@mock_fallback("trials")
 def get_mock_trial_statistics():
     """
     Generate mock clinical trials statistics for testing
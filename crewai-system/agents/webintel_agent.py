@@ -1,8 +1,6 @@
 """
 Web Intelligence Agent for online research
 """
-import requests
-import os
 from dotenv import load_dotenv
 import random
 from datetime import datetime, timedelta
@@ -10,6 +8,9 @@ import re
 
 # Import Gemini web search integration
 from data_sources import gemini_websearch
+from telemetry.timing import timed
+from telemetry.metrics import mock_fallback
+from api.fields import select_fields
 
 # Load environment variables
 load_dotenv()
@@ -63,13 +64,18 @@ def extract_medical_condition(query):
     # Default fallback
     return "medical research"
 
-def search_web(query, num_results=5):
+# Result fields that can be requested (fields=)
+WEB_RESULT_FIELDS = list(gemini_websearch.RESULT_FIELDS)
+
+@timed("agent.web-intel")
+def search_web(query, num_results=5, fields=None):
     """
     Perform web search using Google Gemini API
     
     Args:
         query (str): Search query
         num_results (int): Number of results to return
+        fields (list): Result fields to fetch and return (None for all)
     
     Returns:
         list: List of search results
@@ -79,14 +85,15 @@ def search_web(query, num_results=5):
         clean_query = extract_medical_condition(query)
         
         # Use Gemini web search integration with cleaned query
-        results = gemini_websearch.search_with_gemini(clean_query, num_results)
-        return results
+        results = gemini_websearch.search_with_gemini(clean_query, num_results, fields=fields)
+        return select_fields(results, fields)
         
     except Exception as e:
         print(f"Error in Web Intelligence agent: {str(e)}")
         # Return mock data as fallback
-        return get_mock_web_results(query, num_results)
+        return select_fields(get_mock_web_results(query, num_results), fields)
 
+@mock_fallback("web-intel")
 def get_mock_web_results(query, num_results=5):
     """
     Generate mock web search results for testing
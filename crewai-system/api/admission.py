@@ -0,0 +1,298 @@
+"""
+Per-client rate limiting and load shedding for the agent endpoints
+
+Every agent request spends external API quota and worker threads, so it
+is admitted in two steps before any route code runs:
+
+1. Rate limiting: token buckets per (client, route) and per client across
+   all agent routes. A client is the user ID from a valid Bearer token, or
+   the remote address otherwise. A client over its rate gets 429 with
+   Retry-After, without affecting anyone else.
+2. Load shedding: pressure signals (executor queue depth, upstream calls
+   in flight, ...) are compared with their limits. When one is saturated
+   new agent requests get 503 with Retry-After instead of queueing behind
+   work that is already late. Expensive routes (master agent, search,
+   batches, report generation) are shed first, at SHED_HEAVY_FRACTION of a
+   limit, so cheap cached lookups keep their latency for longer.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Requests per second and burst size per route; override with RATE_LIMIT_<ROUTE>="rate/burst",
+# e.g. RATE_LIMIT_MASTER_AGENT="0.5/10"
+ROUTE_LIMITS = {
+    "/api/master-agent": (0.2, 5),
+    "/api/search": (0.5, 10),
+    "/api/search/stream": (0.5, 10),
+    "/api/generate-report": (0.1, 3),
+    "/api/exim": (5, 50),
+    "/api/exim/batch": (0.5, 5),
+    "/api/trials": (2, 20),
+    "/api/trials/batch": (0.5, 5),
+    "/api/iqvia": (5, 50),
+    "/api/patents": (2, 20),
+    "/api/patents/batch": (0.5, 5),
+    "/api/web-intel": (1, 10),
+    "/api/internal-docs": (5, 50)
+}
+
+# Routes shed first under load
+HEAVY_ROUTES = {
+    "/api/master-agent", "/api/search", "/api/search/stream", "/api/generate-report",
+    "/api/exim/batch", "/api/trials/batch", "/api/patents/batch"
+}
+
+# Limit across all agent routes for one client, as "rate/burst"
+RATE_LIMIT_CLIENT = os.environ.get("RATE_LIMIT_CLIENT", "10/100")
+
+# Buckets kept in memory; the least recently used are dropped beyond this
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", 10000))
+
+# Share of a pressure limit at which heavy routes start being shed
+SHED_HEAVY_FRACTION = float(os.environ.get("SHED_HEAVY_FRACTION", 0.75))
+
+# Saturation points of the signals the API servers register
+SHED_FANOUT_QUEUE = int(os.environ.get("SHED_FANOUT_QUEUE", 64))
+SHED_UPSTREAM_IN_FLIGHT = int(os.environ.get("SHED_UPSTREAM_IN_FLIGHT", 64))
+SHED_UPSTREAM_WAITING = int(os.environ.get("SHED_UPSTREAM_WAITING", 32))
+
+# Retry-After sent with 503 responses
+SHED_RETRY_AFTER_S = int(os.environ.get("SHED_RETRY_AFTER_S", 2))
+
+
+def parse_limit(value):
+    """
+    Parse a "rate/burst" limit
+
+    Args:
+        value (str): e.g. "2/20" (2 requests per second, bursts of 20)
+
+    Returns:
+        tuple: (rate per second, burst)
+    """
+    rate, _, burst = value.partition("/")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(1.0, rate)
+
+
+def route_limit(route):
+    """
+    Get the (rate, burst) limit of a route, or None if it is not rate limited
+
+    Args:
+        route (str): Request path (e.g. /api/trials)
+
+    Returns:
+        tuple: (rate per second, burst) or None
+    """
+    if route not in ROUTE_LIMITS:
+        return None
+    env_name = "RATE_LIMIT_" + route[len("/api/"):].upper().replace("-", "_").replace("/", "_")
+    if os.environ.get(env_name):
+        return parse_limit(os.environ[env_name])
+    return ROUTE_LIMITS[route]
+
+
+class TokenBucket:
+    """Refills at rate tokens per second up to burst; each request takes one"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now if now is not None else time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Token buckets per (client, route) and per client"""
+
+    def __init__(self, client_limit=RATE_LIMIT_CLIENT, max_buckets=RATE_LIMIT_MAX_BUCKETS):
+        self.client_limit = parse_limit(client_limit)
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _bucket(self, key, limit, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(limit[0], limit[1], now)
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def check(self, client, route, now=None):
+        """
+        Take a token for a request if both of its buckets have one
+
+        Args:
+            client (str): Client identity (e.g. "user:<id>" or "ip:<address>")
+            route (str): Request path
+            now (float): time.monotonic() value (for tests)
+
+        Returns:
+            float: 0 if the request is allowed, else seconds until it would be
+        """
+        limit = route_limit(route)
+        if limit is None:
+            return 0.0
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            buckets = [
+                self._bucket((client, route), limit, now),
+                self._bucket((client, None), self.client_limit, now)
+            ]
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+            counters = self._stats.setdefault(route, {"allowed": 0, "limited": 0})
+            if wait > 0:
+                counters["limited"] += 1
+                return wait
+            for bucket in buckets:
+                bucket.take()
+            counters["allowed"] += 1
+            return 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "routes": {route: dict(counters) for route, counters in self._stats.items()},
+                "buckets": len(self._buckets),
+                "client_limit": {"rate": self.client_limit[0], "burst": self.client_limit[1]}
+            }
+
+
+class LoadShedder:
+    """Rejects agent requests while any registered pressure signal is saturated"""
+
+    def __init__(self, heavy_fraction=SHED_HEAVY_FRACTION, retry_after=SHED_RETRY_AFTER_S):
+        self.heavy_fraction = heavy_fraction
+        self.retry_after = retry_after
+        self._signals = {}
+        self._lock = threading.Lock()
+        self._shed = {}
+
+    def add_signal(self, name, current, limit):
+        """
+        Register a pressure signal (re-registering a name replaces it)
+
+        Args:
+            name (str): Signal name shown in metrics (e.g. "fanout_queue")
+            current (callable): Returns the current value (e.g. queue depth)
+            limit (int): Value at which the signal is saturated
+        """
+        with self._lock:
+            self._signals[name] = (current, limit)
+
+    def pressure(self):
+        """
+        Read every signal
+
+        Returns:
+            dict: Signal name -> {"current", "limit", "ratio"}
+        """
+        with self._lock:
+            signals = dict(self._signals)
+        readings = {}
+        for name, (current, limit) in signals.items():
+            try:
+                value = current()
+            except Exception as e:
+                print(f"Error reading load signal {name}: {str(e)}")
+                continue
+            readings[name] = {"current": value, "limit": limit, "ratio": round(value / limit, 4) if limit else 0.0}
+        return readings
+
+    def check(self, route):
+        """
+        Decide whether a request should be shed
+
+        Args:
+            route (str): Request path
+
+        Returns:
+            str: Name of the saturated signal, or None to admit the request
+        """
+        if route not in ROUTE_LIMITS:
+            return None
+        threshold = self.heavy_fraction if route in HEAVY_ROUTES else 1.0
+        for name, reading in self.pressure().items():
+            if reading["limit"] and reading["ratio"] >= threshold:
+                with self._lock:
+                    self._shed[route] = self._shed.get(route, 0) + 1
+                return name
+        return None
+
+    def stats(self):
+        with self._lock:
+            shed = dict(self._shed)
+        return {"shed": shed, "signals": self.pressure(), "heavy_fraction": self.heavy_fraction}
+
+
+rate_limiter = RateLimiter()
+load_shedder = LoadShedder()
+
+
+def admit(client, route, method="GET"):
+    """
+    Apply load shedding and rate limits to a request
+
+    Shedding is checked first, so a request rejected with 503 does not use
+    up one of the client's rate limit tokens. CORS preflights are always
+    admitted: they cost nothing and must not spend the tokens of the
+    request they precede.
+
+    Args:
+        client (str): Client identity
+        route (str): Request path
+        method (str): HTTP method
+
+    Returns:
+        tuple: None to admit the request, else (error body, HTTP status, Retry-After seconds)
+    """
+    if method == "OPTIONS":
+        return None
+    signal = load_shedder.check(route)
+    if signal:
+        retry_after = load_shedder.retry_after
+        return {"error": "Server is overloaded, try again shortly", "retry_after": retry_after}, 503, retry_after
+    wait = rate_limiter.check(client, route)
+    if wait > 0:
+        retry_after = max(1, math.ceil(wait))
+        return {"error": "Rate limit exceeded", "retry_after": retry_after}, 429, retry_after
+    return None
+
+
+def get_admission_metrics():
+    """
+    Get rate limiting and load shedding metrics for this process
+
+    Returns:
+        dict: Per-route allowed/limited/shed counts and current pressure signals
+    """
+    return {"rate_limits": rate_limiter.stats(), "load_shedding": load_shedder.stats()}
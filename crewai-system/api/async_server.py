@@ -0,0 +1,450 @@
+"""
+Async serving mode for the Pharma Mind Nexus API (FastAPI + uvicorn)
+
+Exposes the same routes as the Flask server through async handlers. The
+route logic is shared with api/server.py: each handler awaits the matching
+*_response builder on a dedicated, bounded thread pool, so the event loop
+is never blocked by Mongo, bcrypt or upstream HTTP calls and a single
+process can keep hundreds of chat queries in flight.
+
+Run with:
+    uvicorn api.async_server:app --host 0.0.0.0 --port 4000
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from dotenv import load_dotenv
+
+from api import server
+from api import encoding
+from api.admission import admit, load_shedder
+from api.etags import encoded_etag, etag_matches
+from telemetry import timing
+from telemetry import metrics
+from db.connection import close_mongo_client
+
+# Load environment variables
+load_dotenv()
+
+# Threads available to blocking agent, Mongo and auth code
+ASYNC_WORKER_THREADS = int(os.environ.get("ASYNC_WORKER_THREADS", 64))
+
+# Blocking calls allowed to wait for a worker thread before agent requests are shed
+ASYNC_SHED_QUEUE = int(os.environ.get("ASYNC_SHED_QUEUE", ASYNC_WORKER_THREADS * 2))
+
+_executor = None
+
+
+def get_executor():
+    """Return the thread pool used for blocking route logic"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKER_THREADS, thread_name_prefix="async-api")
+    return _executor
+
+
+async def run_blocking(fn, *args):
+    """
+    Run a blocking callable on the managed thread pool, in a copy of the
+    current context so it reports into the request's timer
+
+    Args:
+        fn (callable): Blocking function
+        *args: Positional arguments for fn
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, fn, *args))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Create the worker pool on startup and release pools on shutdown"""
+    get_executor()
+    load_shedder.add_signal("async_worker_queue", lambda: get_executor()._work_queue.qsize(), ASYNC_SHED_QUEUE)
+    yield
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    close_mongo_client()
+
+
+app = FastAPI(title="Pharma Mind Nexus API", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Reject agent requests over their client's rate limit (429) or while overloaded (503)"""
+    client = request.client.host if request.client else None
+    rejection = admit(server.client_key(request.headers.get("authorization"), client), request.url.path, request.method)
+    if rejection:
+        body, status, retry_after = rejection
+        return JSONResponse(content=body, status_code=status, headers={"retry-after": str(retry_after)})
+    return await call_next(request)
+
+
+# Serialization time of the current request, filled in by respond()
+_serialize_ms = contextvars.ContextVar("serialize_ms", default=None)
+
+
+@app.middleware("http")
+async def instrument_response(request: Request, call_next):
+    """Time the request, record serialization time and compress buffered JSON/text responses"""
+    request_timer, token = timing.start_request()
+    timer = [0.0]
+    _serialize_ms.set(timer)
+    try:
+        response = await call_next(request)
+    finally:
+        timing.end_request(token)
+    response.headers["server-timing"] = request_timer.server_timing()
+    timing.log_request(request_timer, request.method, request.url.path, response.status_code)
+
+    route = request.scope.get("route")
+    endpoint = route.path if route else request.url.path
+    metrics.observe_request(route.path if route else "unmatched", request.method, response.status_code, request_timer.total_ms() / 1000)
+    if timer[0]:
+        encoding.record_serialize(endpoint, timer[0])
+
+    # Streams (NDJSON, SSE) and report files pass through untouched
+    mimetype = response.headers.get("content-type", "").split(";")[0]
+    if "content-encoding" in response.headers or mimetype not in encoding.COMPRESSIBLE_MIMETYPES:
+        return response
+
+    data = b"".join([chunk async for chunk in response.body_iterator])
+    body, content_encoding = encoding.encode_response(endpoint, data, request.headers.get("accept-encoding"), mimetype)
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    if content_encoding:
+        headers["content-encoding"] = content_encoding
+        if "etag" in headers:
+            headers["etag"] = encoded_etag(headers["etag"], content_encoding)
+    headers["vary"] = ", ".join(filter(None, [headers.get("vary"), "Accept-Encoding"]))
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+def respond(result, if_none_match=None, accept_encoding=None):
+    """
+    Convert a (body, status) or (body, status, etag) tuple from a response
+    builder into a JSON response, or a bodiless 304 when the client's copy is current
+    (carrying the ETag the compressed 200 would have had)
+    """
+    body, status, etag = result if len(result) == 3 else (*result, None)
+    headers = {"etag": etag} if etag else None
+    if status == 304 or (status == 200 and etag_matches(if_none_match, etag)):
+        etag = server.not_modified_etag(body, etag, accept_encoding)
+        return Response(status_code=304, headers={"etag": etag} if etag else None)
+    started = time.perf_counter()
+    content = encoding.dumps(body)
+    timer = _serialize_ms.get()
+    if timer is not None:
+        timer[0] += (time.perf_counter() - started) * 1000
+    return Response(content=content, media_type="application/json", status_code=status, headers=headers)
+
+
+async def read_json(request):
+    """Return the request JSON body, or None if it is missing or invalid"""
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+async def current_user(request: Request):
+    """Dependency that resolves the authenticated user ID from the Bearer token"""
+    current_user_id, error = server.decode_token(request.headers.get('Authorization'))
+    if error:
+        body, status = error
+        raise HTTPException(status_code=status, detail=body)
+    return current_user_id
+
+
+@app.exception_handler(HTTPException)
+async def http_exception_handler(request, exc):
+    """Return error bodies in the same shape as the Flask server"""
+    body = exc.detail if isinstance(exc.detail, dict) else {"error": exc.detail}
+    return JSONResponse(content=body, status_code=exc.status_code)
+
+
+@app.get("/")
+async def home():
+    """Health check endpoint"""
+    return {
+        "status": "success",
+        "message": "Pharma Mind Nexus API is running",
+        "mode": "async",
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics for this worker process"""
+    executor = get_executor()
+    extra = [
+        metrics.render_samples("async_worker_queue_depth", "Blocking calls waiting for an async-server worker thread", "gauge", [
+            ((), executor._work_queue.qsize())
+        ])
+    ]
+    return Response(content=server.metrics_text(extra), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/metrics/mongo-pool")
+async def mongo_pool_metrics():
+    """MongoDB connection pool usage for this worker process"""
+    return respond(({"pool": server.get_pool_metrics(), "timestamp": datetime.now().isoformat()}, 200))
+
+
+@app.get("/api/metrics/cache")
+async def cache_metrics():
+    """Response and user profile cache counters for this worker process"""
+    return respond(({
+        "cache": server.get_cache_metrics(),
+        "user_profiles": server.get_profile_cache_metrics(),
+        "timestamp": datetime.now().isoformat()
+    }, 200))
+
+
+@app.get("/api/metrics/single-flight")
+async def single_flight_metrics():
+    """Upstream call coalescing counters, in-flight waiters and rate limit waits for this worker process"""
+    return respond(({
+        "single_flight": server.get_single_flight_metrics(),
+        "throttles": server.get_throttle_metrics(),
+        "http": server.get_http_metrics(),
+        "timestamp": datetime.now().isoformat()
+    }, 200))
+
+
+@app.get("/api/metrics/admission")
+async def admission_metrics():
+    """Rate limit decisions, shed requests and load signals for this worker process"""
+    return respond(({"admission": server.get_admission_metrics(), "timestamp": datetime.now().isoformat()}, 200))
+
+
+@app.get("/api/metrics/password-pool")
+async def password_pool_metrics():
+    """Password hashing pool queue depth and outcomes for this worker process"""
+    return respond(({"password_pool": server.get_password_pool_metrics(), "timestamp": datetime.now().isoformat()}, 200))
+
+
+@app.get("/api/metrics/report-jobs")
+async def report_job_metrics():
+    """Report job queue depth and outcome counters for this worker process"""
+    return respond(({"report_jobs": server.get_report_job_metrics(), "timestamp": datetime.now().isoformat()}, 200))
+
+
+@app.get("/api/metrics/encoding")
+async def encoding_metrics():
+    """JSON serialization time and compression savings per endpoint for this worker process"""
+    return respond(({"encoding": encoding.get_encoding_metrics(), "timestamp": datetime.now().isoformat()}, 200))
+
+
+# Auth
+
+@app.post("/api/auth/signup")
+async def signup(request: Request):
+    """User signup endpoint"""
+    return respond(await run_blocking(server.signup_response, await read_json(request)))
+
+
+@app.post("/api/auth/signin")
+async def signin(request: Request):
+    """User signin endpoint"""
+    return respond(await run_blocking(server.signin_response, await read_json(request)))
+
+
+@app.get("/api/auth/me")
+async def get_user(current_user_id=Depends(current_user)):
+    """Get current user profile"""
+    return respond(await run_blocking(server.get_user_response, current_user_id))
+
+
+@app.put("/api/auth/me")
+async def update_user(request: Request, current_user_id=Depends(current_user)):
+    """Update current user profile"""
+    return respond(await run_blocking(server.update_user_response, current_user_id, await read_json(request)))
+
+
+# Agent endpoints
+
+@app.get("/api/exim")
+async def get_exim_data(request: Request):
+    """Get EXIM trade data"""
+    result = await run_blocking(server.etagged, server.exim_response, dict(request.query_params))
+    return respond(result, request.headers.get('if-none-match'), request.headers.get('accept-encoding'))
+
+
+@app.post("/api/exim/batch")
+async def get_exim_batch(request: Request):
+    """Get EXIM trade data for several HS codes"""
+    return respond(await run_blocking(server.exim_batch_response, await read_json(request)))
+
+
+@app.get("/api/trials")
+async def get_trials_data(request: Request):
+    """Get clinical trials data"""
+    result = await run_blocking(server.etagged, server.trials_response, dict(request.query_params))
+    return respond(result, request.headers.get('if-none-match'), request.headers.get('accept-encoding'))
+
+
+@app.get("/api/trials/mirror")
+async def get_trials_mirror_status():
+    """Size, freshness and last sync of the local ClinicalTrials.gov mirror"""
+    return respond(await run_blocking(server.trials_mirror_response))
+
+
+@app.post("/api/trials/batch")
+async def get_trials_batch(request: Request):
+    """Get clinical trials for several conditions"""
+    return respond(await run_blocking(server.trials_batch_response, await read_json(request)))
+
+
+@app.get("/api/iqvia")
+async def get_iqvia_data(request: Request):
+    """Get IQVIA market data"""
+    result = await run_blocking(server.etagged, server.iqvia_response, dict(request.query_params))
+    return respond(result, request.headers.get('if-none-match'), request.headers.get('accept-encoding'))
+
+
+@app.get("/api/patents")
+async def get_patent_data(request: Request):
+    """Get patent data"""
+    result = await run_blocking(server.etagged, server.patents_response, dict(request.query_params))
+    return respond(result, request.headers.get('if-none-match'), request.headers.get('accept-encoding'))
+
+
+@app.post("/api/patents/batch")
+async def get_patents_batch(request: Request):
+    """Run several patent searches"""
+    return respond(await run_blocking(server.patents_batch_response, await read_json(request)))
+
+
+@app.get("/api/web-intel")
+async def get_web_intel_data(request: Request):
+    """Get web intelligence data"""
+    result = await run_blocking(server.etagged, server.web_intel_response, dict(request.query_params))
+    return respond(result, request.headers.get('if-none-match'), request.headers.get('accept-encoding'))
+
+
+@app.get("/api/internal-docs")
+async def get_internal_docs(request: Request):
+    """Get internal documents"""
+    return respond(await run_blocking(server.internal_docs_response, dict(request.query_params)))
+
+
+@app.post("/api/master-agent")
+async def run_master_agent_endpoint(request: Request):
+    """Run the master agent with a query"""
+    return respond(await run_blocking(server.master_agent_response, await read_json(request)))
+
+
+# Fan-out search
+
+async def _search_events(request):
+    """Validate a search request and return its event generator"""
+    data = await read_json(request)
+    try:
+        query, sections, deadline = server.parse_search_request(data)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail={"error": str(ve)})
+    return server.iter_search_events(query, sections, deadline, data.get('params'))
+
+
+@app.post("/api/search")
+async def search_all(request: Request):
+    """Run all agent sections in parallel and return whatever finished before the deadline"""
+    events = await _search_events(request)
+    return respond((await run_blocking(server.collect_search_results, events), 200))
+
+
+@app.post("/api/search/stream")
+async def search_stream(request: Request):
+    """Stream each agent section as soon as it is ready (NDJSON, or SSE on request)"""
+    events = await _search_events(request)
+    use_sse = 'text/event-stream' in request.headers.get('accept', '')
+
+    async def generate():
+        while True:
+            event = await run_blocking(next, events, None)
+            if event is None:
+                break
+            payload = encoding.dumps(event).decode("utf-8")
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+            else:
+                yield payload + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream' if use_sse else 'application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Reports
+
+@app.post("/api/generate-report")
+async def generate_report(request: Request):
+    """Queue report generation from collected data"""
+    # Authentication is optional here; a valid token attributes the report to its user
+    current_user_id, _ = server.decode_token(request.headers.get('Authorization'))
+    return respond(await run_blocking(server.generate_report_response, await read_json(request), current_user_id))
+
+
+@app.get("/api/reports/jobs/{job_id}")
+async def get_report_job(job_id: str):
+    """Get the status of a report generation job"""
+    return respond(await run_blocking(server.report_job_response, job_id))
+
+
+@app.get("/api/reports")
+async def list_reports(request: Request, current_user_id=Depends(current_user)):
+    """List the current user's reports (paginated)"""
+    return respond(await run_blocking(server.list_reports_response, current_user_id, dict(request.query_params)))
+
+
+@app.get("/api/reports/{report_id}")
+async def get_report(report_id: str, request: Request):
+    """Retrieve a stored report by ID"""
+    result = await run_blocking(server.get_report_response, report_id, request.headers.get('if-none-match'))
+    return respond(result, accept_encoding=request.headers.get('accept-encoding'))
+
+
+@app.get("/api/reports/{report_id}/download")
+async def download_report(report_id: str, request: Request):
+    """Download a stored report by ID"""
+    body, status, etag = await run_blocking(
+        server.download_report_response, report_id, request.headers.get('range'), request.headers.get('if-none-match')
+    )
+    if isinstance(body, server.ReportFile):
+        # Starlette iterates the synchronous chunk iterator in its own thread pool
+        return StreamingResponse(
+            body.content,
+            status_code=status,
+            media_type=body.mimetype,
+            headers=server.report_file_headers(body, etag)
+        )
+    return respond((body, status, etag), accept_encoding=request.headers.get('accept-encoding'))
+
+
+if __name__ == '__main__':
+    import uvicorn
+    print(f"Starting Pharma Mind Nexus async API server on port {server.PORT}")
+    uvicorn.run(app, host='0.0.0.0', port=server.PORT)
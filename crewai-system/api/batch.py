@@ -0,0 +1,121 @@
+"""
+Batch variants of the per-item query endpoints
+
+A batch request carries a list of queries plus optional filters shared by
+every item. Items run through the same response builders (and so the same
+response cache, single-flight coalescing and upstream sessions) as the
+single-item endpoints, on the shared fan-out executor with a per-batch cap
+on how many run at once. Results come back keyed by item, with failures
+reported per item instead of failing the whole batch.
+"""
+import os
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+from api import fanout
+
+# Load environment variables
+load_dotenv()
+
+# Most queries accepted in one batch request
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 50))
+
+# Items of one batch running at once
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+
+
+def parse_batch_items(data, primary, shared=()):
+    """
+    Validate a batch request body and build per-item parameters
+
+    Each entry of "queries" is either a string (the primary parameter) or a
+    dict of parameters with an optional "key". Top-level fields named in
+    ``shared`` apply to every item unless the item sets them itself.
+
+    Args:
+        data (dict): Request JSON, e.g. {"queries": ["asthma", ...], "top_n": 5}
+        primary (str): Parameter a plain-string query maps to (e.g. "condition")
+        shared (tuple): Top-level parameter names applied to every item
+
+    Returns:
+        dict: Item key -> parameters, in request order
+
+    Raises:
+        ValueError: If the body is malformed or the batch is too large
+    """
+    queries = (data or {}).get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise ValueError("queries must be a non-empty list")
+    if len(queries) > BATCH_MAX_ITEMS:
+        raise ValueError(f"A batch may contain at most {BATCH_MAX_ITEMS} queries")
+
+    common = {name: data[name] for name in shared if data.get(name) not in (None, "")}
+    items = {}
+    for query in queries:
+        if isinstance(query, (str, int)):
+            query = {primary: str(query)}
+        if not isinstance(query, dict):
+            raise ValueError("Each query must be a string or an object")
+        params = dict(common)
+        params.update({k: v for k, v in query.items() if k != "key"})
+        key = str(query.get("key") or params.get(primary) or "").strip()
+        if not key:
+            raise ValueError(f"Each query needs a {primary} or a key")
+        items[key] = params
+    return items
+
+
+def run_batch(items, builder, concurrency=BATCH_CONCURRENCY):
+    """
+    Run a response builder for every item with bounded parallelism
+
+    Args:
+        items (dict): Item key -> parameters
+        builder (callable): Response builder taking params, returning (body, status)
+        concurrency (int): Items running at once
+
+    Returns:
+        dict: Item key -> (body, status); exceptions become 500 outcomes
+    """
+    outcomes = {}
+    queue = list(items.items())
+    running = {}
+    while queue or running:
+        while queue and len(running) < concurrency:
+            key, params = queue.pop(0)
+            running[fanout.submit(lambda p=params: builder(p))] = key
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            key = running.pop(future)
+            try:
+                outcomes[key] = future.result()
+            except Exception as e:
+                outcomes[key] = ({"error": str(e)}, 500)
+    return outcomes
+
+
+def batch_body(outcomes, started):
+    """
+    Build a batch response body from per-item outcomes
+
+    Args:
+        outcomes (dict): Item key -> (body, status)
+        started (float): time.perf_counter() when the batch started
+
+    Returns:
+        dict: {"results", "errors", "count", "elapsed_ms"}
+    """
+    results = {}
+    errors = {}
+    for key, (body, status) in outcomes.items():
+        if status >= 400:
+            errors[key] = (body or {}).get("error", f"HTTP {status}")
+        else:
+            results[key] = body
+    return {
+        "results": results,
+        "errors": errors,
+        "count": len(outcomes),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,199 @@
+"""
+Fast JSON serialization and negotiated response compression
+
+Bodies are serialized with orjson when it is installed (falling back to the
+standard library) and compressed with brotli or gzip when the client's
+Accept-Encoding allows it and the body is large enough to be worth it.
+Per-endpoint counters record bytes and time so the savings can be checked
+at /api/metrics/encoding.
+"""
+import os
+import gzip
+import json
+import threading
+import time
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Load environment variables
+load_dotenv()
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/plain", "text/html", "text/csv")
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def dumps(body):
+    """
+    Serialize a response body to JSON bytes
+
+    Args:
+        body: JSON-serializable value; unknown types (ObjectId, etc.) become strings
+
+    Returns:
+        bytes: UTF-8 JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(body, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the standard library handles these
+            pass
+    return json.dumps(body, default=str).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the best supported content encoding the client accepts
+
+    The encoding with the highest q-value wins; ties go to brotli.
+
+    Args:
+        accept_encoding (str): Value of the Accept-Encoding header
+
+    Returns:
+        str: "br", "gzip" or None for no compression
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    # In order of preference, for breaking ties
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def choose_encoding(size, accept_encoding, mimetype="application/json"):
+    """
+    Get the content encoding a body of this size would be sent with
+
+    Args:
+        size (int): Uncompressed body size in bytes
+        accept_encoding (str): Value of the Accept-Encoding header
+        mimetype (str): Response media type
+
+    Returns:
+        str: "br", "gzip" or None if the body is sent uncompressed
+    """
+    if size < COMPRESS_MIN_BYTES or (mimetype or "").split(";")[0] not in COMPRESSIBLE_MIMETYPES:
+        return None
+    return negotiate_encoding(accept_encoding)
+
+
+def compress(data, accept_encoding, mimetype="application/json"):
+    """
+    Compress a body if the client accepts it and it is worth compressing
+
+    Args:
+        data (bytes): Uncompressed body
+        accept_encoding (str): Value of the Accept-Encoding header
+        mimetype (str): Response media type
+
+    Returns:
+        tuple: (body bytes, content encoding or None)
+    """
+    encoding = choose_encoding(len(data), accept_encoding, mimetype)
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY), encoding
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL), encoding
+    return data, None
+
+
+def _endpoint_stats(endpoint):
+    return _stats.setdefault(endpoint, {
+        "responses": 0,
+        "serialize_ms": 0.0,
+        "compressed": 0,
+        "compress_ms": 0.0,
+        "bytes_raw": 0,
+        "bytes_sent": 0
+    })
+
+
+def record_serialize(endpoint, elapsed_ms):
+    """Add JSON serialization time for a response from an endpoint"""
+    with _lock:
+        _endpoint_stats(endpoint)["serialize_ms"] += elapsed_ms
+
+
+def record_response(endpoint, raw_size, sent_size, encoding=None, compress_ms=0.0):
+    """Add the raw and sent sizes of a response from an endpoint"""
+    with _lock:
+        stats = _endpoint_stats(endpoint)
+        stats["responses"] += 1
+        stats["bytes_raw"] += raw_size
+        stats["bytes_sent"] += sent_size
+        if encoding:
+            stats["compressed"] += 1
+            stats["compress_ms"] += compress_ms
+
+
+def encode_response(endpoint, data, accept_encoding, mimetype="application/json"):
+    """
+    Compress a response body and record its sizes for an endpoint
+
+    Args:
+        endpoint (str): Route pattern, e.g. "/api/trials"
+        data (bytes): Uncompressed body
+        accept_encoding (str): Value of the Accept-Encoding header
+        mimetype (str): Response media type
+
+    Returns:
+        tuple: (body bytes, content encoding or None)
+    """
+    started = time.perf_counter()
+    body, encoding = compress(data, accept_encoding, mimetype)
+    record_response(endpoint, len(data), len(body), encoding, (time.perf_counter() - started) * 1000)
+    return body, encoding
+
+
+def get_encoding_metrics():
+    """
+    Get serialization and compression savings per endpoint for this process
+
+    Returns:
+        dict: Serializer/compressor availability and per-endpoint counters
+    """
+    with _lock:
+        endpoints = {name: dict(values) for name, values in _stats.items()}
+    for stats in endpoints.values():
+        stats["bytes_saved"] = stats["bytes_raw"] - stats["bytes_sent"]
+        stats["compression_ratio"] = round(stats["bytes_sent"] / stats["bytes_raw"], 4) if stats["bytes_raw"] else 1.0
+        stats["serialize_ms"] = round(stats["serialize_ms"], 3)
+        stats["compress_ms"] = round(stats["compress_ms"], 3)
+    return {
+        "serializer": "orjson" if orjson is not None else "json",
+        "encodings": ["br", "gzip"] if brotli is not None else ["gzip"],
+        "min_bytes": COMPRESS_MIN_BYTES,
+        "endpoints": endpoints
+    }
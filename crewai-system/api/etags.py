@@ -0,0 +1,76 @@
+"""
+Strong ETags and If-None-Match handling
+
+ETags are content hashes: stored with each report when it is saved, and
+taken from the response cache entry for agent responses. A compressed
+response gets the content coding appended to its ETag (e.g. "abc-gzip"),
+since a strong validator must differ between encodings; the suffix is
+ignored when comparing against If-None-Match.
+"""
+
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(digest, variant=None):
+    """
+    Build a quoted strong ETag from a content digest
+
+    Args:
+        digest (str): Hex digest of the representation
+        variant (str): Optional suffix distinguishing representations of the
+                       same content (e.g. "meta" for report metadata)
+
+    Returns:
+        str: ETag header value, or None if there is no digest
+    """
+    if not digest:
+        return None
+    return f'"{digest}-{variant}"' if variant else f'"{digest}"'
+
+
+def encoded_etag(etag, content_encoding):
+    """
+    Return the ETag of a compressed representation
+
+    Args:
+        etag (str): ETag of the uncompressed response
+        content_encoding (str): "br" or "gzip"
+
+    Returns:
+        str: ETag with the content coding appended
+    """
+    if not etag or not content_encoding or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{content_encoding}"'
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against a response ETag
+
+    Uses the weak comparison RFC 7232 prescribes for If-None-Match.
+
+    Args:
+        if_none_match (str): Value of the If-None-Match header (may be None)
+        etag (str): ETag of the current representation
+
+    Returns:
+        bool: True if the client's copy is current (respond 304)
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = _opaque(etag)
+    return any(_opaque(tag) == current for tag in if_none_match.split(","))
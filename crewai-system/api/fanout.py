@@ -0,0 +1,143 @@
+"""
+Bounded parallel fan-out of agent calls with per-task deadlines
+"""
+import os
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Maximum number of agent calls running at once across all fanned-out requests
+MAX_WORKERS = int(os.environ.get("FANOUT_MAX_WORKERS", 16))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "queued": 0,
+    "active": 0,
+    "completed": 0,
+    "failed": 0,
+    "timed_out": 0
+}
+
+
+def get_executor():
+    """
+    Return the shared fan-out executor, creating it on first use in this process
+
+    Returns:
+        ThreadPoolExecutor: Bounded executor for agent calls
+    """
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fanout")
+            _executor_pid = pid
+    return _executor
+
+
+def _count(key, delta):
+    with _stats_lock:
+        _stats[key] += delta
+
+
+def _tracked(fn):
+    """Wrap a task so queue depth and active counts are kept up to date"""
+    def run():
+        _count("queued", -1)
+        _count("active", 1)
+        try:
+            return fn()
+        finally:
+            _count("active", -1)
+    return run
+
+
+def submit(fn):
+    """
+    Submit a callable to the shared executor
+
+    The call runs in a copy of the caller's context, so it reports timing
+    spans into the caller's request.
+
+    Args:
+        fn (callable): Zero-argument callable
+
+    Returns:
+        Future: Future for the call
+    """
+    _count("queued", 1)
+    future = get_executor().submit(contextvars.copy_context().run, _tracked(fn))
+    # A cancelled future never runs, so release its queue slot here
+    future.add_done_callback(lambda f: _count("queued", -1) if f.cancelled() else None)
+    return future
+
+
+def iter_fanout(tasks, deadline):
+    """
+    Run tasks in parallel and yield each outcome as soon as it is known
+
+    Each task gets its own time budget, capped by the overall deadline.
+    Tasks that miss their budget are reported as timed out; if they have
+    not started yet they are cancelled, otherwise their thread finishes in
+    the background and the result is discarded.
+
+    Args:
+        tasks (dict): Task name -> (callable, budget in seconds)
+        deadline (float): Overall deadline in seconds
+
+    Yields:
+        dict: {"name", "status" ("ok", "error" or "timeout"), "elapsed_ms",
+               and "result" or "error"}
+    """
+    started = time.perf_counter()
+    pending = {}
+    for name, (fn, budget) in tasks.items():
+        pending[submit(fn)] = (name, started + min(budget, deadline))
+
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    while pending:
+        now = time.perf_counter()
+        for future in [f for f, (_, due) in pending.items() if due <= now and not f.done()]:
+            name, _ = pending.pop(future)
+            future.cancel()
+            _count("timed_out", 1)
+            yield {"name": name, "status": "timeout", "elapsed_ms": elapsed_ms()}
+
+        if not pending:
+            break
+
+        next_due = min(due for _, due in pending.values())
+        done, _ = wait(list(pending), timeout=max(0, next_due - time.perf_counter()), return_when=FIRST_COMPLETED)
+        for future in done:
+            name, _ = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                _count("failed", 1)
+                yield {"name": name, "status": "error", "error": str(e), "elapsed_ms": elapsed_ms()}
+            else:
+                _count("completed", 1)
+                yield {"name": name, "status": "ok", "result": result, "elapsed_ms": elapsed_ms()}
+
+
+def get_fanout_metrics():
+    """
+    Get executor usage counters for this process
+
+    Returns:
+        dict: Worker limit, queue depth, active tasks and outcome counts
+    """
+    with _stats_lock:
+        metrics = dict(_stats)
+    metrics["max_workers"] = MAX_WORKERS
+    return metrics
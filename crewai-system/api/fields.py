@@ -0,0 +1,48 @@
+"""
+Sparse field selection (``fields=``) for agent endpoints
+"""
+
+
+def parse_fields(value, allowed):
+    """
+    Parse a comma-separated fields parameter
+
+    Args:
+        value (str): Raw parameter value (e.g. "nct_id,title,status"), may be empty
+        allowed (iterable): Field names the endpoint can return
+
+    Returns:
+        list: Requested field names in request order, or None when not given
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    fields = []
+    for name in value:
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return fields or None
+
+
+def select_fields(records, fields):
+    """
+    Keep only the requested fields of each record
+
+    Args:
+        records (list): Records (dicts)
+        fields (list): Field names to keep, or None to keep everything
+
+    Returns:
+        list: Trimmed records
+    """
+    if not fields:
+        return records
+    return [{name: record[name] for name in fields if name in record} for record in records]
@@ -0,0 +1,66 @@
+"""
+Opaque continuation tokens for paginated endpoints
+"""
+import base64
+import json
+
+
+def encode_cursor(position):
+    """
+    Encode a pagination position as an opaque, URL-safe token
+
+    Args:
+        position (dict): JSON-serializable position (e.g. last sort key seen)
+
+    Returns:
+        str: Continuation token
+    """
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a continuation token produced by encode_cursor
+
+    Args:
+        token (str): Continuation token
+
+    Returns:
+        dict: Pagination position
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def parse_page_size(value, default=20, maximum=100):
+    """
+    Parse a page size parameter, clamped to [1, maximum]
+
+    Args:
+        value: Raw parameter value (may be None)
+        default (int): Page size when none is given
+        maximum (int): Largest allowed page size
+
+    Returns:
+        int: Page size
+
+    Raises:
+        ValueError: If the value is not an integer
+    """
+    if value in (None, ""):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(size, maximum))
@@ -0,0 +1,159 @@
+"""
+Bounded worker pool for bcrypt password hashing
+
+bcrypt is deliberately slow, so signup and signin hand hashing to a small,
+dedicated process pool instead of running it on the request thread. A
+queue limit provides admission control: once PASSWORD_QUEUE_LIMIT hashes
+are pending, new auth requests are rejected straight away rather than
+piling up behind a login burst and starving the research endpoints.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from dotenv import load_dotenv
+
+from telemetry.timing import span
+
+# Load environment variables
+load_dotenv()
+
+# Processes hashing passwords at once
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", 2))
+
+# Hashes allowed to be pending (running or waiting) before requests are rejected
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", 32))
+
+# Longest a request waits for its hash before giving up
+PASSWORD_TIMEOUT_S = float(os.environ.get("PASSWORD_TIMEOUT_S", 10))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool is saturated or too slow to answer"""
+
+
+def _hash(password):
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordPool:
+    """Process pool for bcrypt with a bounded number of pending hashes"""
+
+    def __init__(self, workers=PASSWORD_WORKERS, queue_limit=PASSWORD_QUEUE_LIMIT, timeout=PASSWORD_TIMEOUT_S):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._stats = {"pending": 0, "completed": 0, "rejected": 0, "timed_out": 0, "failed": 0}
+
+    def _get_executor(self):
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = pid
+            return self._executor
+
+    def _release(self, future):
+        """Done callback: the hash has left the pool (finished, failed or cancelled)"""
+        with self._lock:
+            self._stats["pending"] -= 1
+
+    def _run(self, operation, fn, *args):
+        with self._lock:
+            if self._stats["pending"] >= self.queue_limit:
+                self._stats["rejected"] += 1
+                raise PasswordPoolBusy(f"Password hashing queue is full ({self.queue_limit} pending)")
+            self._stats["pending"] += 1
+
+        outcome = "failed"
+        future = None
+        try:
+            with span(f"auth.{operation}"):
+                future = self._get_executor().submit(fn, *args)
+                # pending counts work still in the pool, not callers still waiting,
+                # so a hash that outlives its caller keeps its slot until it finishes
+                future.add_done_callback(self._release)
+                result = future.result(timeout=self.timeout)
+            outcome = "completed"
+            return result
+        except FutureTimeoutError:
+            outcome = "timed_out"
+            # Drop the hash if it has not started yet
+            future.cancel()
+            raise PasswordPoolBusy(f"Password hashing took longer than {self.timeout}s")
+        except BrokenProcessPool:
+            # A crashed worker breaks the whole pool; start a fresh one for later calls
+            with self._lock:
+                self._executor = None
+            raise
+        finally:
+            with self._lock:
+                if future is None:
+                    # submit() failed, so no callback will release the slot
+                    self._stats["pending"] -= 1
+                self._stats[outcome] += 1
+
+    def hash_password(self, password):
+        """
+        Hash a password with a fresh salt
+
+        Args:
+            password (str): Plain-text password
+
+        Returns:
+            bytes: bcrypt hash
+
+        Raises:
+            PasswordPoolBusy: If the pool is saturated or times out
+        """
+        return self._run("hash", _hash, password.encode('utf-8'))
+
+    def check_password(self, password, hashed):
+        """
+        Check a password against a stored bcrypt hash
+
+        Args:
+            password (str): Plain-text password
+            hashed (bytes): Stored hash
+
+        Returns:
+            bool: True if the password matches
+
+        Raises:
+            PasswordPoolBusy: If the pool is saturated or times out
+        """
+        return self._run("check", _check, password.encode('utf-8'), bytes(hashed))
+
+    def stats(self):
+        """
+        Get pool usage counters for this process
+
+        Returns:
+            dict: Pending hashes, outcomes and limits
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        stats["queue_limit"] = self.queue_limit
+        return stats
+
+
+password_pool = PasswordPool()
+
+
+def get_password_pool_metrics():
+    """
+    Get metrics for the process-wide password hashing pool
+
+    Returns:
+        dict: Pool metrics
+    """
+    return password_pool.stats()
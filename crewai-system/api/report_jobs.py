@@ -0,0 +1,291 @@
+"""
+Background job queue for report generation
+
+POST /api/generate-report only validates the request and enqueues a job.
+A small pool of dispatcher threads picks jobs up in order, hands the
+CPU-bound rendering (fpdf/matplotlib/openpyxl) to a process pool and then
+stores the finished report in MongoDB. Job state lives in the report_jobs
+collection so any API worker can answer GET /api/reports/jobs/<id>.
+"""
+import os
+import hashlib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from db.connection import get_mongo_client
+from db.report_files import upload_report_file, delete_report_file
+
+# Load environment variables
+load_dotenv()
+
+# Reports rendered at once (one process each)
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 2))
+
+# Jobs allowed to wait for a worker before new requests are rejected
+REPORT_QUEUE_LIMIT = int(os.environ.get("REPORT_QUEUE_LIMIT", 20))
+
+# How long finished job records are kept
+REPORT_JOB_TTL_HOURS = int(os.environ.get("REPORT_JOB_TTL_HOURS", 24))
+
+REPORT_TYPES = ("text", "pdf", "excel")
+
+
+class QueueFullError(Exception):
+    """Raised when the report queue is at its limit"""
+
+
+def render_report(query, results, report_type):
+    """
+    Render a report; runs inside a report worker process
+
+    Args:
+        query (str): Query the results belong to
+        results (dict): Non-empty result sections
+        report_type (str): "text", "pdf" or "excel"
+
+    Returns:
+        dict: {"filepath": path} for file reports or {"summary": text}
+    """
+    from reports import report_generator
+
+    if report_type == "pdf":
+        return {"filepath": report_generator.generate_pdf_report(query, results)}
+    if report_type == "excel":
+        return {"filepath": report_generator.generate_excel_report(query, results)}
+    return {"summary": report_generator.generate_text_summary(query, results)}
+
+
+def store_report(query, results, report_type, user_id, rendered, database_name="pharma_hub"):
+    """
+    Store a rendered report in MongoDB
+
+    Args:
+        query (str): Query the results belong to
+        results (dict): Non-empty result sections
+        report_type (str): "text", "pdf" or "excel"
+        user_id (str): ID of the requesting user, if any
+        rendered (dict): Output of render_report
+        database_name (str): Name of the database
+
+    Returns:
+        dict: Response body describing the stored report
+    """
+    filepath = rendered.get("filepath")
+    summary = rendered.get("summary")
+    if not filepath and not summary:
+        raise ValueError("Invalid report type or missing data")
+
+    report_id = str(uuid.uuid4())
+    report_record = {
+        "report_id": report_id,
+        "query": query,
+        "report_type": report_type,
+        "file_path": filepath,
+        "generated_at": datetime.now().isoformat(),
+        "generated_by": user_id,
+        "metadata": {
+            "sections": list(results.keys()),
+            "data_points": sum(len(v) if isinstance(v, list) else 1 for v in results.values())
+        }
+    }
+
+    if filepath:
+        # Stream the file into GridFS; the report document only references it
+        file_id, file_size, content_hash = upload_report_file(
+            filepath,
+            f"report_{report_id}.{report_type}",
+            metadata={"report_id": report_id, "report_type": report_type},
+            database_name=database_name
+        )
+        report_record["file_id"] = file_id
+        report_record["file_size"] = file_size
+    else:
+        report_record["text_summary"] = summary
+        content_hash = hashlib.sha256(summary.encode("utf-8")).hexdigest()
+    # Reports never change once stored, so the content hash is their ETag
+    report_record["content_hash"] = content_hash
+
+    try:
+        get_mongo_client()[database_name]["reports"].insert_one(report_record)
+    except Exception:
+        if filepath:
+            delete_report_file(file_id, database_name)
+        raise
+    print(f"Report {report_id} stored ({report_type})")
+
+    if filepath:
+        return {
+            "report_id": report_id,
+            "query": query,
+            "report_type": report_type,
+            "message": f"{'PDF' if report_type == 'pdf' else 'Excel'} report generated successfully",
+            "download_url": f"/api/reports/{report_id}/download"
+        }
+    return {
+        "query": query,
+        "summary": summary,
+        "report_id": report_id,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+class ReportJobQueue:
+    """Bounded queue of report jobs rendered on a process pool"""
+
+    def __init__(self, workers=REPORT_WORKERS, queue_limit=REPORT_QUEUE_LIMIT, database_name="pharma_hub"):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.database_name = database_name
+        self._lock = threading.Lock()
+        self._pid = None
+        self._dispatcher = None
+        self._processes = None
+        self._indexed = False
+        self._stats = {"queued": 0, "running": 0, "submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def _collection(self):
+        collection = get_mongo_client()[self.database_name]["report_jobs"]
+        if not self._indexed:
+            collection.create_index("job_id", unique=True)
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def _pools(self):
+        """Return (dispatcher threads, render processes), recreating them after a fork"""
+        pid = os.getpid()
+        with self._lock:
+            if self._pid != pid:
+                self._dispatcher = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-jobs")
+                self._processes = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = pid
+            return self._dispatcher, self._processes
+
+    def _reset_processes(self):
+        with self._lock:
+            self._processes = ProcessPoolExecutor(max_workers=self.workers)
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = datetime.now().isoformat()
+        self._collection().update_one({"job_id": job_id}, {"$set": fields})
+
+    def submit(self, query, results, report_type, user_id=None):
+        """
+        Enqueue a report job
+
+        Args:
+            query (str): Query the results belong to
+            results (dict): Non-empty result sections
+            report_type (str): "text", "pdf" or "excel"
+            user_id (str): ID of the requesting user, if any
+
+        Returns:
+            str: Job ID
+
+        Raises:
+            QueueFullError: If queue_limit jobs are already waiting
+        """
+        with self._lock:
+            if self._stats["queued"] >= self.queue_limit:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Report queue is full ({self.queue_limit} jobs waiting)")
+            self._stats["queued"] += 1
+            self._stats["submitted"] += 1
+
+        job_id = str(uuid.uuid4())
+        now = datetime.now()
+        try:
+            self._collection().insert_one({
+                "job_id": job_id,
+                "status": "queued",
+                "stage": "queued",
+                "progress": 0,
+                "query": query,
+                "report_type": report_type,
+                "generated_by": user_id,
+                "created_at": now.isoformat(),
+                "updated_at": now.isoformat(),
+                "result": None,
+                "error": None,
+                "expires_at": now + timedelta(hours=REPORT_JOB_TTL_HOURS)
+            })
+            dispatcher, _ = self._pools()
+            dispatcher.submit(self._run, job_id, query, results, report_type, user_id)
+        except Exception:
+            self._count("queued", -1)
+            raise
+        return job_id
+
+    def _run(self, job_id, query, results, report_type, user_id):
+        self._count("queued", -1)
+        self._count("running", 1)
+        try:
+            self._update(job_id, status="running", stage="rendering", progress=10)
+            _, processes = self._pools()
+            try:
+                rendered = processes.submit(render_report, query, results, report_type).result()
+            except BrokenProcessPool:
+                # A crashed worker poisons the whole pool; replace it for later jobs
+                self._reset_processes()
+                raise
+
+            self._update(job_id, stage="storing", progress=80)
+            body = store_report(query, results, report_type, user_id, rendered, self.database_name)
+
+            self._update(job_id, status="completed", stage="done", progress=100, result=body)
+            self._count("completed")
+        except Exception as e:
+            print(f"Error generating report for job {job_id}: {str(e)}")
+            self._count("failed")
+            try:
+                self._update(job_id, status="failed", stage="done", error=f"Failed to generate report: {str(e)}")
+            except Exception as update_error:
+                print(f"Error recording failure for job {job_id}: {str(update_error)}")
+        finally:
+            self._count("running", -1)
+
+    def get(self, job_id):
+        """
+        Get a job's status document
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            dict: Job status, or None if the job does not exist
+        """
+        return self._collection().find_one({"job_id": job_id}, {"_id": 0, "expires_at": 0})
+
+    def stats(self):
+        """
+        Get queue depth and outcome counters for this process
+
+        Returns:
+            dict: Queue metrics
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers
+        stats["queue_limit"] = self.queue_limit
+        return stats
+
+
+report_jobs = ReportJobQueue()
+
+
+def get_report_job_metrics():
+    """
+    Get metrics for the process-wide report job queue
+
+    Returns:
+        dict: Queue metrics
+    """
+    return report_jobs.stats()
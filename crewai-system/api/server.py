@@ -2,69 +2,338 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 import json
+import contextvars
 from datetime import datetime
 from functools import wraps
 import jwt
-import bcrypt
-from pymongo import MongoClient
 from bson.objectid import ObjectId
-from bson.binary import Binary
-import uuid
+from pymongo import ReturnDocument
+from collections import namedtuple
+import time
 
+# Import shared MongoDB connection manager
+from db.connection import get_mongo_client, get_pool_metrics
+from db.report_files import iter_report_file, parse_range
+from api import fanout
+from api import encoding
+from api import batch
+from api.fields import parse_fields, select_fields
+from api.etags import make_etag, encoded_etag, etag_matches
+from telemetry import timing
+from telemetry import metrics
+from api.pagination import encode_cursor, decode_cursor, parse_page_size
+from cache.response_cache import response_cache, get_cache_metrics, served_etag
+from cache.profile_cache import user_profiles, get_profile_cache_metrics
+from data_sources.single_flight import get_single_flight_metrics
+from data_sources.throttle import get_throttle_metrics
+from data_sources.http_client import get_http_metrics, get_waiting_requests
+from data_sources import clinicaltrials_mirror
+from api.report_jobs import report_jobs, get_report_job_metrics, QueueFullError, REPORT_TYPES
+from api.password_hashing import password_pool, get_password_pool_metrics, PasswordPoolBusy
+from api.admission import admit, load_shedder, get_admission_metrics, SHED_FANOUT_QUEUE, SHED_UPSTREAM_IN_FLIGHT, SHED_UPSTREAM_WAITING
 # Import agents
 from agents import exim_agent, trials_agent, iqvia_agent, patent_agent, webintel_agent, internal_agent
-from reports import report_generator
 # Import the master agent from local_langchain instead of langchain
 from local_langchain.master_agent import run_master_agent
 
 # Load environment variables
 load_dotenv()
 
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() provider that serializes with orjson when it is installed"""
+
+    def dumps(self, obj, **kwargs):
+        return encoding.dumps(obj).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        data = encoding.dumps(obj)
+        encoding.record_serialize(endpoint_name(), (time.perf_counter() - started) * 1000)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
+def endpoint_name():
+    """Route pattern of the current request (e.g. /api/reports/<report_id>)"""
+    return request.url_rule.rule if request.url_rule else request.path
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # Enable CORS for all routes
 
+@app.before_request
+def start_request_timer():
+    """Start the request-scoped timing context"""
+    g.request_timer, g.request_timer_token = timing.start_request()
+
+@app.before_request
+def admission_control():
+    """Reject agent requests over their client's rate limit (429) or while overloaded (503)"""
+    rejection = admit(client_key(request.headers.get('Authorization'), request.remote_addr), request.path, request.method)
+    if rejection:
+        body, status, retry_after = rejection
+        response = jsonify(body)
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+@app.after_request
+def add_server_timing(response):
+    """Report the request's timing spans as a Server-Timing header"""
+    timer = g.get('request_timer')
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.server_timing()
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(route, request.method, response.status_code, timer.total_ms() / 1000)
+        timing.log_request(timer, request.method, request.path, response.status_code)
+    return response
+
+@app.teardown_request
+def end_request_timer(exc):
+    """Detach the timing context from this thread"""
+    token = g.pop('request_timer_token', None)
+    if token is not None:
+        timing.end_request(token)
+
+@app.after_request
+def compress_response(response):
+    """Compress buffered JSON/text responses when the client accepts br or gzip"""
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+    data = response.get_data()
+    body, content_encoding = encoding.encode_response(
+        endpoint_name(), data, request.headers.get('Accept-Encoding'), response.mimetype
+    )
+    if content_encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = content_encoding
+        if 'ETag' in response.headers:
+            response.headers['ETag'] = encoded_etag(response.headers['ETag'], content_encoding)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def etagged(builder, *args):
+    """
+    Call a cached response builder and return the ETag of the entry it served
+
+    Args:
+        builder (callable): Builder decorated with response_cache.cached
+        *args: Arguments for the builder
+
+    Returns:
+        tuple: (response body, HTTP status, ETag or None)
+    """
+    context = contextvars.copy_context()
+    body, status = context.run(builder, *args)
+    etag = make_etag(context.run(served_etag)) if status == 200 else None
+    return body, status, etag
+
+def not_modified_etag(body, etag, accept_encoding):
+    """
+    Get the ETag for a 304: the one the 200 would have carried after compression
+
+    Args:
+        body (dict): Body the 200 would have had, or None if it is not JSON
+                     (e.g. a report file, which is never compressed)
+        etag (str): ETag of the uncompressed body
+        accept_encoding (str): The request's Accept-Encoding header
+
+    Returns:
+        str: Representation-specific ETag
+    """
+    if body is None or not etag:
+        return etag
+    return encoded_etag(etag, encoding.choose_encoding(len(encoding.dumps(body)), accept_encoding))
+
+def conditional_json(body, status, etag, if_none_match):
+    """
+    Build a JSON response carrying an ETag, or a bodiless 304 when the client's copy is current
+
+    Args:
+        body (dict): Response body
+        status (int): HTTP status
+        etag (str): ETag of the body, or None
+        if_none_match (str): The request's If-None-Match header
+
+    Returns:
+        Response: Flask response
+    """
+    if status == 304 or (status == 200 and etag_matches(if_none_match, etag)):
+        response = app.response_class(status=304)
+        etag = not_modified_etag(body, etag, request.headers.get('Accept-Encoding'))
+    else:
+        response = jsonify(body)
+        response.status_code = status
+    if etag:
+        response.headers['ETag'] = etag
+    return response
+
+# Shed agent requests when the fan-out executor backs up, too many upstream calls are in
+# flight or requests queue behind the per-host upstream concurrency limits
+load_shedder.add_signal("fanout_queue", lambda: fanout.get_fanout_metrics()["queued"], SHED_FANOUT_QUEUE)
+load_shedder.add_signal("upstream_in_flight", lambda: len(get_single_flight_metrics()["in_flight"]), SHED_UPSTREAM_IN_FLIGHT)
+load_shedder.add_signal("upstream_waiting", get_waiting_requests, SHED_UPSTREAM_WAITING)
+
 # Get port from environment or default to 4000
 PORT = int(os.environ.get("PORT", 4000))
 
 # JWT Secret
 JWT_SECRET = os.environ.get("JWT_SECRET", "change_this_secret")
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
+# Fields read when loading a user profile (the password hash is never fetched)
+USER_PROFILE_PROJECTION = {"name": 1, "email": 1, "role": 1}
+
+# Streamed report payload returned by download_report_response; content is
+# an iterator of byte chunks and content_range is set for partial responses
+ReportFile = namedtuple("ReportFile", ["content", "mimetype", "filename", "length", "content_range"])
+
+# Lightweight report metadata served by the read endpoints. Report binaries
+# live in GridFS (or, for old reports, in file_data) and are only read by the
+# download path.
+REPORT_METADATA_FIELDS = ["report_id", "query", "report_type", "generated_at", "generated_by", "metadata", "file_size"]
+REPORT_METADATA_PROJECTION = dict({field: 1 for field in REPORT_METADATA_FIELDS}, content_hash=1, _id=0)
+
+# What the download path needs to locate report content without loading it
+REPORT_DOWNLOAD_PROJECTION = {
+    "report_type": 1,
+    "query": 1,
+    "generated_at": 1,
+    "text_summary": 1,
+    "file_id": 1,
+    "file_size": 1,
+    "content_hash": 1,
+    "_id": 0
+}
+
+def report_metadata(report):
+    """
+    Build the metadata view of a report document
+
+    Args:
+        report (dict): Report document read with REPORT_METADATA_PROJECTION
+
+    Returns:
+        dict: Report metadata with every field present
+    """
+    return {field: report.get(field) for field in REPORT_METADATA_FIELDS}
+
+REPORT_MIMETYPES = {
+    "pdf": "application/pdf",
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+def user_profile(user):
+    """
+    Build the public profile of a user document (never includes the password)
+
+    Args:
+        user (dict): Document from the users collection
+
+    Returns:
+        dict: id, name, email and role
+    """
+    return {
+        "id": str(user['_id']),
+        "name": user['name'],
+        "email": user['email'],
+        "role": user.get('role', '')
+    }
+
+def issue_token(profile):
+    """
+    Create a JWT carrying the user's ID and profile claims
+
+    Args:
+        profile (dict): Output of user_profile
+
+    Returns:
+        str: Signed token
+    """
+    return jwt.encode({
+        'id': profile['id'],
+        'name': profile['name'],
+        'email': profile['email'],
+        'role': profile['role']
+    }, JWT_SECRET, algorithm="HS256")
+
+def decode_claims(auth_header):
+    """
+    Validate a Bearer Authorization header and return its claims
+
+    Args:
+        auth_header (str): Value of the Authorization header
+
+    Returns:
+        tuple: (claims, None) on success, (None, (error body, 401)) otherwise;
+               tokens issued before profile claims were added only carry "id"
+    """
+    token = None
+    if auth_header:
+        try:
+            parts = auth_header.split(' ')
+            if len(parts) == 2 and parts[0] == 'Bearer':
+                token = parts[1]
+        except:
+            pass
+    
+    if not token:
+        return None, ({'msg': 'Token is missing!'}, 401)
+    
+    try:
+        data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        if 'id' not in data:
+            raise ValueError("Token has no user ID")
+        return data, None
+    except:
+        return None, ({'msg': 'Token is invalid!'}, 401)
+
+def decode_token(auth_header):
+    """
+    Validate a Bearer Authorization header
+
+    Args:
+        auth_header (str): Value of the Authorization header
+
+    Returns:
+        tuple: (user ID, None) on success, (None, (error body, 401)) otherwise
+    """
+    claims, error = decode_claims(auth_header)
+    if error:
+        return None, error
+    return claims['id'], None
+
+def client_key(auth_header, remote_addr):
+    """
+    Identify the client a request is rate limited as
+
+    Args:
+        auth_header (str): Value of the Authorization header
+        remote_addr (str): Client address
+
+    Returns:
+        str: "user:<id>" for a valid Bearer token, else "ip:<address>"
+    """
+    if auth_header:
+        claims, error = decode_claims(auth_header)
+        if not error:
+            return f"user:{claims['id']}"
+    return f"ip:{remote_addr}"
 
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                parts = auth_header.split(' ')
-                if len(parts) == 2 and parts[0] == 'Bearer':
-                    token = parts[1]
-            except:
-                pass
-        
-        if not token:
-            return jsonify({'msg': 'Token is missing!'}), 401
+        claims, error = decode_claims(request.headers.get('Authorization'))
+        if error:
+            body, status = error
+            return jsonify(body), status
         
-        try:
-            data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            current_user_id = data['id']
-        except:
-            return jsonify({'msg': 'Token is invalid!'}), 401
-        
-        return f(current_user_id, *args, **kwargs)
+        return f(claims['id'], *args, **kwargs)
     
     return decorated
 
@@ -77,18 +346,32 @@ def home():
         "timestamp": datetime.now().isoformat()
     })
 
-@app.route('/api/auth/signup', methods=['POST'])
-def signup():
-    """User signup endpoint"""
+@app.route('/api/metrics/mongo-pool', methods=['GET'])
+def mongo_pool_metrics():
+    """MongoDB connection pool usage for this worker process"""
+    return jsonify({
+        "pool": get_pool_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+def signup_response(data):
+    """
+    Register a new user
+
+    Args:
+        data (dict): Request JSON (name, email, password, role)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
     try:
-        data = request.get_json()
         name = data.get('name')
         email = data.get('email')
         password = data.get('password')
         role = data.get('role', '')
         
         if not name or not email or not password:
-            return jsonify({"msg": "Missing fields"}), 400
+            return {"msg": "Missing fields"}, 400
         
         client = get_mongo_client()
         db = client["pharma_hub"]
@@ -97,10 +380,10 @@ def signup():
         # Check if user already exists
         existing_user = users_collection.find_one({"email": email})
         if existing_user:
-            return jsonify({"msg": "Email already in use"}), 400
+            return {"msg": "Email already in use"}, 400
         
-        # Hash password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Hash password on the bounded hashing pool
+        hashed_password = password_pool.hash_password(password)
         
         # Create user
         user = {
@@ -114,38 +397,205 @@ def signup():
         result = users_collection.insert_one(user)
         user_id = str(result.inserted_id)
         
-        # Create JWT token
-        token = jwt.encode({'id': user_id}, JWT_SECRET, algorithm="HS256")
+        # Return user data without password, and a token carrying it
+        user_response = user_profile(user)
+        token = issue_token(user_response)
+        user_profiles.set(user_id, user_response)
         
-        # Return user data without password
-        user_response = {
-            "id": user_id,
-            "name": name,
-            "email": email,
-            "role": role
-        }
-        
-        return jsonify({
+        return {
             "user": user_response,
             "token": token
-        }), 200
+        }, 200
         
+    except PasswordPoolBusy as pe:
+        return {"msg": "Authentication is busy, please retry shortly", "detail": str(pe)}, 503
     except Exception as e:
-        return jsonify({"msg": "Server error"}), 500
-    finally:
-        if 'client' in locals():
-            client.close()
+        return {"msg": "Server error"}, 500
 
-@app.route('/api/auth/signin', methods=['POST'])
-def signin():
-    """User signin endpoint"""
+@app.route('/api/metrics/cache', methods=['GET'])
+def cache_metrics():
+    """Response and user profile cache counters for this worker process"""
+    return jsonify({
+        "cache": get_cache_metrics(),
+        "user_profiles": get_profile_cache_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+def metrics_text(extra=None):
+    """
+    Render all process metrics in the Prometheus text format
+
+    Args:
+        extra (list): Additional rendered metric blocks (e.g. from the async server)
+
+    Returns:
+        str: Prometheus exposition text
+    """
+    fanout_stats = fanout.get_fanout_metrics()
+    job_stats = get_report_job_metrics()
+    password_stats = get_password_pool_metrics()
+    pool = get_pool_metrics()
+    flights = get_single_flight_metrics()
+    cache_sources = get_cache_metrics()["sources"]
+    profiles = get_profile_cache_metrics()
+    admission = get_admission_metrics()
+    throttles = get_throttle_metrics()
+    http_hosts = get_http_metrics()
+    
+    blocks = [
+        metrics.render_registry(),
+        metrics.render_samples("executor_queue_depth", "Tasks waiting for a worker", "gauge", [
+            (("fanout",), fanout_stats["queued"]),
+            (("report_jobs",), job_stats["queued"]),
+            (("password",), max(0, password_stats["pending"] - password_stats["workers"]))
+        ], ("executor",)),
+        metrics.render_samples("executor_active", "Tasks currently running", "gauge", [
+            (("fanout",), fanout_stats["active"]),
+            (("report_jobs",), job_stats["running"]),
+            (("password",), min(password_stats["pending"], password_stats["workers"]))
+        ], ("executor",)),
+        metrics.render_samples("executor_max_workers", "Worker limit per executor", "gauge", [
+            (("fanout",), fanout_stats["max_workers"]),
+            (("report_jobs",), job_stats["workers"]),
+            (("password",), password_stats["workers"])
+        ], ("executor",)),
+        metrics.render_samples("password_hashes_total", "Password hash and check calls by outcome", "counter", [
+            ((outcome,), password_stats[outcome]) for outcome in ("completed", "rejected", "timed_out", "failed")
+        ], ("outcome",)),
+        metrics.render_samples("report_jobs_total", "Report jobs by outcome", "counter", [
+            ((outcome,), job_stats[outcome]) for outcome in ("completed", "failed", "rejected")
+        ], ("outcome",)),
+        metrics.render_samples("response_cache_lookups_total", "Response cache lookups by result", "counter", [
+            ((source, result), counters[key])
+            for source, counters in sorted(cache_sources.items())
+            for result, key in (("hit", "hits"), ("stale_hit", "stale_hits"), ("miss", "misses"))
+        ], ("source", "result")),
+        metrics.render_samples("response_cache_hit_ratio", "Share of lookups served from cache", "gauge", [
+            ((source,), counters["hit_ratio"]) for source, counters in sorted(cache_sources.items())
+        ], ("source",)),
+        metrics.render_samples("user_profile_cache_lookups_total", "User profile cache lookups by result", "counter", [
+            (("hit",), profiles["hits"]),
+            (("miss",), profiles["misses"])
+        ], ("result",)),
+        metrics.render_samples("user_profile_cache_hit_ratio", "Share of profile lookups served from cache", "gauge", [
+            ((), profiles["hit_ratio"])
+        ]),
+        metrics.render_samples("mongo_pool_connections", "MongoDB pool connections by state", "gauge", [
+            (("open",), pool["connections_open"]),
+            (("checked_out",), pool["checked_out"])
+        ], ("state",)),
+        metrics.render_samples("mongo_pool_checkout_failures_total", "Failed MongoDB pool checkouts", "counter", [
+            ((), pool["checkout_failures"])
+        ]),
+        metrics.render_samples("single_flight_in_flight", "Upstream calls currently being shared", "gauge", [
+            ((), len(flights["in_flight"]))
+        ]),
+        metrics.render_samples("single_flight_coalesced_total", "Calls served by another caller's upstream request", "counter", [
+            ((), flights["coalesced"])
+        ]),
+        metrics.render_samples("upstream_http_requests_total", "Upstream HTTP attempts per host", "counter", [
+            ((host,), stats["requests"]) for host, stats in sorted(http_hosts.items())
+        ], ("host",)),
+        metrics.render_samples("upstream_http_retries_total", "Upstream HTTP retries per host", "counter", [
+            ((host,), stats["retries"]) for host, stats in sorted(http_hosts.items())
+        ], ("host",)),
+        metrics.render_samples("upstream_http_connections", "Upstream HTTP requests per host by state", "gauge", [
+            ((host, state), stats[state])
+            for host, stats in sorted(http_hosts.items())
+            for state in ("in_flight", "waiting")
+        ], ("host", "state")),
+        metrics.render_samples("upstream_throttle_waits_total", "Upstream requests delayed by the shared rate limit", "counter", [
+            ((name,), stats["waited"]) for name, stats in sorted(throttles.items())
+        ], ("upstream",)),
+        metrics.render_samples("upstream_throttle_wait_seconds_total", "Time spent waiting for the shared upstream rate limit", "counter", [
+            ((name,), stats["wait_seconds"]) for name, stats in sorted(throttles.items())
+        ], ("upstream",)),
+        metrics.render_samples("rate_limit_requests_total", "Agent requests by rate limit decision", "counter", [
+            ((route, decision), counters[decision])
+            for route, counters in sorted(admission["rate_limits"]["routes"].items())
+            for decision in ("allowed", "limited")
+        ], ("route", "decision")),
+        metrics.render_samples("rate_limit_buckets", "Token buckets held in memory", "gauge", [
+            ((), admission["rate_limits"]["buckets"])
+        ]),
+        metrics.render_samples("load_shed_total", "Agent requests rejected with 503 under load", "counter", [
+            ((route,), count) for route, count in sorted(admission["load_shedding"]["shed"].items())
+        ], ("route",)),
+        metrics.render_samples("load_shed_pressure", "Load signal value as a share of its shedding limit", "gauge", [
+            ((name,), reading["ratio"]) for name, reading in sorted(admission["load_shedding"]["signals"].items())
+        ], ("signal",))
+    ]
+    return "\n".join(blocks + list(extra or [])) + "\n"
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/single-flight', methods=['GET'])
+def single_flight_metrics():
+    """Upstream call coalescing counters, in-flight waiters and rate limit waits for this worker process"""
+    return jsonify({
+        "single_flight": get_single_flight_metrics(),
+        "throttles": get_throttle_metrics(),
+        "http": get_http_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """Rate limit decisions, shed requests and load signals for this worker process"""
+    return jsonify({
+        "admission": get_admission_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/metrics/password-pool', methods=['GET'])
+def password_pool_metrics():
+    """Password hashing pool queue depth and outcomes for this worker process"""
+    return jsonify({
+        "password_pool": get_password_pool_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/metrics/report-jobs', methods=['GET'])
+def report_job_metrics():
+    """Report job queue depth and outcome counters for this worker process"""
+    return jsonify({
+        "report_jobs": get_report_job_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/metrics/encoding', methods=['GET'])
+def encoding_metrics():
+    """JSON serialization time and compression savings per endpoint for this worker process"""
+    return jsonify({
+        "encoding": encoding.get_encoding_metrics(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/auth/signup', methods=['POST'])
+def signup():
+    """User signup endpoint"""
+    body, status = signup_response(request.get_json())
+    return jsonify(body), status
+
+def signin_response(data):
+    """
+    Authenticate a user and issue a token
+
+    Args:
+        data (dict): Request JSON (email, password)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
     try:
-        data = request.get_json()
         email = data.get('email')
         password = data.get('password')
         
         if not email or not password:
-            return jsonify({"msg": "Missing fields"}), 400
+            return {"msg": "Missing fields"}, 400
         
         client = get_mongo_client()
         db = client["pharma_hub"]
@@ -154,70 +604,86 @@ def signin():
         # Find user
         user = users_collection.find_one({"email": email})
         if not user:
-            return jsonify({"msg": "Invalid credentials"}), 400
-        
-        # Check password
-        if not bcrypt.checkpw(password.encode('utf-8'), user['password']):
-            return jsonify({"msg": "Invalid credentials"}), 400
+            return {"msg": "Invalid credentials"}, 400
         
-        # Create JWT token
-        token = jwt.encode({'id': str(user['_id'])}, JWT_SECRET, algorithm="HS256")
+        # Check password on the bounded hashing pool
+        if not password_pool.check_password(password, user['password']):
+            return {"msg": "Invalid credentials"}, 400
         
-        # Return user data without password
-        user_response = {
-            "id": str(user['_id']),
-            "name": user['name'],
-            "email": user['email'],
-            "role": user.get('role', '')
-        }
+        # Return user data without password, and a token carrying it
+        user_response = user_profile(user)
+        token = issue_token(user_response)
+        user_profiles.set(user_response["id"], user_response)
         
-        return jsonify({
+        return {
             "user": user_response,
             "token": token
-        }), 200
+        }, 200
         
+    except PasswordPoolBusy as pe:
+        return {"msg": "Authentication is busy, please retry shortly", "detail": str(pe)}, 503
     except Exception as e:
-        return jsonify({"msg": "Server error"}), 500
-    finally:
-        if 'client' in locals():
-            client.close()
+        return {"msg": "Server error"}, 500
 
-@app.route('/api/auth/me', methods=['GET'])
-@token_required
-def get_user(current_user_id):
-    """Get current user profile"""
+@app.route('/api/auth/signin', methods=['POST'])
+def signin():
+    """User signin endpoint"""
+    body, status = signin_response(request.get_json())
+    return jsonify(body), status
+
+def get_user_response(current_user_id):
+    """
+    Load the profile of the authenticated user
+
+    Args:
+        current_user_id (str): User ID from the token
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
     try:
+        # Serve from the short-TTL profile cache when possible
+        cached = user_profiles.get(current_user_id)
+        if cached:
+            return {"user": cached}, 200
+        
         client = get_mongo_client()
         db = client["pharma_hub"]
         users_collection = db["users"]
         
         # Find user
-        user = users_collection.find_one({"_id": ObjectId(current_user_id)})
+        user = users_collection.find_one({"_id": ObjectId(current_user_id)}, USER_PROFILE_PROJECTION)
         if not user:
-            return jsonify({"msg": "User not found"}), 404
+            return {"msg": "User not found"}, 404
         
         # Return user data without password
-        user_response = {
-            "id": str(user['_id']),
-            "name": user['name'],
-            "email": user['email'],
-            "role": user.get('role', '')
-        }
+        user_response = user_profile(user)
+        user_profiles.set(current_user_id, user_response)
         
-        return jsonify({"user": user_response}), 200
+        return {"user": user_response}, 200
         
     except Exception as e:
-        return jsonify({"msg": "Server error"}), 500
-    finally:
-        if 'client' in locals():
-            client.close()
+        return {"msg": "Server error"}, 500
 
-@app.route('/api/auth/me', methods=['PUT'])
+@app.route('/api/auth/me', methods=['GET'])
 @token_required
-def update_user(current_user_id):
-    """Update current user profile"""
+def get_user(current_user_id):
+    """Get current user profile"""
+    body, status = get_user_response(current_user_id)
+    return jsonify(body), status
+
+def update_user_response(current_user_id, data):
+    """
+    Update the profile of the authenticated user
+
+    Args:
+        current_user_id (str): User ID from the token
+        data (dict): Request JSON (name, email, role)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
     try:
-        data = request.get_json()
         name = data.get('name')
         email = data.get('email')
         role = data.get('role')
@@ -226,11 +692,6 @@ def update_user(current_user_id):
         db = client["pharma_hub"]
         users_collection = db["users"]
         
-        # Find user
-        user = users_collection.find_one({"_id": ObjectId(current_user_id)})
-        if not user:
-            return jsonify({"msg": "User not found"}), 404
-        
         # Update fields
         update_data = {}
         if name:
@@ -239,38 +700,104 @@ def update_user(current_user_id):
             update_data['email'] = email
         if role is not None:
             update_data['role'] = role
-            
-        # Update user
-        users_collection.update_one(
-            {"_id": ObjectId(current_user_id)},
-            {"$set": update_data}
-        )
         
-        # Return updated user data
-        updated_user = users_collection.find_one({"_id": ObjectId(current_user_id)})
-        user_response = {
-            "id": str(updated_user['_id']),
-            "name": updated_user['name'],
-            "email": updated_user['email'],
-            "role": updated_user.get('role', '')
-        }
+        # Update and read back the user in one round-trip
+        if update_data:
+            updated_user = users_collection.find_one_and_update(
+                {"_id": ObjectId(current_user_id)},
+                {"$set": update_data},
+                projection=USER_PROFILE_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+        else:
+            updated_user = users_collection.find_one({"_id": ObjectId(current_user_id)}, USER_PROFILE_PROJECTION)
+        user_profiles.invalidate(current_user_id)
+        if not updated_user:
+            return {"msg": "User not found"}, 404
+        
+        # Return updated user data with a token carrying the new claims
+        user_response = user_profile(updated_user)
+        user_profiles.set(current_user_id, user_response)
         
-        return jsonify({"user": user_response}), 200
+        return {"user": user_response, "token": issue_token(user_response)}, 200
         
     except Exception as e:
-        return jsonify({"msg": "Server error"}), 500
-    finally:
-        if 'client' in locals():
-            client.close()
+        return {"msg": "Server error"}, 500
 
-@app.route('/api/exim', methods=['GET'])
-def get_exim_data():
-    """Get EXIM trade data"""
+@app.route('/api/auth/me', methods=['PUT'])
+@token_required
+def update_user(current_user_id):
+    """Update current user profile"""
+    body, status = update_user_response(current_user_id, request.get_json())
+    return jsonify(body), status
+
+def follow_cursor(kind, cursor, page_response):
+    """
+    Serve a later page of a paginated agent response
+
+    The cursor is self-contained (it wraps the upstream page token), so any
+    worker can resume it with a single upstream page fetch. Pages are cached
+    by cursor, and once a client is paging the page after this one is
+    prefetched in the background.
+
+    Args:
+        kind (str): "trials" or "patents"
+        cursor (str): Continuation token from the previous page
+        page_response (callable): Cached page builder taking {"cursor": ...}
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    body, status = page_response(cursor_params(cursor))
+    next_cursor = body.get("next_cursor") if status == 200 else None
+    if next_cursor:
+        params = cursor_params(next_cursor)
+        response_cache.prefetch(f"{kind}-page", params, lambda: page_response.uncached(params))
+    return body, status
+
+def cursor_params(cursor):
+    """
+    Build page builder parameters for a cursor
+
+    Args:
+        cursor (str): Continuation token
+
+    Returns:
+        dict: Parameters for a cached page builder
+    """
+    return {"cursor": cursor}
+
+def parse_flag(value):
+    """
+    Read a boolean query parameter ("1", "true" or "yes" mean True)
+
+    Args:
+        value: Parameter value (string, bool or None)
+
+    Returns:
+        bool: Flag value
+    """
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+# Parameter defaults of /api/exim, shared by the batch endpoint so both use the same cache keys
+EXIM_DEFAULTS = {"hs_code": "3004", "top_n": 10}
+
+@response_cache.cached("exim", defaults=EXIM_DEFAULTS)
+def exim_response(params):
+    """
+    Build the EXIM trade data response
+
+    Args:
+        params (dict): Query parameters (hs_code, year_from, year_to, top_n)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    hs_code = params.get('hs_code')
+    top_n = params.get('top_n', 10)
     try:
-        hs_code = request.args.get('hs_code')
-        year_from = request.args.get('year_from')
-        year_to = request.args.get('year_to')
-        top_n = request.args.get('top_n', 10)
+        year_from = params.get('year_from')
+        year_to = params.get('year_to')
         
         # If no HS code provided, use a default one for pharmaceutical products
         if not hs_code:
@@ -283,32 +810,125 @@ def get_exim_data():
             top_n=int(top_n)
         )
         
-        return jsonify({
+        return {
             "query": f"EXIM data for HS code {hs_code}",
             "data": data,
             "timestamp": datetime.now().isoformat()
-        })
+        }, 200
     except Exception as e:
         # Return mock data as fallback
         try:
             mock_data = exim_agent.get_mock_trade_data(hs_code or "3004", int(top_n))
-            return jsonify({
+            return {
                 "query": f"EXIM data for HS code {hs_code or '3004'}",
                 "data": mock_data,
                 "timestamp": datetime.now().isoformat()
-            })
+            }, 200
         except Exception as mock_e:
-            return jsonify({"error": str(e)}), 500
+            return {"error": str(e)}, 500
 
-@app.route('/api/trials', methods=['GET'])
-def get_trials_data():
-    """Get clinical trials data"""
+@app.route('/api/exim', methods=['GET'])
+def get_exim_data():
+    """Get EXIM trade data"""
+    body, status, etag = etagged(exim_response, request.args)
+    return conditional_json(body, status, etag, request.headers.get('If-None-Match'))
+
+def exim_batch_response(data):
+    """
+    Build the EXIM batch response
+
+    All HS codes share the year range and top_n, so the misses are answered
+    by one aggregation over the comtrade collection.
+
+    Args:
+        data (dict): Request JSON ({"queries": [hs codes], year_from, year_to, top_n})
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        items = batch.parse_batch_items(data, "hs_code", shared=("year_from", "year_to", "top_n"))
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
+    
+    year_from = data.get('year_from')
+    year_to = data.get('year_to')
+    top_n = int(data.get('top_n') or EXIM_DEFAULTS["top_n"])
+    # Per-item filters would need separate pipelines, so only the shared ones apply
+    shared = {"year_from": year_from, "year_to": year_to, "top_n": top_n}
+    invalid = {key: ({"error": "hs_code is required"}, 400) for key, params in items.items() if not params.get("hs_code")}
+    items = {key: dict(shared, hs_code=params["hs_code"]) for key, params in items.items() if key not in invalid}
+    
+    def compute_many(missing):
+        trade = exim_agent.get_trade_by_hs_batch(
+            [params["hs_code"] for params in missing.values()],
+            year_from=year_from,
+            year_to=year_to,
+            top_n=top_n
+        )
+        return {
+            key: ({
+                "query": f"EXIM data for HS code {params['hs_code']}",
+                "data": trade.get(str(params["hs_code"]), []),
+                "timestamp": datetime.now().isoformat()
+            }, 200)
+            for key, params in missing.items()
+        }
+    
+    started = time.perf_counter()
+    try:
+        outcomes = response_cache.get_many_or_compute("exim", items, compute_many, EXIM_DEFAULTS) if items else {}
+    except Exception as e:
+        return {"error": str(e)}, 500
+    outcomes.update(invalid)
+    body = batch.batch_body(outcomes, started)
+    body["timestamp"] = datetime.now().isoformat()
+    return body, 200
+
+@app.route('/api/exim/batch', methods=['POST'])
+def get_exim_batch():
+    """Get EXIM trade data for several HS codes"""
+    body, status = exim_batch_response(request.get_json())
+    return jsonify(body), status
+
+def trials_response(params):
+    """
+    Build the clinical trials response, or a later page of it when ``cursor`` is given
+
+    Args:
+        params (dict): Query parameters (condition, phase, status, top_n, fields, deep, cursor)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    if params.get('cursor'):
+        return follow_cursor("trials", params.get('cursor'), trials_page_response)
+    return trials_search_response(params)
+
+@response_cache.cached("trials", defaults={"condition": "diabetes", "top_n": 10})
+def trials_search_response(params):
+    """
+    Build the first page of the clinical trials response
+
+    ``deep=true`` re-fetches each trial's full record from ClinicalTrials.gov
+    (one extra upstream request per trial); by default a page is one request.
+
+    Args:
+        params (dict): Query parameters (condition, phase, status, top_n, fields, deep)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    condition = params.get('condition')
+    phase = params.get('phase')
+    status = params.get('status')
+    top_n = params.get('top_n', 10)
+    deep = parse_flag(params.get('deep'))
+    try:
+        fields = parse_fields(params.get('fields'), trials_agent.TRIAL_FIELDS)
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
     try:
-        condition = request.args.get('condition')
-        phase = request.args.get('phase')
-        status = request.args.get('status')
-        top_n = request.args.get('top_n', 10)
-        
         # If no condition provided, use a default one
         if not condition:
             condition = "diabetes"  # Default condition
@@ -317,7 +937,9 @@ def get_trials_data():
             condition=condition,
             phase=phase,
             status=status,
-            top_n=int(top_n)
+            top_n=int(top_n),
+            fields=fields,
+            deep=deep
         )
         
         # Handle both old and new return formats
@@ -330,30 +952,119 @@ def get_trials_data():
             data = result
             source = "API"
         
-        return jsonify({
+        body = {
             "query": f"Clinical trials for {condition}",
             "data": data,
             "source": source,
             "timestamp": datetime.now().isoformat()
-        })
+        }
+        if isinstance(result, dict) and result.get("synced_at"):
+            body["synced_at"] = result["synced_at"]
+        if isinstance(result, dict) and result.get("next_page_token"):
+            body["next_cursor"] = encode_cursor({
+                "source": "trials",
+                "condition": condition,
+                "phase": phase,
+                "status": status,
+                "top_n": int(top_n),
+                "fields": fields,
+                "deep": deep,
+                "page_token": result["next_page_token"]
+            })
+        return body, 200
     except Exception as e:
         # Return mock data as fallback
         try:
             mock_data = trials_agent.get_mock_trials(condition or "diabetes", phase, status, int(top_n))
-            return jsonify({
+            return {
                 "query": f"Clinical trials for {condition or 'diabetes'}",
-                "data": mock_data,
+                "data": select_fields(mock_data, fields),
                 "source": "Mock Data",
                 "timestamp": datetime.now().isoformat()
-            })
+            }, 200
         except Exception as mock_e:
-            return jsonify({"error": str(e)}), 500
+            return {"error": str(e)}, 500
 
-@app.route('/api/iqvia', methods=['GET'])
-def get_iqvia_data():
-    """Get IQVIA market data"""
+@response_cache.cached("trials-page")
+def trials_page_response(params):
+    """
+    Build a later page of the clinical trials response from a cursor
+
+    Args:
+        params (dict): {"cursor": continuation token from the previous page}
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        position = decode_cursor(params.get('cursor'))
+        if position.get("source") != "trials":
+            raise ValueError("Invalid cursor")
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
+    
     try:
-        therapy_area = request.args.get('therapy_area')
+        result = trials_agent.get_trials_page(
+            condition=position["condition"],
+            page_token=position["page_token"],
+            phase=position.get("phase"),
+            status=position.get("status"),
+            top_n=position["top_n"],
+            fields=position.get("fields"),
+            deep=position.get("deep", False)
+        )
+    except Exception as e:
+        return {"error": f"Could not fetch the next page: {str(e)}"}, 502
+    
+    body = {
+        "query": f"Clinical trials for {position['condition']}",
+        "data": result["data"],
+        "source": result["source"],
+        "timestamp": datetime.now().isoformat()
+    }
+    if result.get("synced_at"):
+        body["synced_at"] = result["synced_at"]
+    if result.get("next_page_token"):
+        body["next_cursor"] = encode_cursor(dict(position, page_token=result["next_page_token"]))
+    return body, 200
+
+def trials_mirror_response():
+    """
+    Build the ClinicalTrials.gov mirror status response
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        return {"mirror": clinicaltrials_mirror.get_mirror_status(), "timestamp": datetime.now().isoformat()}, 200
+    except Exception as e:
+        return {"error": f"Could not read the mirror status: {str(e)}"}, 503
+
+@app.route('/api/trials', methods=['GET'])
+def get_trials_data():
+    """Get clinical trials data"""
+    body, status, etag = etagged(trials_response, request.args)
+    return conditional_json(body, status, etag, request.headers.get('If-None-Match'))
+
+@app.route('/api/trials/mirror', methods=['GET'])
+def get_trials_mirror_status():
+    """Size, freshness and last sync of the local ClinicalTrials.gov mirror"""
+    body, status = trials_mirror_response()
+    return jsonify(body), status
+
+@response_cache.cached("iqvia")
+def iqvia_response(params):
+    """
+    Build the IQVIA market data response
+
+    Args:
+        params (dict): Query parameters (therapy_area)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        therapy_area = params.get('therapy_area')
         
         stats = iqvia_agent.get_market_stats(therapy_area=therapy_area)
         competitors = iqvia_agent.get_competitor_analysis(therapy_area=therapy_area)
@@ -365,27 +1076,84 @@ def get_iqvia_data():
             "trends": trends
         }
         
-        return jsonify({
+        return {
             "query": f"IQVIA data for {therapy_area or 'general market'}",
             "data": data,
             "timestamp": datetime.now().isoformat()
-        })
+        }, 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route('/api/patents', methods=['GET'])
-def get_patent_data():
-    """Get patent data"""
+def trials_batch_response(data):
+    """
+    Build the clinical trials batch response
+
+    Args:
+        data (dict): Request JSON ({"queries": [conditions or params], phase, status, top_n})
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        items = batch.parse_batch_items(data, "condition", shared=("phase", "status", "top_n"))
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
+    
+    started = time.perf_counter()
+    body = batch.batch_body(batch.run_batch(items, trials_response), started)
+    body["timestamp"] = datetime.now().isoformat()
+    return body, 200
+
+@app.route('/api/trials/batch', methods=['POST'])
+def get_trials_batch():
+    """Get clinical trials for several conditions"""
+    body, status = trials_batch_response(request.get_json())
+    return jsonify(body), status
+
+@app.route('/api/iqvia', methods=['GET'])
+def get_iqvia_data():
+    """Get IQVIA market data"""
+    body, status, etag = etagged(iqvia_response, request.args)
+    return conditional_json(body, status, etag, request.headers.get('If-None-Match'))
+
+def patents_response(params):
+    """
+    Build the patent search response, or a later page of it when ``cursor`` is given
+
+    Args:
+        params (dict): Query parameters (query, assignee, ipc_code, top_n, fields, cursor)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    if params.get('cursor'):
+        return follow_cursor("patents", params.get('cursor'), patents_page_response)
+    return patents_search_response(params)
+
+@response_cache.cached("patents", defaults={"top_n": 10})
+def patents_search_response(params):
+    """
+    Build the first page of the patent search response
+
+    Args:
+        params (dict): Query parameters (query, assignee, ipc_code, top_n, fields)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    query = params.get('query')
+    assignee = params.get('assignee')
+    ipc_code = params.get('ipc_code')
+    top_n = params.get('top_n', 10)
+    try:
+        fields = parse_fields(params.get('fields'), patent_agent.PATENT_FIELDS)
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
     try:
-        query = request.args.get('query')
-        assignee = request.args.get('assignee')
-        ipc_code = request.args.get('ipc_code')
-        top_n = request.args.get('top_n', 10)
-        
         # Use at least one search parameter
         if not query and not assignee and not ipc_code:
             # For gene therapy query, provide a default search
-            if request.args.get('query', '').lower() == 'find recent patents related to gene therapy':
+            if params.get('query', '').lower() == 'find recent patents related to gene therapy':
                 query = 'gene therapy'
             else:
                 query = "pharmaceutical"  # Default search term
@@ -394,7 +1162,8 @@ def get_patent_data():
             query=query or "",
             assignee=assignee,
             ipc_code=ipc_code,
-            top_n=int(top_n)
+            top_n=int(top_n),
+            fields=fields
         )
         
         # Include text_summary in response if available
@@ -410,314 +1179,721 @@ def get_patent_data():
         if "error" in data:
             response_data["error"] = data["error"]
         
-        return jsonify(response_data)
+        if data.get("next_page"):
+            response_data["next_cursor"] = encode_cursor({
+                "source": "patents",
+                "query": query or "",
+                "assignee": assignee,
+                "ipc_code": ipc_code,
+                "top_n": int(top_n),
+                "fields": fields,
+                "page": data["next_page"]
+            })
+        
+        return response_data, 200
     except Exception as e:
         # Even if there's an exception, try to return mock data
         try:
-            mock_data = patent_agent.get_mock_patent_data(query or "gene therapy", int(top_n))
+            mock_data = select_fields(patent_agent.get_mock_patent_data(query or "gene therapy", int(top_n)), fields)
             text_representation = "\n\n".join([patent_agent.format_patent_as_text(patent) for patent in mock_data])
-            return jsonify({
+            return {
                 "query": f"Patent search for {query or assignee or ipc_code}",
                 "data": mock_data,
                 "text_summary": text_representation,
                 "source": "Mock Data",
                 "timestamp": datetime.now().isoformat()
-            })
+            }, 200
         except Exception as mock_e:
-            return jsonify({"error": str(e)}), 500
+            return {"error": str(e)}, 500
 
-@app.route('/api/web-intel', methods=['GET'])
-def get_web_intel_data():
-    """Get web intelligence data"""
+@response_cache.cached("patents-page")
+def patents_page_response(params):
+    """
+    Build a later page of the patent search response from a cursor
+
+    Args:
+        params (dict): {"cursor": continuation token from the previous page}
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        position = decode_cursor(params.get('cursor'))
+        if position.get("source") != "patents":
+            raise ValueError("Invalid cursor")
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
+    
+    try:
+        data = patent_agent.get_patents_page(
+            query=position["query"],
+            next_page=position["page"],
+            assignee=position.get("assignee"),
+            ipc_code=position.get("ipc_code"),
+            top_n=position["top_n"],
+            fields=position.get("fields")
+        )
+    except Exception as e:
+        return {"error": f"Could not fetch the next page: {str(e)}"}, 502
+    
+    body = {
+        "query": f"Patent search for {position['query'] or position.get('assignee') or position.get('ipc_code')}",
+        "data": data["data"],
+        "text_summary": data["text_summary"],
+        "source": data["source"],
+        "timestamp": datetime.now().isoformat()
+    }
+    if data.get("next_page"):
+        body["next_cursor"] = encode_cursor(dict(position, page=data["next_page"]))
+    return body, 200
+
+@app.route('/api/patents', methods=['GET'])
+def get_patent_data():
+    """Get patent data"""
+    body, status, etag = etagged(patents_response, request.args)
+    return conditional_json(body, status, etag, request.headers.get('If-None-Match'))
+
+def patents_batch_response(data):
+    """
+    Build the patent search batch response
+
+    Args:
+        data (dict): Request JSON ({"queries": [queries or params], assignee, ipc_code, top_n})
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
     try:
-        query = request.args.get('query')
-        num_results = request.args.get('num_results', 5)
+        items = batch.parse_batch_items(data, "query", shared=("assignee", "ipc_code", "top_n"))
+    except ValueError as ve:
+        return {"error": str(ve)}, 400
+    
+    started = time.perf_counter()
+    body = batch.batch_body(batch.run_batch(items, patents_response), started)
+    body["timestamp"] = datetime.now().isoformat()
+    return body, 200
+
+@app.route('/api/patents/batch', methods=['POST'])
+def get_patents_batch():
+    """Run several patent searches"""
+    body, status = patents_batch_response(request.get_json())
+    return jsonify(body), status
+
+@response_cache.cached("web-intel", defaults={"num_results": 5})
+def web_intel_response(params):
+    """
+    Build the web intelligence response
+
+    Args:
+        params (dict): Query parameters (query, num_results, fields)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        query = params.get('query')
+        num_results = params.get('num_results', 5)
         
         if not query:
-            return jsonify({"error": "query parameter is required"}), 400
+            return {"error": "query parameter is required"}, 400
+        
+        try:
+            fields = parse_fields(params.get('fields'), webintel_agent.WEB_RESULT_FIELDS)
+        except ValueError as ve:
+            return {"error": str(ve)}, 400
         
         data = webintel_agent.search_web(
             query=query,
-            num_results=int(num_results)
+            num_results=int(num_results),
+            fields=fields
         )
         
-        return jsonify({
+        return {
             "query": f"Web search for {query}",
             "data": data,
             "timestamp": datetime.now().isoformat()
-        })
+        }, 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route('/api/internal-docs', methods=['GET'])
-def get_internal_docs():
-    """Get internal documents"""
+@app.route('/api/web-intel', methods=['GET'])
+def get_web_intel_data():
+    """Get web intelligence data"""
+    body, status, etag = etagged(web_intel_response, request.args)
+    return conditional_json(body, status, etag, request.headers.get('If-None-Match'))
+
+def internal_docs_response(params):
+    """
+    Build the internal documents response
+
+    Args:
+        params (dict): Query parameters (query, top_n, fields)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
     try:
-        query = request.args.get('query')
-        top_n = request.args.get('top_n', 5)
+        query = params.get('query')
+        top_n = params.get('top_n', 5)
         
         if not query:
-            return jsonify({"error": "query parameter is required"}), 400
+            return {"error": "query parameter is required"}, 400
+        
+        try:
+            fields = parse_fields(params.get('fields'), list(internal_agent.DOCUMENT_FIELDS))
+        except ValueError as ve:
+            return {"error": str(ve)}, 400
         
         data = internal_agent.search_internal_documents(
             query=query,
-            top_n=int(top_n)
+            top_n=int(top_n),
+            fields=fields
         )
         
-        return jsonify({
+        return {
             "query": f"Internal documents for {query}",
             "data": data,
             "timestamp": datetime.now().isoformat()
-        })
+        }, 200
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/internal-docs', methods=['GET'])
+def get_internal_docs():
+    """Get internal documents"""
+    body, status = internal_docs_response(request.args)
+    return jsonify(body), status
+
+# Agent sections fanned out by /api/search: name -> (response builder, query -> params, time budget in seconds)
+SEARCH_SECTIONS = {
+    "exim": (exim_response, lambda q: {"hs_code": "3004", "top_n": 10}, 3.0),
+    "trials": (trials_response, lambda q: {"condition": q, "top_n": 10}, 8.0),
+    "patents": (patents_response, lambda q: {"query": q, "top_n": 10}, 6.0),
+    "web-intel": (web_intel_response, lambda q: {"query": q, "num_results": 5}, 5.0),
+    "internal-docs": (internal_docs_response, lambda q: {"query": q, "top_n": 5}, 3.0),
+    "iqvia": (iqvia_response, lambda q: {"therapy_area": q}, 2.0)
+}
+
+# Overall deadline for a fanned-out search
+SEARCH_DEADLINE = float(os.environ.get("SEARCH_DEADLINE_MS", 10000)) / 1000
+
+def build_search_tasks(query, sections=None, params=None):
+    """
+    Build fan-out tasks for the requested agent sections
+
+    Args:
+        query (str): Chat query
+        sections (list): Section names to run (defaults to all)
+        params (dict): Optional per-section parameter overrides
+
+    Returns:
+        dict: Section name -> (callable, budget in seconds)
+    """
+    params = params or {}
+    tasks = {}
+    for name in sections or SEARCH_SECTIONS.keys():
+        builder, default_params, budget = SEARCH_SECTIONS[name]
+        section_params = dict(default_params(query))
+        section_params.update(params.get(name) or {})
+        tasks[name] = (lambda b=builder, p=section_params: b(p), budget)
+    return tasks
+
+def parse_search_request(data):
+    """
+    Validate a /api/search request body
+
+    Args:
+        data (dict): Request JSON
+
+    Returns:
+        tuple: (query, sections, deadline seconds) or raises ValueError
+    """
+    query = (data or {}).get('query')
+    if not query:
+        raise ValueError("query parameter is required")
+    
+    sections = data.get('sections') or list(SEARCH_SECTIONS.keys())
+    unknown = [s for s in sections if s not in SEARCH_SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(unknown)}")
+    
+    deadline = SEARCH_DEADLINE
+    if data.get('deadline_ms'):
+        deadline = min(float(data['deadline_ms']) / 1000, SEARCH_DEADLINE)
+    
+    return query, sections, deadline
+
+def iter_search_events(query, sections, deadline, params=None):
+    """
+    Run the requested agent sections in parallel and yield events as they finish
+
+    Args:
+        query (str): Chat query
+        sections (list): Section names to run
+        deadline (float): Overall deadline in seconds
+        params (dict): Optional per-section parameter overrides
+
+    Yields:
+        dict: One "section" event per agent (status ok, error or timeout),
+              then a final "summary" event with per-agent timings
+    """
+    tasks = build_search_tasks(query, sections, params)
+    
+    errors = {}
+    timed_out = []
+    completed = []
+    timings = {}
+    started = datetime.now()
+    for outcome in fanout.iter_fanout(tasks, deadline):
+        name = outcome["name"]
+        timings[name] = outcome["elapsed_ms"]
+        event = {"event": "section", "section": name, "elapsed_ms": outcome["elapsed_ms"]}
+        if outcome["status"] == "timeout":
+            timed_out.append(name)
+            event.update({"status": "timeout"})
+        elif outcome["status"] == "error":
+            errors[name] = outcome["error"]
+            event.update({"status": "error", "error": outcome["error"]})
+        else:
+            body, status = outcome["result"]
+            if status >= 400:
+                errors[name] = body.get("error", f"HTTP {status}")
+                event.update({"status": "error", "error": errors[name]})
+            else:
+                completed.append(name)
+                event.update({"status": "ok", "data": body})
+        yield event
+    
+    yield {
+        "event": "summary",
+        "query": query,
+        "completed": completed,
+        "errors": errors,
+        "timed_out": timed_out,
+        "timings_ms": timings,
+        "elapsed_ms": round((datetime.now() - started).total_seconds() * 1000, 1),
+        "timestamp": datetime.now().isoformat()
+    }
+
+def collect_search_results(events):
+    """
+    Collect search events into a single response body
+
+    Args:
+        events (iterable): Events from iter_search_events
+
+    Returns:
+        dict: Results keyed by section plus errors, timeouts and timings
+    """
+    results = {}
+    summary = {}
+    for event in events:
+        if event["event"] == "section" and event["status"] == "ok":
+            results[event["section"]] = event["data"]
+        elif event["event"] == "summary":
+            summary = event
+    
+    return {
+        "query": summary.get("query"),
+        "results": results,
+        "errors": summary.get("errors", {}),
+        "timed_out": summary.get("timed_out", []),
+        "timings_ms": summary.get("timings_ms", {}),
+        "elapsed_ms": summary.get("elapsed_ms"),
+        "timestamp": summary.get("timestamp")
+    }
+
+@app.route('/api/search', methods=['POST'])
+def search_all():
+    """Run all agent sections in parallel and return whatever finished before the deadline"""
+    try:
+        data = request.get_json()
+        try:
+            query, sections, deadline = parse_search_request(data)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        
+        events = iter_search_events(query, sections, deadline, data.get('params'))
+        return jsonify(collect_search_results(events))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/master-agent', methods=['POST'])
-def run_master_agent_endpoint():
-    """Run the master agent with a query"""
+@app.route('/api/search/stream', methods=['POST'])
+def search_stream():
+    """
+    Stream each agent section as soon as it is ready
+
+    Responds with Server-Sent Events when the client accepts
+    text/event-stream, otherwise with newline-delimited JSON.
+    """
     try:
         data = request.get_json()
+        try:
+            query, sections, deadline = parse_search_request(data)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        
+        use_sse = 'text/event-stream' in request.headers.get('Accept', '')
+        events = iter_search_events(query, sections, deadline, data.get('params'))
+        
+        def generate():
+            for event in events:
+                payload = encoding.dumps(event).decode("utf-8")
+                if use_sse:
+                    yield f"event: {event['event']}\ndata: {payload}\n\n"
+                else:
+                    yield payload + "\n"
+        
+        return Response(
+            generate(),
+            mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"  # Disable proxy buffering so events flush immediately
+            }
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def master_agent_response(data):
+    """
+    Run the master agent with a query
+
+    Args:
+        data (dict): Request JSON (query)
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
         query = data.get('query')
         
         if not query:
-            return jsonify({"error": "query parameter is required"}), 400
+            return {"error": "query parameter is required"}, 400
         
         # Run master agent
         response = run_master_agent(query)
         
-        return jsonify({
+        return {
             "query": query,
             "response": response,
             "timestamp": datetime.now().isoformat()
-        })
+        }, 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route('/api/generate-report', methods=['POST'])
-def generate_report():
-    """Generate a report from collected data and store it in MongoDB"""
-    client = None
+@app.route('/api/master-agent', methods=['POST'])
+def run_master_agent_endpoint():
+    """Run the master agent with a query"""
+    body, status = master_agent_response(request.get_json())
+    return jsonify(body), status
+
+def generate_report_response(data, current_user_id=None):
+    """
+    Validate a report request and enqueue it for background generation
+
+    Args:
+        data (dict): Request JSON (query, results, type, user_id)
+        current_user_id (str): User ID from the Bearer token, if one was sent;
+                               takes precedence over user_id in the body
+
+    Returns:
+        tuple: (response body, HTTP status); 202 with the job ID on success
+    """
     try:
-        data = request.get_json()
         query = data.get('query')
         results = data.get('results')
         report_type = data.get('type', 'text')  # text, pdf, or excel
-        user_id = data.get('user_id')  # Optional user ID
+        user_id = current_user_id or data.get('user_id')  # Optional user ID
         
-        print(f"Generating report: query={query}, type={report_type}, user_id={user_id}")
+        print(f"Queueing report: query={query}, type={report_type}, user_id={user_id}")
         
         if not query or not results:
-            return jsonify({"error": "query and results are required"}), 400
+            return {"error": "query and results are required"}, 400
+        
+        if report_type not in REPORT_TYPES:
+            return {"error": "Invalid report type. Use 'pdf', 'excel', or 'text'"}, 400
         
         # Filter out empty sections
         filtered_results = {k: v for k, v in results.items() if v}
-        print(f"Filtered results keys: {list(filtered_results.keys())}")
-        
-        # Generate report
-        filepath = None
-        summary = None
-        if report_type == 'pdf':
-            filepath = report_generator.generate_pdf_report(query, filtered_results)
-            print(f"PDF report generated: {filepath}")
-        elif report_type == 'excel':
-            filepath = report_generator.generate_excel_report(query, filtered_results)
-            print(f"Excel report generated: {filepath}")
-        elif report_type == 'text':
-            summary = report_generator.generate_text_summary(query, filtered_results)
-            print(f"Text summary generated: {len(summary) if summary else 0} characters")
-        else:
-            return jsonify({"error": "Invalid report type. Use 'pdf', 'excel', or 'text'"}), 400
-            
-        # Store report in MongoDB
-        print("Storing report in MongoDB...")
-        client = get_mongo_client()
-        db = client["pharma_hub"]
-        reports_collection = db["reports"]
         
-        # Create report record
-        report_id = str(uuid.uuid4())
-        report_record = {
-            "report_id": report_id,
-            "query": query,
+        job_id = report_jobs.submit(query, filtered_results, report_type, user_id)
+        return {
+            "job_id": job_id,
+            "status": "queued",
             "report_type": report_type,
-            "file_path": filepath if report_type in ['pdf', 'excel'] else None,
-            "generated_at": datetime.now().isoformat(),
-            "generated_by": user_id,
-            "metadata": {
-                "sections": list(filtered_results.keys()),
-                "data_points": sum(len(v) if isinstance(v, list) else 1 for v in filtered_results.values())
-            }
-        }
-        print(f"Report record prepared: {report_record}")
-        
-        # For PDF and Excel reports, store the binary data
-        if report_type in ['pdf', 'excel'] and filepath:
-            try:
-                print(f"Reading file data from: {filepath}")
-                with open(filepath, 'rb') as f:
-                    binary_data = f.read()
-                report_record["file_data"] = Binary(binary_data)
-                print(f"Binary data read: {len(binary_data)} bytes")
-            except Exception as file_error:
-                print(f"Warning: Could not read file data: {file_error}")
-                import traceback
-                traceback.print_exc()
-        
-        # For text reports, store the summary
-        if report_type == 'text' and summary:
-            report_record["text_summary"] = summary
-            
-        # Insert report record into database
-        print("Inserting report record into database...")
-        result = reports_collection.insert_one(report_record)
-        print(f"Report record inserted with ID: {result.inserted_id}")
-        
-        # Return appropriate response
-        print("Returning response...")
-        if report_type == 'pdf' and filepath:
-            # For PDF, return download info instead of sending file directly
-            return jsonify({
-                "report_id": report_id,
-                "query": query,
-                "report_type": report_type,
-                "message": "PDF report generated successfully",
-                "download_url": f"/api/reports/{report_id}/download"
-            })
-        elif report_type == 'excel' and filepath:
-            # For Excel, return download info instead of sending file directly
-            return jsonify({
-                "report_id": report_id,
-                "query": query,
-                "report_type": report_type,
-                "message": "Excel report generated successfully",
-                "download_url": f"/api/reports/{report_id}/download"
-            })
-        elif report_type == 'text' and summary:
-            return jsonify({
-                "query": query,
-                "summary": summary,
-                "report_id": report_id,
-                "timestamp": datetime.now().isoformat()
-            })
-        else:
-            return jsonify({"error": "Invalid report type or missing data"}), 400
-            
+            "status_url": f"/api/reports/jobs/{job_id}"
+        }, 202
+        
+    except QueueFullError as qe:
+        return {"error": str(qe)}, 503
     except Exception as e:
-        print(f"Error generating report: {str(e)}")  # Log the error for debugging
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": f"Failed to generate report: {str(e)}"}), 500
-    finally:
-        # Close MongoDB connection
-        if client:
-            try:
-                client.close()
-                print("MongoDB connection closed")
-            except Exception as close_error:
-                print(f"Error closing MongoDB connection: {close_error}")
+        print(f"Error queueing report: {str(e)}")  # Log the error for debugging
+        return {"error": f"Failed to generate report: {str(e)}"}, 500
 
-@app.route('/api/reports', methods=['GET'])
-def list_reports():
-    """List all stored reports"""
+@app.route('/api/generate-report', methods=['POST'])
+def generate_report():
+    """Queue report generation from collected data"""
+    # Authentication is optional here; a valid token attributes the report to its user
+    current_user_id, _ = decode_token(request.headers.get('Authorization'))
+    body, status = generate_report_response(request.get_json(), current_user_id)
+    return jsonify(body), status
+
+def report_job_response(job_id):
+    """
+    Get the status of a report generation job
+
+    Args:
+        job_id (str): Job ID returned by /api/generate-report
+
+    Returns:
+        tuple: (response body, HTTP status)
+    """
+    try:
+        job = report_jobs.get(job_id)
+        if not job:
+            return {"error": "Job not found"}, 404
+        return job, 200
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    """Get the status of a report generation job"""
+    body, status = report_job_response(job_id)
+    return jsonify(body), status
+
+# Newest first; report_id breaks ties between reports generated in the same instant
+REPORT_LIST_SORT = [("generated_at", -1), ("report_id", -1)]
+REPORT_LIST_INDEX = [("generated_by", 1)] + REPORT_LIST_SORT
+
+_report_index_ready = False
+
+def ensure_report_list_index(reports_collection):
+    """Create the compound index backing the paginated report listing (once per process)"""
+    global _report_index_ready
+    if not _report_index_ready:
+        reports_collection.create_index(REPORT_LIST_INDEX, name="generated_by_generated_at_report_id")
+        _report_index_ready = True
+
+def list_reports_response(current_user_id, params):
+    """
+    List the current user's reports, newest first, one page at a time
+
+    Args:
+        current_user_id (str): Authenticated user ID
+        params (dict): Query parameters (limit, cursor)
+
+    Returns:
+        tuple: (response body, HTTP status); next_cursor is None on the last page
+    """
+    try:
+        limit = parse_page_size(params.get('limit'))
+        query = {"generated_by": current_user_id}
+        cursor = params.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            query["$or"] = [
+                {"generated_at": {"$lt": position["generated_at"]}},
+                {"generated_at": position["generated_at"], "report_id": {"$lt": position["report_id"]}}
+            ]
+    except (ValueError, KeyError) as ve:
+        return {"error": str(ve) if isinstance(ve, ValueError) else "Invalid cursor"}, 400
+    
     try:
         client = get_mongo_client()
         db = client["pharma_hub"]
         reports_collection = db["reports"]
-        
-        # Find all reports
-        reports = list(reports_collection.find({}, {
-            "report_id": 1, 
-            "query": 1, 
-            "report_type": 1, 
-            "generated_at": 1, 
-            "generated_by": 1, 
-            "metadata": 1,
-            "_id": 0
-        }))
-        
-        # Close MongoDB connection
-        client.close()
-        
-        # Return reports list
-        return jsonify({
+        ensure_report_list_index(reports_collection)
+        
+        # Fetch one extra report to know whether another page exists
+        reports = [
+            report_metadata(report)
+            for report in reports_collection.find(query, REPORT_METADATA_PROJECTION)
+            .sort(REPORT_LIST_SORT).limit(limit + 1).hint(REPORT_LIST_INDEX)
+        ]
+        
+        next_cursor = None
+        if len(reports) > limit:
+            reports = reports[:limit]
+            last = reports[-1]
+            next_cursor = encode_cursor({"generated_at": last["generated_at"], "report_id": last["report_id"]})
+        
+        # Return reports page
+        return {
             "reports": reports,
-            "count": len(reports)
-        })
+            "count": len(reports),
+            "next_cursor": next_cursor
+        }, 200
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route('/api/reports/<report_id>', methods=['GET'])
-def get_report(report_id):
-    """Retrieve a stored report by ID"""
+@app.route('/api/reports', methods=['GET'])
+@token_required
+def list_reports(current_user_id):
+    """List the current user's reports (paginated)"""
+    body, status = list_reports_response(current_user_id, request.args)
+    return jsonify(body), status
+
+def get_report_response(report_id, if_none_match=None):
+    """
+    Retrieve stored report metadata by ID
+
+    Reports are immutable, so the metadata ETag is derived from the content
+    hash stored with the report; reports saved before hashes were recorded
+    have no ETag.
+
+    Args:
+        report_id (str): Report ID
+        if_none_match (str): Value of the request's If-None-Match header, if any
+
+    Returns:
+        tuple: (response body, HTTP status, ETag or None); a 304 still carries
+               the body so the ETag can name its compressed representation
+    """
     try:
         client = get_mongo_client()
         db = client["pharma_hub"]
         reports_collection = db["reports"]
         
-        # Find report
-        report = reports_collection.find_one({"report_id": report_id})
+        # Find report metadata only
+        report = reports_collection.find_one({"report_id": report_id}, REPORT_METADATA_PROJECTION)
         if not report:
-            return jsonify({"error": "Report not found"}), 404
-        
-        # Close MongoDB connection
-        client.close()
+            return {"error": "Report not found"}, 404, None
         
-        # Return report metadata
-        return jsonify({
-            "report_id": report["report_id"],
-            "query": report["query"],
-            "report_type": report["report_type"],
-            "generated_at": report["generated_at"],
-            "generated_by": report.get("generated_by"),
-            "metadata": report.get("metadata")
-        })
+        etag = make_etag(report.get("content_hash"), "meta")
+        if etag_matches(if_none_match, etag):
+            # The body is still returned so the 304 carries the same ETag the 200 would
+            return report_metadata(report), 304, etag
+        return report_metadata(report), 200, etag
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500, None
 
-@app.route('/api/reports/<report_id>/download', methods=['GET'])
-def download_report(report_id):
-    """Download a stored report by ID"""
+@app.route('/api/reports/<report_id>', methods=['GET'])
+def get_report(report_id):
+    """Retrieve a stored report by ID"""
+    body, status, etag = get_report_response(report_id, request.headers.get('If-None-Match'))
+    return conditional_json(body, status, etag, None)
+
+def download_report_response(report_id, range_header=None, if_none_match=None):
+    """
+    Prepare a stored report for download
+
+    PDF and Excel files are streamed from GridFS in chunks; a single
+    "bytes=" Range is honoured with a 206 partial response. The ETag is the
+    content hash stored with the report, so a matching If-None-Match gets a
+    304 without touching GridFS.
+
+    Args:
+        report_id (str): Report ID
+        range_header (str): Value of the request's Range header, if any
+        if_none_match (str): Value of the request's If-None-Match header, if any
+
+    Returns:
+        tuple: (response body, HTTP status, ETag or None); the body is a
+               ReportFile for PDF and Excel reports (None for their 304) and a
+               dict otherwise
+    """
     try:
         client = get_mongo_client()
         db = client["pharma_hub"]
         reports_collection = db["reports"]
         
-        # Find report
-        report = reports_collection.find_one({"report_id": report_id})
+        # Find report without its content
+        report = reports_collection.find_one({"report_id": report_id}, REPORT_DOWNLOAD_PROJECTION)
         if not report:
-            return jsonify({"error": "Report not found"}), 404
+            return {"error": "Report not found"}, 404, None
         
-        # Close MongoDB connection
-        client.close()
+        etag = make_etag(report.get("content_hash"))
         
-        # For text reports, return the summary
+        # For text reports, return the summary (also with a 304, so its ETag
+        # names the same compressed representation the 200 would)
         if report["report_type"] == "text":
-            return jsonify({
+            body = {
                 "query": report["query"],
                 "summary": report["text_summary"],
                 "timestamp": report["generated_at"]
-            })
+            }
+            return body, 304 if etag_matches(if_none_match, etag) else 200, etag
+        
+        if etag_matches(if_none_match, etag):
+            return None, 304, etag
         
-        # For PDF and Excel reports, return the file data
-        if report["report_type"] in ["pdf", "excel"] and "file_data" in report:
-            from flask import Response
-            import io
+        # For PDF and Excel reports, stream the file
+        if report["report_type"] in REPORT_MIMETYPES:
+            file_data = None
+            if report.get("file_id"):
+                size = report["file_size"]
+            else:
+                # Reports stored before GridFS embed their file in the document
+                legacy = reports_collection.find_one({"report_id": report_id}, {"file_data": 1, "_id": 0})
+                file_data = legacy.get("file_data") if legacy else None
+                if file_data is None:
+                    return {"error": "Report data not available"}, 404, None
+                size = len(file_data)
             
-            # Return binary data as file
-            return Response(
-                report["file_data"],
-                mimetype='application/pdf' if report["report_type"] == "pdf" else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                headers={
-                    "Content-Disposition": f"attachment; filename=report_{report_id}.{report['report_type']}"
-                }
-            )
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                return {"error": "Requested range not satisfiable", "size": size}, 416, None
+            start, end = byte_range or (0, size - 1)
+            
+            if report.get("file_id"):
+                content = iter_report_file(report["file_id"], start, end)
+            else:
+                content = iter([bytes(file_data[start:end + 1])])
+            
+            return ReportFile(
+                content=content,
+                mimetype=REPORT_MIMETYPES[report["report_type"]],
+                filename=f"report_{report_id}.{report['report_type']}",
+                length=end - start + 1,
+                content_range=f"bytes {start}-{end}/{size}" if byte_range else None
+            ), 206 if byte_range else 200, etag
         
-        return jsonify({"error": "Report data not available"}), 404
+        return {"error": "Report data not available"}, 404, None
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500, None
+
+def report_file_headers(report_file, etag=None):
+    """
+    Build the response headers for a streamed report download
+
+    Args:
+        report_file (ReportFile): Report payload
+        etag (str): ETag of the report content, if known
+
+    Returns:
+        dict: HTTP headers
+    """
+    headers = {
+        "Content-Disposition": f"attachment; filename={report_file.filename}",
+        "Content-Length": str(report_file.length),
+        "Accept-Ranges": "bytes"
+    }
+    if report_file.content_range:
+        headers["Content-Range"] = report_file.content_range
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+@app.route('/api/reports/<report_id>/download', methods=['GET'])
+def download_report(report_id):
+    """Download a stored report by ID"""
+    body, status, etag = download_report_response(
+        report_id, request.headers.get('Range'), request.headers.get('If-None-Match')
+    )
+    if isinstance(body, ReportFile):
+        return Response(
+            body.content,
+            status=status,
+            mimetype=body.mimetype,
+            headers=report_file_headers(body, etag),
+            direct_passthrough=True
+        )
+    return conditional_json(body, status, etag, None)
 
 if __name__ == '__main__':
     print(f"Starting Pharma Mind Nexus API server on port {PORT}")
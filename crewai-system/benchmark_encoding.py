@@ -0,0 +1,86 @@
+"""
+Benchmark JSON serialization and response compression per endpoint
+
+Requires the API server to be running on localhost:4000. For each endpoint
+the body is fetched uncompressed, with gzip and with brotli, and the
+decoded payload is re-serialized locally with json and orjson.
+"""
+import gzip
+import json
+import time
+import requests
+from api import encoding
+
+API_BASE = "http://localhost:4000"
+
+ENDPOINTS = [
+    ("GET", "/api/exim", {"hs_code": "3004", "top_n": 10}),
+    ("GET", "/api/trials", {"condition": "diabetes", "top_n": 10}),
+    ("GET", "/api/patents", {"query": "diabetes", "top_n": 10}),
+    ("GET", "/api/web-intel", {"query": "diabetes market", "num_results": 5}),
+    ("GET", "/api/iqvia", {}),
+    ("GET", "/api/internal-docs", {"query": "diabetes"})
+]
+
+
+def fetch(path, params, accept_encoding):
+    """Fetch an endpoint and return (response, body as sent on the wire, seconds)"""
+    started = time.perf_counter()
+    response = requests.get(f"{API_BASE}{path}", params=params, headers={"Accept-Encoding": accept_encoding}, stream=True, timeout=60)
+    # Reading the raw stream consumes it: response.content is empty afterwards
+    wire = response.raw.read(decode_content=False)
+    return response, wire, time.perf_counter() - started
+
+
+def decode_wire(wire, content_encoding):
+    """Undo the response's Content-Encoding"""
+    if content_encoding == "gzip":
+        return gzip.decompress(wire)
+    if content_encoding == "br":
+        return encoding.brotli.decompress(wire)
+    return wire
+
+
+def time_serializer(fn, body, rounds=20):
+    """Average milliseconds to serialize body"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(body)
+    return (time.perf_counter() - started) * 1000 / rounds
+
+
+def benchmark():
+    """Print bytes and time saved per endpoint"""
+    print(f"Serializer: {encoding.get_encoding_metrics()['serializer']}, compression threshold {encoding.COMPRESS_MIN_BYTES} bytes\n")
+    print(f"{'endpoint':<20}{'identity':>10}{'gzip':>10}{'br':>10}{'saved':>8}{'json ms':>10}{'orjson ms':>11}")
+    for method, path, params in ENDPOINTS:
+        try:
+            # Warm the response cache so every variant measures the same body
+            response, wire, _ = fetch(path, params, "identity")
+            identity_size = len(wire)
+            body = json.loads(decode_wire(wire, response.headers.get("Content-Encoding")))
+            _, wire, _ = fetch(path, params, "gzip")
+            gzip_size = len(wire)
+            br_response, wire, _ = fetch(path, params, "br")
+            br_size = len(wire) if br_response.headers.get("Content-Encoding") == "br" else None
+
+            best = min(size for size in (gzip_size, br_size) if size is not None)
+            saved = f"{100 * (1 - best / identity_size):.0f}%" if identity_size else "-"
+            json_ms = time_serializer(lambda b: json.dumps(b, default=str), body)
+            orjson_ms = time_serializer(encoding.dumps, body)
+            print(f"{path:<20}{identity_size:>10}{gzip_size:>10}{br_size if br_size is not None else '-':>10}{saved:>8}{json_ms:>10.3f}{orjson_ms:>11.3f}")
+        except Exception as e:
+            print(f"{path:<20} error: {str(e)}")
+
+    print("\nServer-side totals (GET /api/metrics/encoding):")
+    try:
+        metrics = requests.get(f"{API_BASE}/api/metrics/encoding", timeout=10).json()["encoding"]
+        for endpoint, stats in metrics["endpoints"].items():
+            print(f"  {endpoint}: {stats['bytes_saved']} bytes saved over {stats['responses']} responses, "
+                  f"serialize {stats['serialize_ms']} ms, compress {stats['compress_ms']} ms")
+    except Exception as e:
+        print(f"  error: {str(e)}")
+
+
+if __name__ == "__main__":
+    benchmark()
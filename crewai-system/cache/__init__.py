@@ -0,0 +1,12 @@
+"""
+Init file for cache module
+"""
+from .response_cache import response_cache, get_cache_metrics
+from .profile_cache import user_profiles, get_profile_cache_metrics
+
+__all__ = [
+    "response_cache",
+    "get_cache_metrics",
+    "user_profiles",
+    "get_profile_cache_metrics"
+]
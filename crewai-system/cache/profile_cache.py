@@ -0,0 +1,91 @@
+"""
+Short-TTL in-process cache of user profiles
+
+GET /api/auth/me is served from here instead of querying the users
+collection on every call. Entries are dropped on PUT /api/auth/me in the
+worker that handled the update; other workers pick the change up once
+their entry expires, so the TTL bounds how stale a profile can be.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+USER_PROFILE_TTL = float(os.environ.get("USER_PROFILE_TTL", 60))
+USER_PROFILE_MAX_ENTRIES = int(os.environ.get("USER_PROFILE_MAX_ENTRIES", 10000))
+
+
+class ProfileCache:
+    """Bounded LRU of user profiles with a fixed time-to-live"""
+
+    def __init__(self, ttl=USER_PROFILE_TTL, max_entries=USER_PROFILE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id):
+        """
+        Get a cached profile
+
+        Args:
+            user_id (str): User ID
+
+        Returns:
+            dict: Profile, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[user_id]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return dict(entry[1])
+
+    def set(self, user_id, profile):
+        """Cache a profile for the TTL"""
+        with self._lock:
+            self._entries[user_id] = (time.time() + self.ttl, dict(profile))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Drop a user's cached profile"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        """
+        Get hit/miss counters
+
+        Returns:
+            dict: Cache metrics
+        """
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), ttl=self.ttl)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+user_profiles = ProfileCache()
+
+
+def get_profile_cache_metrics():
+    """
+    Get metrics for the process-wide user profile cache
+
+    Returns:
+        dict: Cache metrics
+    """
+    return user_profiles.stats()
@@ -0,0 +1,550 @@
+"""
+Tiered response cache for agent endpoints
+
+Tier 1 is an in-process LRU bounded by total payload size. Tier 2 is an
+optional shared store (a Mongo collection with a TTL index) so that several
+worker processes can reuse each other's results. Entries are fresh for the
+source's TTL, then served stale for a further window while a background
+refresh recomputes them. Responses built from mock data because a real
+source failed are only kept for CACHE_FALLBACK_TTL and never served stale,
+so a brief upstream outage does not pin mock data for a full TTL.
+
+Each entry carries a content hash of its serialized body, which the API
+serves as the response's ETag.
+"""
+import os
+import json
+import hashlib
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+from dotenv import load_dotenv
+from telemetry import metrics
+
+# Load environment variables
+load_dotenv()
+
+# Fresh TTL in seconds per source (override with CACHE_TTL_<SOURCE>, e.g. CACHE_TTL_WEB_INTEL)
+DEFAULT_TTLS = {
+    "exim": 3600,
+    "trials": 900,
+    "patents": 1800,
+    "web-intel": 600,
+    "iqvia": 3600,
+    "trials-page": 900,
+    "patents-page": 1800
+}
+
+# How long past its TTL an entry may still be served while it is refreshed, as a multiple of the TTL
+STALE_FACTOR = float(os.environ.get("CACHE_STALE_FACTOR", 1.0))
+
+# Fresh TTL in seconds of responses that fell back to mock data (0 to not cache them)
+CACHE_FALLBACK_TTL = int(os.environ.get("CACHE_FALLBACK_TTL", 30))
+
+# Parameters that identify something (codes, cursors): kept verbatim, never turned into numbers,
+# so e.g. hs_code "0304" does not become 304
+IDENTIFIER_PARAMS = {"hs_code", "ipc_code", "nct_id", "cursor"}
+
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+
+
+# ETag of the entry the current get_or_compute call served or stored (None if uncached)
+_served_etag = contextvars.ContextVar("served_etag", default=None)
+
+
+def served_etag():
+    """
+    Get the content hash of the cache entry behind the last response built in this context
+
+    Returns:
+        str: Hex digest, or None if the response was not served from or stored in the cache
+    """
+    return _served_etag.get()
+
+
+def content_hash(serialized):
+    """Hex digest used as the ETag of a serialized cache value"""
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def get_ttl(source):
+    """
+    Get the fresh TTL for a source
+
+    Args:
+        source (str): Cache namespace (e.g. "trials")
+
+    Returns:
+        int: TTL in seconds
+    """
+    env_name = "CACHE_TTL_" + source.upper().replace("-", "_")
+    return int(os.environ.get(env_name, DEFAULT_TTLS.get(source, 300)))
+
+
+def normalize_params(params, defaults=None):
+    """
+    Normalize request parameters so equivalent requests share a cache key
+
+    Missing parameters take their defaults, empty values are dropped, text is
+    lower-cased with collapsed whitespace and numeric strings become numbers.
+    IDENTIFIER_PARAMS are only stripped of surrounding whitespace.
+
+    Args:
+        params (dict): Request parameters
+        defaults (dict): Default values for parameters the endpoint fills in
+
+    Returns:
+        dict: Normalized parameters
+    """
+    if hasattr(params, "to_dict"):
+        params = params.to_dict()
+    merged = dict(defaults or {})
+    merged.update({k: v for k, v in (params or {}).items() if v not in (None, "")})
+
+    normalized = {}
+    for key, value in merged.items():
+        if key.lower() in IDENTIFIER_PARAMS:
+            value = str(value).strip()
+        elif isinstance(value, str):
+            value = " ".join(value.split()).lower()
+            if value.lstrip("-").isdigit():
+                value = int(value)
+        normalized[key.lower()] = value
+    return normalized
+
+
+def is_fallback_body(body):
+    """Whether a response body says it was built from mock data"""
+    return isinstance(body, dict) and str(body.get("source", "")).startswith("Mock Data")
+
+
+def compute_tracked(compute):
+    """
+    Run a response builder, noting whether it fell back to mock data
+
+    Args:
+        compute (callable): Returns (body, status)
+
+    Returns:
+        tuple: (response body, HTTP status, True if any mock data generator ran)
+    """
+    fallbacks, token = metrics.track_fallbacks()
+    try:
+        body, status = compute()
+    finally:
+        metrics.stop_tracking_fallbacks(token)
+    return body, status, bool(fallbacks) or is_fallback_body(body)
+
+
+def make_key(source, params, defaults=None):
+    """
+    Build a cache key from the source name and normalized parameters
+
+    Args:
+        source (str): Cache namespace
+        params (dict): Request parameters
+        defaults (dict): Parameter defaults
+
+    Returns:
+        str: Cache key
+    """
+    canonical = json.dumps(normalize_params(params, defaults), sort_keys=True, default=str)
+    return f"{source}:{hashlib.sha1(canonical.encode('utf-8')).hexdigest()}"
+
+
+class CacheEntry:
+    """A cached response body with its freshness window and content hash"""
+
+    __slots__ = ("value", "size", "etag", "created_at", "fresh_until", "stale_until")
+
+    def __init__(self, value, size, ttl, stale_ttl, created_at=None, etag=None):
+        self.value = value
+        self.size = size
+        self.etag = etag
+        self.created_at = created_at or time.time()
+        self.fresh_until = self.created_at + ttl
+        self.stale_until = self.fresh_until + stale_ttl
+
+    def state(self, now=None):
+        """Return "fresh", "stale" or "expired" """
+        now = now or time.time()
+        if now < self.fresh_until:
+            return "fresh"
+        if now < self.stale_until:
+            return "stale"
+        return "expired"
+
+
+class LRUTier:
+    """In-process LRU bounded by entry count and total payload bytes"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.state() == "expired":
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class MongoTier:
+    """Shared cache tier stored in a Mongo collection with a TTL index"""
+
+    def __init__(self, collection_name="response_cache", database_name="pharma_hub"):
+        self.collection_name = collection_name
+        self.database_name = database_name
+        self._indexed = False
+
+    def _collection(self):
+        from db.connection import get_mongo_client
+        collection = get_mongo_client()[self.database_name][self.collection_name]
+        if not self._indexed:
+            collection.create_index("stale_until", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def get(self, key):
+        doc = self._collection().find_one({"_id": key})
+        if not doc:
+            return None
+        created_at = doc["created_at"]
+        entry = CacheEntry(
+            json.loads(doc["value"]),
+            doc["size"],
+            doc["ttl"],
+            doc["stale_ttl"],
+            created_at=created_at,
+            etag=content_hash(doc["value"])
+        )
+        return entry if entry.state() != "expired" else None
+
+    def set(self, key, entry, serialized):
+        self._collection().replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "value": serialized,
+                "size": entry.size,
+                "created_at": entry.created_at,
+                "ttl": entry.fresh_until - entry.created_at,
+                "stale_ttl": entry.stale_until - entry.fresh_until,
+                "stale_until": datetime.utcfromtimestamp(entry.stale_until)
+            },
+            upsert=True
+        )
+
+    def delete(self, key):
+        self._collection().delete_one({"_id": key})
+
+
+class ResponseCache:
+    """Two-tier cache with per-source TTLs and stale-while-revalidate"""
+
+    def __init__(self, local=None, shared=None, refresh_workers=4):
+        self.local = local or LRUTier()
+        self.shared = shared
+        self._refresh_workers = refresh_workers
+        self._refresh_executor = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _count(self, source, name, delta=1):
+        with self._lock:
+            counters = self._counters.setdefault(source, {
+                "hits": 0, "stale_hits": 0, "shared_hits": 0, "misses": 0,
+                "stores": 0, "fallbacks": 0, "refreshes": 0, "refresh_errors": 0, "shared_errors": 0, "prefetches": 0
+            })
+            counters[name] += delta
+
+    def _lookup(self, source, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+        if self.shared is None:
+            return None
+        try:
+            entry = self.shared.get(key)
+        except Exception as e:
+            print(f"Error reading shared cache: {str(e)}")
+            self._count(source, "shared_errors")
+            return None
+        if entry is not None:
+            self._count(source, "shared_hits")
+            self.local.set(key, entry)
+        return entry
+
+    def store(self, source, key, value, ttl=None, fallback=False):
+        """
+        Store a response body under a key
+
+        Args:
+            source (str): Cache namespace
+            key (str): Cache key
+            value (dict): JSON-serializable response body
+            ttl (int): Fresh TTL in seconds (defaults to the source TTL)
+            fallback (bool): The body was built from mock data: keep it for
+                             CACHE_FALLBACK_TTL only, with no stale window
+
+        Returns:
+            CacheEntry: The stored entry, or None if it was not cached
+        """
+        if fallback:
+            self._count(source, "fallbacks")
+            if CACHE_FALLBACK_TTL <= 0:
+                return None
+            ttl, stale_ttl = CACHE_FALLBACK_TTL, 0
+        else:
+            ttl = ttl if ttl is not None else get_ttl(source)
+            stale_ttl = ttl * STALE_FACTOR
+        serialized = json.dumps(value, default=str)
+        entry = CacheEntry(value, len(serialized), ttl, stale_ttl, etag=content_hash(serialized))
+        self.local.set(key, entry)
+        self._count(source, "stores")
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, serialized)
+            except Exception as e:
+                print(f"Error writing shared cache: {str(e)}")
+                self._count(source, "shared_errors")
+        return entry
+
+    def invalidate(self, key):
+        """Remove a key from every tier"""
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                print(f"Error deleting from shared cache: {str(e)}")
+
+    def _schedule_refresh(self, source, key, compute, counter="refreshes"):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=self._refresh_workers, thread_name_prefix="cache-refresh")
+        self._count(source, counter)
+
+        def refresh():
+            try:
+                body, status, fallback = compute_tracked(compute)
+                if status == 200:
+                    self.store(source, key, body, fallback=fallback)
+            except Exception as e:
+                print(f"Error refreshing cache entry {key}: {str(e)}")
+                self._count(source, "refresh_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def get_or_compute(self, source, params, compute, defaults=None):
+        """
+        Return a cached response or compute and cache it
+
+        Only 200 responses are cached, and mock data fallbacks only briefly
+        (see store). A stale entry is returned immediately
+        and recomputed in the background. The served entry's content hash is
+        available afterwards from served_etag().
+
+        Args:
+            source (str): Cache namespace
+            params (dict): Request parameters
+            compute (callable): Returns (body, status) on a miss
+            defaults (dict): Parameter defaults used for key normalization
+
+        Returns:
+            tuple: (response body, HTTP status)
+        """
+        key = make_key(source, params, defaults)
+        entry = self._lookup(source, key)
+        if entry is not None:
+            state = entry.state()
+            if state == "fresh":
+                self._count(source, "hits")
+                _served_etag.set(entry.etag)
+                return entry.value, 200
+            if state == "stale":
+                self._count(source, "stale_hits")
+                self._schedule_refresh(source, key, compute)
+                _served_etag.set(entry.etag)
+                return entry.value, 200
+
+        self._count(source, "misses")
+        body, status, fallback = compute_tracked(compute)
+        entry = self.store(source, key, body, fallback=fallback) if status == 200 else None
+        _served_etag.set(entry.etag if entry is not None else None)
+        return body, status
+
+    def prefetch(self, source, params, compute, defaults=None):
+        """
+        Compute and cache a response in the background unless it is already cached
+
+        Used to warm the next page of a paginated result before it is requested.
+
+        Args:
+            source (str): Cache namespace
+            params (dict): Request parameters the response will be requested with
+            compute (callable): Returns (body, status)
+            defaults (dict): Parameter defaults used for key normalization
+        """
+        key = make_key(source, params, defaults)
+        entry = self.local.get(key)
+        if entry is not None and entry.state() == "fresh":
+            return
+        self._schedule_refresh(source, key, compute, counter="prefetches")
+
+    def get_many_or_compute(self, source, items, compute_many, defaults=None):
+        """
+        Batch form of get_or_compute: look up every item, compute the misses together
+
+        Entries use the same keys as get_or_compute, so batch and single-item
+        requests share cached responses.
+
+        Args:
+            source (str): Cache namespace
+            items (dict): Item key -> request parameters
+            compute_many (callable): Takes {item key: params} for the misses and
+                                     returns {item key: (body, status)}
+            defaults (dict): Parameter defaults used for key normalization
+
+        Returns:
+            dict: Item key -> (response body, HTTP status)
+        """
+        outcomes = {}
+        missing = {}
+        for item, params in items.items():
+            key = make_key(source, params, defaults)
+            entry = self._lookup(source, key)
+            state = entry.state() if entry is not None else None
+            if state == "fresh":
+                self._count(source, "hits")
+                outcomes[item] = (entry.value, 200)
+            elif state == "stale":
+                self._count(source, "stale_hits")
+                self._schedule_refresh(source, key, lambda i=item, p=params: compute_many({i: p})[i])
+                outcomes[item] = (entry.value, 200)
+            else:
+                self._count(source, "misses")
+                missing[item] = params
+
+        if missing:
+            fallbacks, token = metrics.track_fallbacks()
+            try:
+                computed = compute_many(missing)
+            finally:
+                metrics.stop_tracking_fallbacks(token)
+            for item, params in missing.items():
+                body, status = computed[item]
+                if status == 200:
+                    # A mock fallback anywhere in the batch may have produced this item
+                    fallback = bool(fallbacks) or is_fallback_body(body)
+                    self.store(source, make_key(source, params, defaults), body, fallback=fallback)
+                outcomes[item] = (body, status)
+        return outcomes
+
+    def cached(self, source, defaults=None):
+        """
+        Decorator for response builders taking a params dict and returning (body, status)
+
+        The undecorated builder stays available as ``fn.uncached``.
+
+        Args:
+            source (str): Cache namespace
+            defaults (dict): Parameter defaults used for key normalization
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(params):
+                return self.get_or_compute(source, params, lambda: fn(params), defaults)
+            wrapper.uncached = fn
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """
+        Get hit/miss counters per source plus tier sizes
+
+        Returns:
+            dict: Cache metrics
+        """
+        with self._lock:
+            sources = {name: dict(values) for name, values in self._counters.items()}
+        for counters in sources.values():
+            lookups = counters["hits"] + counters["stale_hits"] + counters["misses"]
+            counters["hit_ratio"] = round((counters["hits"] + counters["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return {
+            "sources": sources,
+            "local": self.local.stats(),
+            "shared": type(self.shared).__name__ if self.shared is not None else None
+        }
+
+
+def _build_default_cache():
+    shared = None
+    if os.environ.get("RESPONSE_CACHE_SHARED", "").lower() == "mongo":
+        shared = MongoTier()
+    return ResponseCache(shared=shared)
+
+
+response_cache = _build_default_cache()
+
+
+def get_cache_metrics():
+    """
+    Get metrics for the process-wide response cache
+
+    Returns:
+        dict: Cache metrics
+    """
+    return response_cache.stats()
@@ -5,6 +5,7 @@ import os
 from google.cloud import bigquery
 from dotenv import load_dotenv
 import json
+from telemetry.timing import span
 
 # Load environment variables
 load_dotenv()
@@ -68,8 +69,9 @@ def search_patents_bigquery(query_term, limit=10):
         """
         
         # Execute query
-        query_job = client.query(query)
-        results = query_job.result()
+        with span("bigquery.query"):
+            query_job = client.query(query)
+            results = query_job.result()
         
         # Process results
         patents = []
@@ -128,8 +130,9 @@ def get_patent_statistics_bigquery(query_term):
         LIMIT 10;
         """
         
-        assignee_job = client.query(assignee_query)
-        assignee_results = assignee_job.result()
+        with span("bigquery.query"):
+            assignee_job = client.query(assignee_query)
+            assignee_results = assignee_job.result()
         
         top_assignees = []
         for row in assignee_results:
@@ -156,8 +159,9 @@ def get_patent_statistics_bigquery(query_term):
         LIMIT 10;
         """
         
-        cpc_job = client.query(cpc_query)
-        cpc_results = cpc_job.result()
+        with span("bigquery.query"):
+            cpc_job = client.query(cpc_query)
+            cpc_results = cpc_job.result()
         
         top_cpc_codes = []
         for row in cpc_results:
@@ -3,23 +3,90 @@ ClinicalTrials.gov API integration
 """
 import requests
 import json
-from urllib.parse import urlencode
-import time
-import random
+import os
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from data_sources import http_client
+from data_sources.single_flight import single_flight
+from data_sources.throttle import get_throttle
+from telemetry.timing import timed
 
 # Base URL for ClinicalTrials.gov API
 BASE_URL = "https://clinicaltrials.gov/api/v2"
 
-def search_studies(query, max_results=10):
+# Request rate allowed by ClinicalTrials.gov (about 50 requests per minute per IP),
+# shared by every request this process makes
+CLINICALTRIALS_RATE_PER_S = float(os.environ.get("CLINICALTRIALS_RATE_PER_S", 50 / 60))
+CLINICALTRIALS_BURST = int(os.environ.get("CLINICALTRIALS_BURST", 10))
+
+# Study detail requests in flight at once (deep mode and the loader)
+CLINICALTRIALS_DETAIL_WORKERS = int(os.environ.get("CLINICALTRIALS_DETAIL_WORKERS", 8))
+
+# Result pages fetched ahead by iter_studies at once, across all iterators
+CLINICALTRIALS_PREFETCH_WORKERS = int(os.environ.get("CLINICALTRIALS_PREFETCH_WORKERS", 4))
+
+throttle = get_throttle("clinicaltrials", CLINICALTRIALS_RATE_PER_S, CLINICALTRIALS_BURST)
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+# Formatted study field -> ClinicalTrials.gov field paths it is built from
+STUDY_FIELDS = {
+    "nct_id": ["protocolSection.identificationModule.nctId"],
+    "title": ["protocolSection.identificationModule.briefTitle", "protocolSection.identificationModule.officialTitle"],
+    "brief_title": ["protocolSection.identificationModule.briefTitle"],
+    "official_title": ["protocolSection.identificationModule.officialTitle"],
+    "condition": ["protocolSection.conditionsModule.conditions"],
+    "phase": ["protocolSection.designModule.phases"],
+    "study_type": ["protocolSection.designModule.studyType"],
+    "status": ["protocolSection.statusModule.overallStatus"],
+    "sponsor": ["protocolSection.sponsorCollaboratorsModule.leadSponsor.name"],
+    "last_update": ["protocolSection.statusModule.lastUpdateSubmitDate"],
+    "start_date": ["protocolSection.statusModule.startDateStruct.date"],
+    "completion_date": ["protocolSection.statusModule.completionDateStruct.date"],
+    "enrollment": ["protocolSection.designModule.enrollmentInfo.count"],
+    "brief_summary": ["protocolSection.descriptionModule.briefSummary"],
+    "detailed_description": ["protocolSection.descriptionModule.detailedDescription"]
+}
+
+def api_fields(fields):
+    """
+    Translate formatted study fields into a ClinicalTrials.gov ``fields`` value
+
+    The NCT ID is always requested so studies can still be identified.
+
+    Args:
+        fields (list): Formatted study field names, or None for everything
+
+    Returns:
+        str: Comma-separated field paths, or None to request full studies
+    """
+    if not fields:
+        return None
+    paths = []
+    for name in ["nct_id"] + list(fields):
+        for path in STUDY_FIELDS[name]:
+            if path not in paths:
+                paths.append(path)
+    return ",".join(paths)
+
+@timed("clinicaltrials.search")
+def search_studies(query, max_results=10, fields=None, page_token=None, filters=None):
     """
     Search for clinical studies using the ClinicalTrials.gov API
     
     Args:
-        query (str): Search query (condition, intervention, etc.)
+        query (str): Search query (condition, intervention, etc.); None to match all studies
         max_results (int): Maximum number of results to return
+        fields (list): Formatted study fields to fetch (None for full studies)
+        page_token (str): nextPageToken from a previous page of the same search
+        filters (dict): Extra ClinicalTrials.gov search parameters, e.g.
+                        {"filter.overallStatus": "RECRUITING"} or {"filter.advanced": ...}
         
     Returns:
-        dict: API response with studies data
+        dict: API response with studies data (and nextPageToken if more pages exist)
     """
     try:
         # Endpoint for searching studies
@@ -27,13 +94,20 @@ def search_studies(query, max_results=10):
         
         # Parameters for the search
         params = {
-            "query.term": query,
             "pageSize": min(max_results, 100),  # API limit is 100 per page
             "sort": "LastUpdatePostDate"  # Sort by last update date
         }
+        if query:
+            params["query.term"] = query
+        if filters:
+            params.update(filters)
+        if fields:
+            params["fields"] = api_fields(fields)
+        if page_token:
+            params["pageToken"] = page_token
         
         # Make the request
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params, throttle=throttle)
         response.raise_for_status()
         
         # Parse JSON response
@@ -50,12 +124,14 @@ def search_studies(query, max_results=10):
         print(f"Unexpected error in ClinicalTrials.gov API search: {str(e)}")
         raise
 
-def get_study_details(nct_id):
+@timed("clinicaltrials.detail")
+def get_study_details(nct_id, fields=None):
     """
     Get detailed information for a specific study by NCT ID
     
     Args:
         nct_id (str): NCT ID of the study
+        fields (list): Formatted study fields to fetch (None for the full study)
         
     Returns:
         dict: Study details
@@ -63,9 +139,10 @@ def get_study_details(nct_id):
     try:
         # Endpoint for getting a single study
         url = f"{BASE_URL}/studies/{nct_id}"
+        params = {"fields": api_fields(fields)} if fields else None
         
         # Make the request
-        response = requests.get(url)
+        response = http_client.get(url, params, throttle=throttle)
         response.raise_for_status()
         
         # Parse JSON response
@@ -82,6 +159,136 @@ def get_study_details(nct_id):
         print(f"Unexpected error in ClinicalTrials.gov API study details: {str(e)}")
         raise
 
+def _get_pool(name, workers):
+    """Return a named worker pool, creating it on first use in this process"""
+    global _pools, _pools_pid
+    pid = os.getpid()
+    with _pools_lock:
+        if _pools_pid != pid:
+            _pools = {}
+            _pools_pid = pid
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"ct-{name}")
+        return _pools[name]
+
+def get_detail_executor():
+    """
+    Return the study detail worker pool, creating it on first use in this process
+
+    Returns:
+        ThreadPoolExecutor: Bounded pool shared by all detail fetches
+    """
+    return _get_pool("detail", CLINICALTRIALS_DETAIL_WORKERS)
+
+def iter_study_pages(query, fields=None, filters=None, page_size=100, limit=None):
+    """
+    Follow nextPageToken through a search, fetching each page ahead of time
+    
+    As soon as a page arrives the request for the next one is started on
+    the prefetch pool, so the caller's work on a page overlaps the
+    download of the next. At most two pages are held at once. No page is
+    requested past the one that reaches ``limit``, so a limited search
+    does not spend throttle tokens on pages it will not read.
+    
+    Args:
+        query (str): Search query, or None to match all studies
+        fields (list): Formatted study fields to fetch (None for full studies)
+        filters (dict): Extra ClinicalTrials.gov search parameters
+        page_size (int): Studies per request (at most 100)
+        limit (int): Studies the caller will read at most (None for all)
+    
+    Yields:
+        list: Raw studies of each page, in order
+    """
+    executor = _get_pool("prefetch", CLINICALTRIALS_PREFETCH_WORKERS)
+    
+    def fetch(page_token):
+        return executor.submit(contextvars.copy_context().run, search_studies, query, page_size, fields, page_token, filters)
+    
+    future = fetch(None)
+    fetched = 0
+    try:
+        while future is not None:
+            page = future.result()
+            studies = page.get("studies", [])
+            fetched += len(studies)
+            next_page_token = page.get("nextPageToken")
+            if limit and fetched >= limit:
+                next_page_token = None
+            future = fetch(next_page_token) if next_page_token else None
+            yield studies
+    finally:
+        # The consumer stopped early: drop the page nobody will read
+        if future is not None:
+            future.cancel()
+
+def iter_studies(query, fields=None, filters=None, page_size=100, limit=None, raw=False):
+    """
+    Lazily yield every study matching a search, page after page
+    
+    Memory stays constant however many studies match, so loaders and
+    batch jobs can stream entire result sets.
+    
+    Args:
+        query (str): Search query, or None to match all studies
+        fields (list): Formatted study fields to fetch and return (None for all)
+        filters (dict): Extra ClinicalTrials.gov search parameters, e.g.
+                        {"filter.overallStatus": "RECRUITING"}
+        page_size (int): Studies per request (at most 100)
+        limit (int): Stop after this many studies (None for all)
+        raw (bool): Yield the raw API studies instead of formatted records
+    
+    Yields:
+        dict: A formatted study (or the raw study with ``raw``)
+    """
+    if raw:
+        fetch_fields = fields
+    else:
+        fetch_fields = fields or list(STUDY_FIELDS)
+    if limit:
+        page_size = min(page_size, limit)
+    
+    count = 0
+    pages = iter_study_pages(query, fetch_fields, filters, page_size, limit)
+    try:
+        for studies in pages:
+            for study in studies:
+                yield study if raw else format_study_for_display(study, fields)
+                count += 1
+                if limit and count >= limit:
+                    return
+    finally:
+        pages.close()
+
+def get_study_details_many(nct_ids, fields=None):
+    """
+    Fetch several studies concurrently
+    
+    Requests run on a bounded pool and all share the process-wide
+    ClinicalTrials.gov throttle, so N studies take about N / rate seconds
+    once the burst is used up rather than N round-trips.
+    
+    Args:
+        nct_ids (list): NCT IDs of the studies
+        fields (list): Formatted study fields to fetch (None for full studies)
+        
+    Returns:
+        list: Study details in the order of nct_ids; a failed fetch is
+              returned as its exception
+    """
+    executor = get_detail_executor()
+    futures = [
+        executor.submit(contextvars.copy_context().run, get_study_details, nct_id, fields)
+        for nct_id in nct_ids
+    ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
 def get_search_areas():
     """
     Get available search areas from ClinicalTrials.gov API
@@ -91,7 +298,7 @@ def get_search_areas():
     """
     try:
         url = f"{BASE_URL}/studies/search-areas"
-        response = requests.get(url)
+        response = http_client.get(url, throttle=throttle)
         response.raise_for_status()
         data = response.json()
         return data
@@ -108,7 +315,7 @@ def get_enums():
     """
     try:
         url = f"{BASE_URL}/studies/enums"
-        response = requests.get(url)
+        response = http_client.get(url, throttle=throttle)
         response.raise_for_status()
         data = response.json()
         return data
@@ -125,7 +332,7 @@ def get_study_statistics():
     """
     try:
         url = f"{BASE_URL}/stats/size"
-        response = requests.get(url)
+        response = http_client.get(url, throttle=throttle)
         response.raise_for_status()
         data = response.json()
         return data
@@ -133,12 +340,13 @@ def get_study_statistics():
         print(f"Error getting study statistics: {str(e)}")
         raise
 
-def format_study_for_display(study_data):
+def format_study_for_display(study_data, fields=None):
     """
     Format study data for display in the agent response
     
     Args:
         study_data (dict): Raw study data from API
+        fields (list): Formatted fields to keep (None for all)
         
     Returns:
         dict: Formatted study data
@@ -156,6 +364,9 @@ def format_study_for_display(study_data):
         # Extract description module
         description_module = protocol_section.get("descriptionModule", {})
         
+        # Extract conditions module
+        conditions_module = protocol_section.get("conditionsModule", {})
+        
         # Extract sponsor collaborators module
         sponsor_collaborators_module = protocol_section.get("sponsorCollaboratorsModule", {})
         
@@ -168,7 +379,7 @@ def format_study_for_display(study_data):
             "title": identification_module.get("briefTitle", identification_module.get("officialTitle", "")),
             "brief_title": identification_module.get("briefTitle", ""),
             "official_title": identification_module.get("officialTitle", ""),
-            "condition": ", ".join(description_module.get("conditions", [])),
+            "condition": ", ".join(conditions_module.get("conditions", description_module.get("conditions", []))),
             "phase": ", ".join(design_module.get("phases", [])),
             "study_type": design_module.get("studyType", ""),
             "status": status_module.get("overallStatus", ""),
@@ -181,6 +392,9 @@ def format_study_for_display(study_data):
             "detailed_description": description_module.get("detailedDescription", "")
         }
         
+        if fields:
+            formatted_study = {name: formatted_study[name] for name in fields}
+        
         return formatted_study
         
     except Exception as e:
@@ -195,54 +409,86 @@ def format_study_for_display(study_data):
             "sponsor": "Unknown Sponsor"
         }
 
-def search_clinical_trials(query, max_results=10):
+def fetch_study_details(studies, fields=None):
     """
-    Search for clinical trials and format results for the agent
+    Re-fetch each study's full record and format it (deep mode)
+    
+    Args:
+        studies (list): Raw studies from a search page
+        fields (list): Formatted study fields to fetch and return (None for all)
+        
+    Returns:
+        list: Formatted studies, falling back to the search page data when a
+              detail request fails
+    """
+    nct_ids = [study.get("protocolSection", {}).get("identificationModule", {}).get("nctId") for study in studies]
+    details = iter(get_study_details_many([nct_id for nct_id in nct_ids if nct_id], fields))
+    
+    formatted_studies = []
+    for study, nct_id in zip(studies, nct_ids):
+        detailed_study = next(details) if nct_id else study
+        if isinstance(detailed_study, Exception):
+            print(f"Error getting details for study {nct_id}: {str(detailed_study)}")
+            # Continue with the search page data
+            detailed_study = study
+        formatted_studies.append(format_study_for_display(detailed_study, fields))
+    return formatted_studies
+
+@single_flight
+def search_clinical_trials_page(query, page_size=10, fields=None, page_token=None, deep=False):
+    """
+    Fetch one page of clinical trials and format it for the agent
+    
+    The search is asked for exactly the fields format_study_for_display
+    reads, so a page costs a single request. With ``deep`` every study is
+    then re-fetched (concurrently, within the shared rate limit).
     
     Args:
         query (str): Search query
-        max_results (int): Maximum number of results to return
+        page_size (int): Studies per page
+        fields (list): Formatted study fields to fetch and return (None for all)
+        page_token (str): Token of the page to fetch (None for the first page)
+        deep (bool): Fetch each study's full record with get_study_details
         
     Returns:
-        list: Formatted list of clinical trials
+        dict: {"studies": formatted trials, "next_page_token": token or None}
     """
     try:
-        # Search for studies
-        search_results = search_studies(query, max_results)
+        # Search for studies, requesting only what the formatted studies use
+        search_results = search_studies(query, page_size, fields or list(STUDY_FIELDS), page_token)
         
         # Extract studies from the response
         studies = search_results.get("studies", [])
         
-        # Format each study for display
-        formatted_studies = []
-        for study in studies:
-            # Get detailed information for each study
-            try:
-                nct_id = study.get("protocolSection", {}).get("identificationModule", {}).get("nctId")
-                if nct_id:
-                    # Get detailed study information
-                    detailed_study = get_study_details(nct_id)
-                    formatted_study = format_study_for_display(detailed_study)
-                    formatted_studies.append(formatted_study)
-                else:
-                    # If we can't get NCT ID, format the basic study data
-                    basic_data = format_study_for_display(study)
-                    formatted_studies.append(basic_data)
-            except Exception as e:
-                print(f"Error getting details for study: {str(e)}")
-                # Continue with basic study data
-                basic_data = format_study_for_display(study)
-                formatted_studies.append(basic_data)
-            
-            # Add a small delay to respect API rate limits
-            time.sleep(0.1)
-        
-        return formatted_studies
+        if deep:
+            formatted_studies = fetch_study_details(studies, fields)
+        else:
+            formatted_studies = [format_study_for_display(study, fields) for study in studies]
+        
+        return {
+            "studies": formatted_studies,
+            "next_page_token": search_results.get("nextPageToken")
+        }
         
     except Exception as e:
         print(f"Error in clinical trials search: {str(e)}")
         raise
 
+def search_clinical_trials(query, max_results=10, fields=None, deep=False):
+    """
+    Search for clinical trials and format results for the agent
+    
+    Args:
+        query (str): Search query
+        max_results (int): Maximum number of results to return
+        fields (list): Formatted study fields to fetch and return (None for all)
+        deep (bool): Fetch each study's full record (one extra request per study)
+        
+    Returns:
+        list: Formatted list of clinical trials
+    """
+    return search_clinical_trials_page(query, max_results, fields, deep=deep)["studies"]
+
 # Example usage:
 # studies = search_clinical_trials("diabetes", max_results=5)
 # for study in studies:
@@ -0,0 +1,431 @@
+"""
+ClinicalTrials.gov mirror
+
+Keeps a local copy of ClinicalTrials.gov studies in the
+clinical_trials_mirror collection, so interactive trial searches are a
+MongoDB text index lookup instead of a round-trip to the live API, and
+keep working while the API is down. The first sync is a bulk load of every
+study (or every study matching CT_MIRROR_QUERY). Later syncs only fetch
+studies whose LastUpdatePostDate is on or after the watermark of the last
+successful sync, and upsert them by NCT ID. The watermark, sync results
+and a lease that stops two workers from syncing at once are kept in the
+sync_state collection.
+
+Run a sync with ``python -m data_sources.clinicaltrials_mirror sync`` (or
+``bulk`` to reload everything, ``schedule`` to keep syncing), or set
+CT_MIRROR_SYNC_INTERVAL_S to let the API server sync in the background.
+The mirror's indexes are created by init_db.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+from dotenv import load_dotenv
+from pymongo import ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db.connection import get_mongo_client
+from data_sources import clinicaltrials_api
+
+# Load environment variables
+load_dotenv()
+
+MIRROR_COLLECTION = "clinical_trials_mirror"
+SYNC_STATE_COLLECTION = "sync_state"
+SYNC_STATE_ID = "clinicaltrials_mirror"
+
+# Search the mirror covers (unset mirrors the whole registry)
+CT_MIRROR_QUERY = os.environ.get("CT_MIRROR_QUERY") or None
+
+# Studies upserted per bulk_write
+CT_MIRROR_BATCH_SIZE = int(os.environ.get("CT_MIRROR_BATCH_SIZE", 500))
+
+# Seconds between background syncs in the API server (0 disables them)
+CT_MIRROR_SYNC_INTERVAL_S = int(os.environ.get("CT_MIRROR_SYNC_INTERVAL_S", 0))
+
+# Interactive searches use the live API once the last sync is older than this
+CT_MIRROR_MAX_STALENESS_H = float(os.environ.get("CT_MIRROR_MAX_STALENESS_H", 48))
+
+# How long a sync may go without progress before another worker takes over
+CT_MIRROR_LEASE_S = int(os.environ.get("CT_MIRROR_LEASE_S", 900))
+
+# Sync state is re-read at most this often by searches
+MIRROR_STATE_TTL_S = 30
+
+MIRROR_TOKEN_PREFIX = "mirror:"
+
+# Every formatted field plus the date delta syncs are keyed on
+SYNC_FIELDS = clinicaltrials_api.api_fields(list(clinicaltrials_api.STUDY_FIELDS)) + \
+    ",protocolSection.statusModule.lastUpdatePostDateStruct"
+
+_state_cache = {}
+_scheduler = None
+_scheduler_stop = threading.Event()
+_scheduler_lock = threading.Lock()
+
+def delta_filter(watermark):
+    """
+    Build the search filter for studies posted as updated since a watermark
+
+    Args:
+        watermark (str): Date (YYYY-MM-DD) of the last successful sync
+
+    Returns:
+        dict: ClinicalTrials.gov search parameters
+    """
+    return {"filter.advanced": f"AREA[LastUpdatePostDate]RANGE[{watermark},MAX]"}
+
+def next_watermark(started_at):
+    """
+    Get the watermark to store after a sync that started at started_at
+
+    LastUpdatePostDate has no time of day and the range filter is
+    inclusive, so the next sync re-reads the day before the run started.
+    Upserts are idempotent, so the overlap only costs a few requests and
+    no update posted while the sync ran is missed.
+
+    Args:
+        started_at (datetime): UTC start time of the sync
+
+    Returns:
+        str: Watermark date (YYYY-MM-DD)
+    """
+    return (started_at - timedelta(days=1)).date().isoformat()
+
+def study_to_mirror_doc(study, synced_at):
+    """
+    Transform a raw ClinicalTrials.gov study into a mirror document
+
+    Args:
+        study (dict): Study fetched with SYNC_FIELDS
+        synced_at (datetime): Time of the sync
+
+    Returns:
+        dict: Formatted study keyed by NCT ID, or None if it has no NCT ID
+    """
+    doc = clinicaltrials_api.format_study_for_display(study)
+    if not doc.get("nct_id"):
+        return None
+    status_module = study.get("protocolSection", {}).get("statusModule", {})
+    doc["_id"] = doc["nct_id"]
+    doc["last_update_post_date"] = status_module.get("lastUpdatePostDateStruct", {}).get("date", "")
+    doc["synced_at"] = synced_at
+    return doc
+
+def parse_mirror_token(page_token):
+    """
+    Read the offset from a mirror page token
+
+    Args:
+        page_token (str): next_page_token of a mirror page
+
+    Returns:
+        int: Offset of the next page, or None if it is not a mirror token
+    """
+    if not page_token or not page_token.startswith(MIRROR_TOKEN_PREFIX):
+        return None
+    try:
+        return max(0, int(page_token[len(MIRROR_TOKEN_PREFIX):]))
+    except ValueError:
+        return None
+
+def _state_collection(database_name):
+    return get_mongo_client()[database_name][SYNC_STATE_COLLECTION]
+
+def acquire_lease(owner, database_name="pharma_hub"):
+    """
+    Take the sync lease unless another worker holds an unexpired one
+
+    Args:
+        owner (str): Unique ID of this sync run
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        dict: Sync state after taking the lease, or None if it is held
+    """
+    now = datetime.utcnow()
+    try:
+        return _state_collection(database_name).find_one_and_update(
+            {"_id": SYNC_STATE_ID, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"lease_owner": owner, "lease_until": now + timedelta(seconds=CT_MIRROR_LEASE_S)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The state document exists and its lease is still held
+        return None
+
+def renew_lease(owner, database_name="pharma_hub"):
+    """
+    Extend the sync lease
+
+    Args:
+        owner (str): ID the lease was taken with
+        database_name (str): Name of the MongoDB database
+
+    Raises:
+        RuntimeError: If the lease expired and another worker took it
+    """
+    result = _state_collection(database_name).update_one(
+        {"_id": SYNC_STATE_ID, "lease_owner": owner},
+        {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=CT_MIRROR_LEASE_S)}}
+    )
+    if result.matched_count == 0:
+        raise RuntimeError("Mirror sync lease was lost to another worker")
+
+def release_lease(owner, updates, database_name="pharma_hub"):
+    """
+    Release the sync lease and record the outcome of the sync
+
+    Args:
+        owner (str): ID the lease was taken with
+        updates (dict): Sync state fields to set
+        database_name (str): Name of the MongoDB database
+    """
+    updates = dict(updates, lease_owner=None, lease_until=None)
+    _state_collection(database_name).update_one({"_id": SYNC_STATE_ID, "lease_owner": owner}, {"$set": updates})
+    _state_cache.pop(database_name, None)
+
+def upsert_studies(studies, synced_at, on_batch=None, database_name="pharma_hub"):
+    """
+    Upsert streamed studies into the mirror in batches
+
+    Args:
+        studies (iterable): Raw studies fetched with SYNC_FIELDS
+        synced_at (datetime): Time of the sync
+        on_batch (callable): Called after each batch (e.g. to renew the lease)
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        int: Number of studies written
+    """
+    collection = get_mongo_client()[database_name][MIRROR_COLLECTION]
+    docs = (doc for doc in (study_to_mirror_doc(study, synced_at) for study in studies) if doc)
+    written = 0
+    while True:
+        batch = list(islice(docs, CT_MIRROR_BATCH_SIZE))
+        if not batch:
+            return written
+        collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+        written += len(batch)
+        print(f"Mirrored {written} clinical trials so far")
+        if on_batch:
+            on_batch()
+
+def sync_mirror(full=False, database_name="pharma_hub"):
+    """
+    Bring the mirror up to date with ClinicalTrials.gov
+
+    Runs a bulk load when asked to, when the mirror has never completed a
+    sync or when CT_MIRROR_QUERY changed since it was loaded; otherwise a
+    delta sync from the stored watermark. The watermark only moves forward
+    after a sync completes, so a failed sync is simply repeated.
+
+    Args:
+        full (bool): Reload every study instead of syncing changes
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        dict: Sync summary, or None if another worker is already syncing
+    """
+    owner = uuid.uuid4().hex
+    state = acquire_lease(owner, database_name)
+    if state is None:
+        print("ClinicalTrials.gov mirror sync already running in another worker")
+        return None
+
+    started_at = datetime.utcnow()
+    watermark = state.get("watermark")
+    if full or not watermark or state.get("query") != CT_MIRROR_QUERY:
+        mode, filters = "bulk", {"fields": SYNC_FIELDS}
+    else:
+        mode, filters = "delta", dict(delta_filter(watermark), fields=SYNC_FIELDS)
+    print(f"Starting ClinicalTrials.gov mirror {mode} sync" + (f" since {watermark}" if mode == "delta" else ""))
+
+    try:
+        studies = clinicaltrials_api.iter_studies(CT_MIRROR_QUERY, filters=filters, raw=True)
+        written = upsert_studies(studies, started_at, lambda: renew_lease(owner, database_name), database_name)
+    except Exception as e:
+        print(f"Error syncing ClinicalTrials.gov mirror: {str(e)}")
+        release_lease(owner, {"last_error": str(e), "last_error_at": datetime.utcnow()}, database_name)
+        raise
+
+    summary = {
+        "mode": mode,
+        "studies": written,
+        "watermark": next_watermark(started_at),
+        "started_at": started_at.isoformat(),
+        "duration_s": round((datetime.utcnow() - started_at).total_seconds(), 1)
+    }
+    release_lease(owner, {
+        "watermark": summary["watermark"],
+        "query": CT_MIRROR_QUERY,
+        "last_sync_at": started_at,
+        "last_sync": summary,
+        "last_error": None
+    }, database_name)
+    print(f"ClinicalTrials.gov mirror {mode} sync wrote {written} studies in {summary['duration_s']}s")
+    return summary
+
+def get_sync_state(database_name="pharma_hub", max_age_s=MIRROR_STATE_TTL_S):
+    """
+    Get the mirror's sync state, re-reading it at most every max_age_s seconds
+
+    Args:
+        database_name (str): Name of the MongoDB database
+        max_age_s (float): How old the cached state may be
+
+    Returns:
+        dict: Sync state document (empty if the mirror was never synced)
+    """
+    cached = _state_cache.get(database_name)
+    if cached and time.monotonic() - cached[0] < max_age_s:
+        return cached[1]
+    state = _state_collection(database_name).find_one({"_id": SYNC_STATE_ID}) or {}
+    _state_cache[database_name] = (time.monotonic(), state)
+    return state
+
+def mirror_age_hours(state, now=None):
+    """
+    Hours since the start of the last completed sync
+
+    Args:
+        state (dict): Sync state document
+        now (datetime): Current UTC time (for tests)
+
+    Returns:
+        float: Age in hours, or None if no sync has completed
+    """
+    last_sync_at = state.get("last_sync_at")
+    if not last_sync_at:
+        return None
+    now = now or datetime.utcnow()
+    return (now - last_sync_at).total_seconds() / 3600
+
+def search_mirror(condition, phase=None, status=None, top_n=10, fields=None, offset=0,
+                  max_staleness_h=CT_MIRROR_MAX_STALENESS_H, database_name="pharma_hub"):
+    """
+    Search the mirror with its text index, best matches first
+
+    Args:
+        condition (str): Medical condition to search for
+        phase (str): Optional phase filter
+        status (str): Optional status filter
+        top_n (int): Page size
+        fields (list): Trial fields to return (None for all)
+        offset (int): Matches to skip (from a mirror page token)
+        max_staleness_h (float): Refuse to answer when the last completed sync is
+                                 older than this; None serves whatever the mirror
+                                 holds (used when the live API is failing)
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        dict: {"studies", "next_page_token", "synced_at"}, or None when the
+              mirror is not fresh enough to answer
+    """
+    state = get_sync_state(database_name)
+    if max_staleness_h is not None:
+        age = mirror_age_hours(state)
+        if age is None or age > max_staleness_h:
+            return None
+
+    query = {"$text": {"$search": condition}}
+    if phase:
+        query["phase"] = {"$regex": re.escape(phase), "$options": "i"}
+    if status:
+        query["status"] = {"$regex": re.escape(status), "$options": "i"}
+    projection = {name: 1 for name in (fields or clinicaltrials_api.STUDY_FIELDS)}
+    projection["_id"] = 0
+    projection["score"] = {"$meta": "textScore"}
+
+    collection = get_mongo_client()[database_name][MIRROR_COLLECTION]
+    cursor = collection.find(query, projection).sort([("score", {"$meta": "textScore"})]).skip(offset).limit(top_n + 1)
+    studies = list(cursor)
+    for study in studies:
+        study.pop("score", None)
+
+    has_more = len(studies) > top_n
+    synced_at = state.get("last_sync_at")
+    return {
+        "studies": studies[:top_n],
+        "next_page_token": f"{MIRROR_TOKEN_PREFIX}{offset + top_n}" if has_more else None,
+        "synced_at": synced_at.isoformat() if synced_at else None
+    }
+
+def _sync_loop(interval_s, database_name):
+    while not _scheduler_stop.is_set():
+        try:
+            sync_mirror(database_name=database_name)
+        except Exception as e:
+            print(f"Scheduled ClinicalTrials.gov mirror sync failed: {str(e)}")
+        _scheduler_stop.wait(interval_s)
+
+def start_sync_scheduler(interval_s=CT_MIRROR_SYNC_INTERVAL_S, database_name="pharma_hub"):
+    """
+    Sync the mirror now and then every interval_s seconds on a daemon thread
+
+    Every API worker may start a scheduler; the lease makes sure only one
+    of them syncs at a time.
+
+    Args:
+        interval_s (int): Seconds between syncs (0 or less does nothing)
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        threading.Thread: The scheduler thread, or None if disabled
+    """
+    global _scheduler
+    if interval_s <= 0:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler_stop.clear()
+            _scheduler = threading.Thread(
+                target=_sync_loop, args=(interval_s, database_name), name="ct-mirror-sync", daemon=True
+            )
+            _scheduler.start()
+        return _scheduler
+
+def stop_sync_scheduler():
+    """Stop the scheduler after its current sync"""
+    _scheduler_stop.set()
+
+def get_mirror_status(database_name="pharma_hub"):
+    """
+    Get the size, freshness and last sync results of the mirror
+
+    Args:
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        dict: Mirror status
+    """
+    state = get_sync_state(database_name, max_age_s=0)
+    age = mirror_age_hours(state)
+    lease_until = state.get("lease_until")
+    return {
+        "studies": get_mongo_client()[database_name][MIRROR_COLLECTION].estimated_document_count(),
+        "query": state.get("query"),
+        "watermark": state.get("watermark"),
+        "last_sync": state.get("last_sync"),
+        "age_hours": round(age, 2) if age is not None else None,
+        "fresh": age is not None and age <= CT_MIRROR_MAX_STALENESS_H,
+        "syncing": bool(lease_until and lease_until > datetime.utcnow()),
+        "last_error": state.get("last_error"),
+        "scheduler_running": bool(_scheduler and _scheduler.is_alive())
+    }
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "sync"
+    if command == "bulk":
+        sync_mirror(full=True)
+    elif command == "sync":
+        sync_mirror()
+    elif command == "schedule":
+        start_sync_scheduler(CT_MIRROR_SYNC_INTERVAL_S or 6 * 3600).join()
+    else:
+        print("Usage: python -m data_sources.clinicaltrials_mirror [bulk|sync|schedule]")
+        sys.exit(2)
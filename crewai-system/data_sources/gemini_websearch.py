@@ -2,21 +2,34 @@
 Gemini Web Search Integration
 """
 import os
-import requests
+from data_sources import http_client
 import json
 import random
 from dotenv import load_dotenv
+from data_sources.single_flight import single_flight
+from telemetry.timing import span
+from telemetry.metrics import mock_fallback
 
 # Load environment variables
 load_dotenv()
 
-def search_with_gemini(query, num_results=5):
+# Result field -> Google Custom Search item field
+RESULT_FIELDS = {
+    "title": "title",
+    "snippet": "snippet",
+    "link": "link",
+    "source": "displayLink"
+}
+
+@single_flight
+def search_with_gemini(query, num_results=5, fields=None):
     """
     Perform web search using Google Gemini API
     
     Args:
         query (str): Search query
         num_results (int): Number of results to return
+        fields (list): Result fields to fetch and return (None for all)
         
     Returns:
         list: List of search results
@@ -49,22 +62,21 @@ def search_with_gemini(query, num_results=5):
             "q": query,
             "num": min(num_results, 10)  # API limit is 10 per request
         }
+        if fields:
+            # Partial response: only the selected item fields are sent back
+            params["fields"] = "items(" + ",".join(RESULT_FIELDS[name] for name in fields) + ")"
         
         # Make request
-        response = requests.get(url, params=params)
-        response.raise_for_status()
+        with span("google-cse.search"):
+            response = http_client.get(url, params)
+            response.raise_for_status()
         
         # Parse results
         data = response.json()
         results = []
         
         for item in data.get("items", [])[:num_results]:
-            result = {
-                "title": item.get("title"),
-                "snippet": item.get("snippet"),
-                "link": item.get("link"),
-                "source": item.get("displayLink")
-            }
+            result = {name: item.get(RESULT_FIELDS[name]) for name in (fields or RESULT_FIELDS)}
             results.append(result)
         
         # If we got real results, return them
@@ -79,6 +91,7 @@ def search_with_gemini(query, num_results=5):
         # Return mock data as fallback
         return get_mock_web_results(query, num_results)
 
+@mock_fallback("google-cse")
 def get_mock_web_results(query, num_results=5):
     """
     Generate mock web search results for testing
@@ -0,0 +1,261 @@
+"""
+Shared HTTP client for data sources and scrapers
+
+One keep-alive requests.Session is created lazily per upstream host and
+process, so repeated calls reuse pooled connections instead of opening a
+new TLS connection each time. Every request has connect and read
+timeouts, and the number of requests in flight to one host is capped so a
+slow upstream cannot take every worker thread. Idempotent requests that
+fail with a connection error, a timeout, 429 or a 5xx gateway error are
+retried with jittered exponential backoff, waiting at least as long as the
+upstream's Retry-After.
+"""
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from telemetry.timing import span
+
+# Load environment variables
+load_dotenv()
+
+HTTP_CONNECT_TIMEOUT_S = float(os.environ.get("HTTP_CONNECT_TIMEOUT_S", 3.05))
+HTTP_READ_TIMEOUT_S = float(os.environ.get("HTTP_READ_TIMEOUT_S", 20))
+
+# Retries after the first attempt, and the backoff they follow
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE_S = float(os.environ.get("HTTP_BACKOFF_BASE_S", 0.5))
+HTTP_BACKOFF_MAX_S = float(os.environ.get("HTTP_BACKOFF_MAX_S", 10))
+
+# A Retry-After longer than this is not waited for; the response is returned as is
+HTTP_RETRY_AFTER_MAX_S = float(os.environ.get("HTTP_RETRY_AFTER_MAX_S", 30))
+
+# Pooled keep-alive connections per host
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 16))
+
+# Requests in flight per host; override with HTTP_HOST_CONCURRENCY_<HOST>,
+# e.g. HTTP_HOST_CONCURRENCY_API_OPENALEX_ORG=4
+HTTP_HOST_CONCURRENCY = int(os.environ.get("HTTP_HOST_CONCURRENCY", 8))
+HOST_CONCURRENCY = {
+    "eutils.ncbi.nlm.nih.gov": 3,  # NCBI allows 3 requests per second without an API key
+    "www.googleapis.com": 4,
+    "comtradeapi.un.org": 2
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def host_concurrency(host):
+    """
+    Get the in-flight request limit for a host
+
+    Args:
+        host (str): Host name (e.g. clinicaltrials.gov)
+
+    Returns:
+        int: Maximum concurrent requests
+    """
+    env_name = "HTTP_HOST_CONCURRENCY_" + host.upper().replace(".", "_").replace("-", "_")
+    return int(os.environ.get(env_name, HOST_CONCURRENCY.get(host, HTTP_HOST_CONCURRENCY)))
+
+
+def retry_after_seconds(response):
+    """
+    Read a Retry-After header (delta-seconds or HTTP date)
+
+    Args:
+        response (requests.Response): Upstream response
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Delay before a retry: full-jitter exponential backoff, at least Retry-After
+
+    Args:
+        attempt (int): Retry number (0 for the first retry)
+        retry_after (float): Seconds the upstream asked us to wait, if any
+
+    Returns:
+        float: Seconds to sleep
+    """
+    delay = random.uniform(0, min(HTTP_BACKOFF_MAX_S, HTTP_BACKOFF_BASE_S * (2 ** attempt)))
+    return max(delay, retry_after or 0.0)
+
+
+class HostClient:
+    """Keep-alive session and concurrency limit for one upstream host"""
+
+    def __init__(self, host, concurrency, pool_size=HTTP_POOL_SIZE):
+        self.host = host
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, concurrency), max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "errors": 0, "in_flight": 0, "waiting": 0}
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self._stats[name] += delta
+
+    def send(self, method, url, timeout, **kwargs):
+        """Send one request while holding one of the host's slots"""
+        self._count("waiting")
+        self._slots.acquire()
+        self._count("waiting", -1)
+        self._count("in_flight")
+        try:
+            self._count("requests")
+            return self.session.request(method, url, timeout=timeout, **kwargs)
+        finally:
+            self._count("in_flight", -1)
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["concurrency"] = self.concurrency
+        return stats
+
+
+_hosts = {}
+_hosts_pid = None
+_hosts_lock = threading.Lock()
+
+
+def get_host_client(host):
+    """
+    Return the client for a host, creating it on first use in this process
+
+    Args:
+        host (str): Host name
+
+    Returns:
+        HostClient: Shared client for the host
+    """
+    global _hosts, _hosts_pid
+    pid = os.getpid()
+    with _hosts_lock:
+        if _hosts_pid != pid:
+            # Sessions must not be shared with a forked parent
+            _hosts = {}
+            _hosts_pid = pid
+        client = _hosts.get(host)
+        if client is None:
+            client = HostClient(host, host_concurrency(host))
+            _hosts[host] = client
+        return client
+
+
+def request(method, url, timeout=None, retries=None, throttle=None, **kwargs):
+    """
+    Send an HTTP request through the shared per-host client
+
+    Connection errors, timeouts, 429 and 5xx responses are retried for
+    idempotent methods. The final response is returned whatever its
+    status, so callers keep using ``response.raise_for_status()``.
+
+    Args:
+        method (str): HTTP method
+        url (str): Request URL
+        timeout (tuple): (connect, read) timeout in seconds; defaults to
+                         HTTP_CONNECT_TIMEOUT_S / HTTP_READ_TIMEOUT_S
+        retries (int): Retries after the first attempt (defaults to HTTP_MAX_RETRIES,
+                       0 for non-idempotent methods)
+        throttle (Throttle): Upstream rate limit to take a token from before each attempt
+        **kwargs: Passed on to requests (params, headers, json, ...)
+
+    Returns:
+        requests.Response: The upstream response
+
+    Raises:
+        requests.exceptions.RequestException: If the last attempt fails to connect or times out
+    """
+    method = method.upper()
+    client = get_host_client(urlsplit(url).hostname or "")
+    timeout = timeout or (HTTP_CONNECT_TIMEOUT_S, HTTP_READ_TIMEOUT_S)
+    if retries is None:
+        retries = HTTP_MAX_RETRIES if method in IDEMPOTENT_METHODS else 0
+
+    attempt = 0
+    while True:
+        if throttle is not None:
+            throttle.acquire()
+        try:
+            response = client.send(method, url, timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            client._count("errors")
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None and retry_after > HTTP_RETRY_AFTER_MAX_S:
+                return response
+            delay = backoff_delay(attempt, retry_after)
+            response.close()
+
+        client._count("retries")
+        with span("http.backoff"):
+            time.sleep(delay)
+        attempt += 1
+
+
+def get(url, params=None, **kwargs):
+    """
+    Send a GET request through the shared client (see request)
+
+    Args:
+        url (str): Request URL
+        params (dict): Query parameters
+        **kwargs: Options accepted by request
+
+    Returns:
+        requests.Response: The upstream response
+    """
+    return request("GET", url, params=params, **kwargs)
+
+
+def get_http_metrics():
+    """
+    Get per-host request, retry and concurrency counters for this process
+
+    Returns:
+        dict: Host -> counters (requests, retries, errors, in_flight, waiting, concurrency)
+    """
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    return {host: client.stats() for host, client in hosts.items()}
+
+
+def get_waiting_requests():
+    """Requests waiting for a per-host slot, across all hosts (a load shedding signal)"""
+    return sum(stats["waiting"] for stats in get_http_metrics().values())
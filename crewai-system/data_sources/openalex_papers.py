@@ -1,86 +1,118 @@
 """
 OpenAlex integration for fetching academic papers as an alternative to PubMed
 """
-import requests
+from data_sources import http_client
 import os
 from dotenv import load_dotenv
 import json
 from datetime import datetime, timedelta
 import random
+from telemetry.timing import span
 
 # Load environment variables
 load_dotenv()
 
-def search_papers_openalex(query_term, limit=10):
+def format_work(work):
+    """
+    Convert an OpenAlex work into a paper record
+    
+    Args:
+        work (dict): Work from the OpenAlex API
+        
+    Returns:
+        dict: Paper record
+    """
+    # Extract relevant information
+    paper = {
+        "paper_id": work.get("id", ""),
+        "doi": work.get("doi", ""),
+        "title": work.get("title", ""),
+        "abstract": work.get("abstract", "")[:500] + "..." if work.get("abstract") and len(work.get("abstract", "")) > 500 else work.get("abstract", ""),
+        "publication_date": work.get("publication_date", ""),
+        "authorships": [],
+        "concepts": [],
+        "cited_by_count": work.get("cited_by_count", 0),
+        "journal": work.get("primary_location", {}).get("source", {}).get("display_name", "") if work.get("primary_location") else "",
+        "type": work.get("type", "")
+    }
+    
+    # Extract authors
+    for authorship in work.get("authorships", []):
+        author = authorship.get("author", {})
+        institution = authorship.get("institutions", [{}])[0] if authorship.get("institutions") else {}
+        
+        paper["authorships"].append({
+            "author_name": author.get("display_name", ""),
+            "institution": institution.get("display_name", ""),
+            "position": authorship.get("author_position", "")
+        })
+    
+    # Extract concepts (topics)
+    for concept in work.get("concepts", []):
+        if concept.get("level") <= 2:  # Only top-level concepts
+            paper["concepts"].append({
+                "name": concept.get("display_name", ""),
+                "score": concept.get("score", 0)
+            })
+    
+    return paper
+
+def search_papers_openalex_page(query_term, limit=10, cursor="*", select=None):
+    """
+    Fetch one page of academic papers using OpenAlex cursor paging
+    
+    Args:
+        query_term (str): Term to search for in paper titles/abstracts
+        limit (int): Papers per page
+        cursor (str): "*" for the first page, then the returned next_cursor
+        select (list): OpenAlex work fields to fetch (e.g. ["id", "title"]); None for all.
+                       Paper keys built from unselected fields come back empty
+        
+    Returns:
+        dict: {"papers": paper records, "next_cursor": cursor or None}
+    """
+    # Get base URL from environment
+    base_url = os.environ.get("OPENALEX_API_BASE", "https://api.openalex.org")
+    
+    # Construct URL for works endpoint
+    url = f"{base_url}/works"
+    
+    # Parameters for search
+    params = {
+        "search": query_term,
+        "per-page": min(limit, 25),  # OpenAlex limit is 25 per page
+        "sort": "cited_by_count:desc",  # Sort by citations
+        "cursor": cursor
+    }
+    if select:
+        params["select"] = ",".join(select)
+    
+    # Make request
+    with span("openalex.search"):
+        response = http_client.get(url, params)
+        response.raise_for_status()
+    
+    # Parse results
+    data = response.json()
+    papers = [format_work(work) for work in data.get("results", [])]
+    next_cursor = data.get("meta", {}).get("next_cursor") if papers else None
+    
+    return {"papers": papers, "next_cursor": next_cursor}
+
+def search_papers_openalex(query_term, limit=10, select=None):
     """
     Search for academic papers using OpenAlex API
     
     Args:
         query_term (str): Term to search for in paper titles/abstracts
         limit (int): Maximum number of results to return
+        select (list): OpenAlex work fields to fetch (None for all)
         
     Returns:
         list: List of paper records
     """
     try:
-        # Get base URL from environment
-        base_url = os.environ.get("OPENALEX_API_BASE", "https://api.openalex.org")
-        
-        # Construct URL for works endpoint
-        url = f"{base_url}/works"
-        
-        # Parameters for search
-        params = {
-            "search": query_term,
-            "per-page": min(limit, 25),  # OpenAlex limit is 25 per page
-            "sort": "cited_by_count:desc"  # Sort by citations
-        }
-        
-        # Make request
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        # Parse results
-        data = response.json()
-        papers = []
-        
-        for work in data.get("results", []):
-            # Extract relevant information
-            paper = {
-                "paper_id": work.get("id", ""),
-                "doi": work.get("doi", ""),
-                "title": work.get("title", ""),
-                "abstract": work.get("abstract", "")[:500] + "..." if work.get("abstract") and len(work.get("abstract", "")) > 500 else work.get("abstract", ""),
-                "publication_date": work.get("publication_date", ""),
-                "authorships": [],
-                "concepts": [],
-                "cited_by_count": work.get("cited_by_count", 0),
-                "journal": work.get("primary_location", {}).get("source", {}).get("display_name", "") if work.get("primary_location") else "",
-                "type": work.get("type", "")
-            }
-            
-            # Extract authors
-            for authorship in work.get("authorships", []):
-                author = authorship.get("author", {})
-                institution = authorship.get("institutions", [{}])[0] if authorship.get("institutions") else {}
-                
-                paper["authorships"].append({
-                    "author_name": author.get("display_name", ""),
-                    "institution": institution.get("display_name", ""),
-                    "position": authorship.get("author_position", "")
-                })
-            
-            # Extract concepts (topics)
-            for concept in work.get("concepts", []):
-                if concept.get("level") <= 2:  # Only top-level concepts
-                    paper["concepts"].append({
-                        "name": concept.get("display_name", ""),
-                        "score": concept.get("score", 0)
-                    })
-            
-            papers.append(paper)
-            
-        return papers
+        return search_papers_openalex_page(query_term, limit, select=select)["papers"]
         
     except Exception as e:
         print(f"Error searching papers in OpenAlex: {str(e)}")
@@ -1,7 +1,7 @@
 """
 PubMed Patent Integration for retrieving patent information
 """
-import requests
+from data_sources import http_client
 import json
 from urllib.parse import quote_plus
 import random
@@ -10,6 +10,9 @@ import re
 import xml.etree.ElementTree as ET
 import os
 from dotenv import load_dotenv
+from data_sources.single_flight import single_flight
+from telemetry.timing import span
+from telemetry.metrics import mock_fallback
 
 # Load environment variables
 load_dotenv()
@@ -63,118 +66,165 @@ def extract_medical_condition(query):
     # Default fallback
     return "medical condition"
 
-def search_patents_pubmed(query, max_results=10):
+ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+EFETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+
+def _api_key_params():
+    """Return the PubMed API key parameter if one is configured"""
+    pubmed_api_key = os.environ.get("PUBMED_API_KEY")
+    if pubmed_api_key and pubmed_api_key != "your_pubmed_api_key_here":
+        return {"api_key": pubmed_api_key}
+    return {}
+
+def parse_patent_articles(xml_text):
     """
-    Search for patents related to a query using PubMed API
+    Convert an efetch XML response into patent-like entries
+    
+    Args:
+        xml_text (str): efetch response body
+        
+    Returns:
+        list: Patent-like entries, one per PubmedArticle
+    """
+    root = ET.fromstring(xml_text)
+    
+    patents = []
+    for article in root.findall(".//PubmedArticle"):
+        # Extract PMID
+        pmid_elem = article.find(".//MedlineCitation/PMID")
+        pmid = pmid_elem.text if pmid_elem is not None else str(random.randint(10000000, 99999999))
+        
+        # Extract title
+        title_elem = article.find(".//ArticleTitle")
+        title = title_elem.text if title_elem is not None else "Untitled"
+        
+        # Extract authors
+        authors = []
+        for author in article.findall(".//Author"):
+            lastname = author.find("LastName")
+            firstname = author.find("ForeName")
+            if lastname is not None and firstname is not None:
+                authors.append(f"{firstname.text} {lastname.text}")
+            elif lastname is not None:
+                authors.append(lastname.text)
+        
+        # Extract publication date
+        pub_date = article.find(".//PubDate")
+        year_elem = pub_date.find("Year") if pub_date is not None else None
+        year = year_elem.text if year_elem is not None else "Unknown"
+        
+        # Create a patent-like entry
+        patent_entry = {
+            "patent_id": f"PUBMED:{pmid}",
+            "title": title,
+            "assignee": ", ".join(authors) if authors else "Unknown Assignee",
+            "filing_date": f"{year}-01-01" if year != "Unknown" else "Unknown",
+            "grant_date": f"{year}-12-31" if year != "Unknown" else "Unknown",
+            "expiry_date": f"{int(year)+20}-12-31" if year != "Unknown" and year.isdigit() else "Unknown",
+            "ipc_codes": ["A61K"]  # Generic medical code
+        }
+        patents.append(patent_entry)
+    
+    return patents
+
+@single_flight
+def search_patents_pubmed_page(query, max_results=10, retstart=0, webenv=None, query_key=None):
+    """
+    Fetch one page of patent-like PubMed results
+    
+    The first page runs esearch with the history server (usehistory=y) and
+    then efetch for its IDs. Later pages pass the returned WebEnv/query_key
+    and retstart straight to efetch, so each costs a single request.
     
     Args:
         query (str): Search query
-        max_results (int): Maximum number of results to return
+        max_results (int): Results per page
+        retstart (int): Offset of the page in the search results
+        webenv (str): WebEnv from the first page (None for the first page)
+        query_key (str): query_key from the first page
         
     Returns:
-        list: List of patent-like results
+        dict: {"patents": entries, "next": {"retstart", "webenv", "query_key"} or None}
     """
-    try:
+    if not webenv:
         # Extract clean medical condition from query
         clean_query = extract_medical_condition(query)
         
-        # Get PubMed API key from environment
-        pubmed_api_key = os.environ.get("PUBMED_API_KEY")
-        
-        # PubMed API endpoint for searching
         # Note: PubMed doesn't have direct patent search, so we'll search for articles
         # and extract patent-like information
-        base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        
-        # Parameters for searching publications related to the query
         params = {
             "db": "pubmed",
             "term": f"{clean_query} AND (patent[pt] OR drug[ti] OR therapy[ti] OR treatment[ti] OR composition[ti])",
             "retmax": max_results,
+            "retstart": retstart,
             "retmode": "json",
-            "sort": "relevance"
+            "sort": "relevance",
+            "usehistory": "y"
         }
+        params.update(_api_key_params())
         
-        # Add API key if available
-        if pubmed_api_key and pubmed_api_key != "your_pubmed_api_key_here":
-            params["api_key"] = pubmed_api_key
-        
-        # Make request to get PMIDs
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
+        # Make request to get PMIDs and the history server handle
+        with span("pubmed.search"):
+            response = http_client.get(ESEARCH_URL, params)
+            response.raise_for_status()
         
-        data = response.json()
-        pmids = data.get("esearchresult", {}).get("idlist", [])
+        result = response.json().get("esearchresult", {})
+        pmids = result.get("idlist", [])
+        total = int(result.get("count", 0))
+        webenv = result.get("webenv")
+        query_key = result.get("querykey")
         
         if not pmids:
-            print("No PubMed results found, returning mock data")
-            return get_mock_patent_data(clean_query, max_results)
+            return {"patents": [], "next": None}
         
-        # Get detailed information for each PMID
-        details_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+        details_params = {"db": "pubmed", "id": ",".join(pmids[:max_results]), "retmode": "xml"}
+    else:
+        total = None
         details_params = {
             "db": "pubmed",
-            "id": ",".join(pmids[:max_results]),
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": retstart,
+            "retmax": max_results,
             "retmode": "xml"
         }
-        
-        # Add API key if available
-        if pubmed_api_key and pubmed_api_key != "your_pubmed_api_key_here":
-            details_params["api_key"] = pubmed_api_key
-        
-        details_response = requests.get(details_url, params=details_params)
+    details_params.update(_api_key_params())
+    
+    with span("pubmed.fetch"):
+        details_response = http_client.get(EFETCH_URL, details_params)
         details_response.raise_for_status()
+    
+    # Parse XML response to extract relevant information
+    patents = parse_patent_articles(details_response.text)[:max_results]
+    
+    next_start = retstart + max_results
+    has_more = len(patents) >= max_results and (total is None or next_start < total)
+    return {
+        "patents": patents,
+        "next": {"retstart": next_start, "webenv": webenv, "query_key": query_key} if has_more and webenv else None
+    }
+
+def search_patents_pubmed(query, max_results=10):
+    """
+    Search for patents related to a query using PubMed API
+    
+    Args:
+        query (str): Search query
+        max_results (int): Maximum number of results to return
         
-        # Parse XML response to extract relevant information
-        root = ET.fromstring(details_response.text)
-        
-        patents = []
-        for article in root.findall(".//PubmedArticle"):
-            # Extract title
-            title_elem = article.find(".//ArticleTitle")
-            title = title_elem.text if title_elem is not None else "Untitled"
-            
-            # Extract authors
-            authors = []
-            for author in article.findall(".//Author"):
-                lastname = author.find("LastName")
-                firstname = author.find("ForeName")
-                if lastname is not None and firstname is not None:
-                    authors.append(f"{firstname.text} {lastname.text}")
-                elif lastname is not None:
-                    authors.append(lastname.text)
-            
-            # Extract journal info
-            journal_elem = article.find(".//Journal/Title")
-            journal = journal_elem.text if journal_elem is not None else "Unknown Journal"
-            
-            # Extract publication date
-            pub_date = article.find(".//PubDate")
-            year_elem = pub_date.find("Year") if pub_date is not None else None
-            year = year_elem.text if year_elem is not None else "Unknown"
-            
-            # Create a patent-like entry
-            patent_entry = {
-                "patent_id": f"PUBMED:{pmids[len(patents)]}" if len(patents) < len(pmids) else f"PUBMED:{random.randint(10000000, 99999999)}",
-                "title": title,
-                "assignee": ", ".join(authors) if authors else "Unknown Assignee",
-                "filing_date": f"{year}-01-01" if year != "Unknown" else "Unknown",
-                "grant_date": f"{year}-12-31" if year != "Unknown" else "Unknown",
-                "expiry_date": f"{int(year)+20}-12-31" if year != "Unknown" and year.isdigit() else "Unknown",
-                "ipc_codes": ["A61K"]  # Generic medical code
-            }
-            patents.append(patent_entry)
-            
-            # Limit to requested number of results
-            if len(patents) >= max_results:
-                break
+    Returns:
+        list: List of patent-like results
+    """
+    try:
+        patents = search_patents_pubmed_page(query, max_results)["patents"]
         
         # If we got real results, return them
         if patents:
             return patents
         
         # Otherwise, return mock data
-        return get_mock_patent_data(clean_query, max_results)
+        print("No PubMed results found, returning mock data")
+        return get_mock_patent_data(extract_medical_condition(query), max_results)
         
     except Exception as e:
         print(f"Error in PubMed patent search: {str(e)}")
@@ -182,6 +232,7 @@ def search_patents_pubmed(query, max_results=10):
         clean_query = extract_medical_condition(query)
         return get_mock_patent_data(clean_query, max_results)
 
+@mock_fallback("pubmed")
 def get_mock_patent_data(query, count=10):
     """
     Generate mock patent data for testing
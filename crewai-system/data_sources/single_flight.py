@@ -0,0 +1,130 @@
+"""
+Single-flight coalescing for data source calls
+
+When several requests ask an upstream the same question at the same time,
+only the first caller (the leader) performs the call; the others wait for
+it and receive the same result, or the same exception if it failed.
+"""
+import copy
+import inspect
+import json
+import threading
+from functools import wraps
+from telemetry.timing import span
+
+
+class _Call:
+    """An in-flight upstream call shared by a leader and its waiters"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "errors": 0}
+
+    def do(self, key, fn):
+        """
+        Run fn once for all concurrent callers using the same key
+
+        Waiters receive deep copies of a snapshot taken before they are woken,
+        and the leader keeps the original, so callers filtering or annotating
+        results cannot affect each other.
+
+        Args:
+            key (str): Coalescing key
+            fn (callable): Zero-argument callable performing the upstream call
+
+        Returns:
+            The result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["leaders"] += 1
+                leader = True
+
+        if not leader:
+            with span("singleflight.wait"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+                self._calls.pop(key, None)
+            call.done.set()
+            raise
+
+        with self._lock:
+            self._calls.pop(key, None)
+            waiters = call.waiters
+        if waiters:
+            # Waiters copy from a private snapshot, so the leader's caller is
+            # free to modify its result while they are still copying
+            call.result = copy.deepcopy(result)
+        call.done.set()
+        return result
+
+    def stats(self):
+        """
+        Get coalescing counters and waiter counts for in-flight keys
+
+        Returns:
+            dict: Leader, coalesced and error totals plus per-key waiters
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = {key: call.waiters for key, call in self._calls.items()}
+        return stats
+
+
+_group = SingleFlight()
+
+
+def single_flight(fn):
+    """
+    Decorator coalescing identical concurrent calls to a data source function
+
+    Calls are identical when the function and all bound arguments (after
+    defaults are applied) are equal.
+    """
+    signature = inspect.signature(fn)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = f"{fn.__module__}.{fn.__name__}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+        return _group.do(key, lambda: fn(*args, **kwargs))
+
+    return wrapper
+
+
+def get_single_flight_metrics():
+    """
+    Get single-flight metrics for this process
+
+    Returns:
+        dict: Coalescing counters and in-flight waiter counts
+    """
+    return _group.stats()
@@ -0,0 +1,90 @@
+"""
+Process-wide request rate limits for upstream APIs
+
+Each upstream gets one token bucket shared by every thread in the process,
+so concurrent requests together stay within the provider's published
+rate. Callers reserve a token and sleep until it is due; reservations are
+handed out in call order, so waiting is fair across requests.
+"""
+import threading
+import time
+from telemetry.timing import span
+
+
+class Throttle:
+    """Blocking token bucket: at most ``burst`` calls at once, then ``rate`` per second"""
+
+    def __init__(self, name, rate, burst=1):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0}
+
+    def acquire(self):
+        """
+        Take a token, sleeping until one is available
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self._stats["acquired"] += 1
+            if wait:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += wait
+        if wait:
+            with span(f"{self.name}.throttle"):
+                time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["rate"] = self.rate
+        stats["burst"] = self.burst
+        return stats
+
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(name, rate, burst=1):
+    """
+    Get the shared throttle for an upstream, creating it on first use
+
+    Args:
+        name (str): Upstream name (also the span prefix, e.g. "clinicaltrials")
+        rate (float): Requests per second
+        burst (int): Requests allowed back to back before the rate applies
+
+    Returns:
+        Throttle: The process-wide throttle for this upstream
+    """
+    with _throttles_lock:
+        throttle = _throttles.get(name)
+        if throttle is None:
+            throttle = Throttle(name, rate, burst)
+            _throttles[name] = throttle
+        return throttle
+
+
+def get_throttle_metrics():
+    """
+    Get per-upstream throttle counters for this process
+
+    Returns:
+        dict: Upstream name -> acquired/waited counts, total wait and limits
+    """
+    with _throttles_lock:
+        throttles = dict(_throttles)
+    return {name: throttle.stats() for name, throttle in throttles.items()}
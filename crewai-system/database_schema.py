@@ -83,7 +83,9 @@ COLLECTIONS = {
         "query": str,
         "report_type": str,  # pdf, excel, text
         "file_path": str,
-        "file_data": bytes,  # Binary data for the report
+        "file_id": object,   # GridFS file ID in the report_files bucket (pdf/excel)
+        "file_size": int,    # Size of the stored file in bytes
+        "text_summary": str, # Summary for text reports
         "generated_at": str,  # ISO format datetime
         "generated_by": str,  # User ID if available
         "metadata": dict      # Additional metadata
@@ -0,0 +1,16 @@
+"""
+Init file for db module
+"""
+from .connection import get_mongo_client, get_database, close_mongo_client, get_pool_metrics
+from .report_files import get_report_bucket, upload_report_file, iter_report_file, parse_range
+
+__all__ = [
+    "get_mongo_client",
+    "get_database",
+    "close_mongo_client",
+    "get_pool_metrics",
+    "get_report_bucket",
+    "upload_report_file",
+    "iter_report_file",
+    "parse_range"
+]
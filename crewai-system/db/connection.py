@@ -0,0 +1,236 @@
+"""
+Shared MongoDB connection manager
+
+A single pooled MongoClient is created lazily per process and reused by the
+API handlers, agents, scrapers and init scripts. Callers must not close the
+client they get back; the pool is torn down with close_mongo_client().
+"""
+import os
+import threading
+import time
+from pymongo import MongoClient, monitoring
+from dotenv import load_dotenv
+from telemetry.timing import record
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_DATABASE = "pharma_hub"
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Connection pool listener that keeps running counters for metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkout_started = {}
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        with self._lock:
+            self.connections_open = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.pool_clears = 0
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+
+    def snapshot(self):
+        """Return a copy of the current counters"""
+        with self._lock:
+            return {
+                "connections_open": self.connections_open,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+                "checkout_wait_avg_ms": round(1000 * self.checkout_wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "checkout_wait_max_ms": round(1000 * self.checkout_wait_max, 3)
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            self.connections_open = max(0, self.connections_open - 1)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._checkout_started[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._checkout_started.pop(threading.get_ident(), None)
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            started = self._checkout_started.pop(threading.get_ident(), None)
+            if started is not None:
+                waited = time.perf_counter() - started
+                self.checkout_wait_total += waited
+                self.checkout_wait_max = max(self.checkout_wait_max, waited)
+            self.checkouts += 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+
+pool_metrics = PoolMetricsListener()
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Command listener reporting each command as a mongo.<collection> timing span"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = target if isinstance(target, str) else event.command_name
+
+    def _finish(self, event, error):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), event.command_name)
+        record(f"mongo.{collection}", event.duration_micros / 1000, error)
+
+    def succeeded(self, event):
+        self._finish(event, False)
+
+    def failed(self, event):
+        self._finish(event, True)
+
+
+command_timing = CommandTimingListener()
+
+
+def get_pool_settings():
+    """
+    Read connection pool settings from the environment
+
+    Returns:
+        dict: Keyword arguments for MongoClient
+    """
+    return {
+        "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", 50)),
+        "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", 0)),
+        "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 300000)),
+        "waitQueueTimeoutMS": int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+        "connectTimeoutMS": int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 10000)),
+        "serverSelectionTimeoutMS": int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+    }
+
+
+def _reset_after_fork():
+    """Drop the client inherited from the parent process without closing its sockets"""
+    global _client, _client_pid, _lock
+    _client = None
+    _client_pid = None
+    _lock = threading.Lock()
+    pool_metrics.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_mongo_client():
+    """
+    Return the process-wide pooled MongoDB client, creating it on first use
+
+    The client is recreated if the process has been forked since it was
+    created, so pre-fork servers get one pool per worker.
+
+    Returns:
+        MongoClient: Shared MongoDB client
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is None or _client_pid != pid:
+            MONGO_URI = os.environ.get("MONGO_URI")
+            if not MONGO_URI:
+                raise ValueError("MONGO_URI not found in environment variables")
+            if _client_pid != pid:
+                pool_metrics.reset()
+            _client = MongoClient(MONGO_URI, event_listeners=[pool_metrics, command_timing], **get_pool_settings())
+            _client_pid = pid
+    return _client
+
+
+def get_database(database_name=DEFAULT_DATABASE):
+    """
+    Return a database handle on the shared client
+
+    Args:
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        Database: MongoDB database
+    """
+    return get_mongo_client()[database_name]
+
+
+def close_mongo_client():
+    """Close the shared client and its connection pool (e.g. on shutdown)"""
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def get_pool_metrics():
+    """
+    Get connection pool usage metrics for this process
+
+    Returns:
+        dict: Pool settings and usage counters
+    """
+    settings = get_pool_settings()
+    metrics = pool_metrics.snapshot()
+    metrics["initialized"] = _client is not None and _client_pid == os.getpid()
+    metrics["pid"] = os.getpid()
+    metrics["max_pool_size"] = settings["maxPoolSize"]
+    metrics["min_pool_size"] = settings["minPoolSize"]
+    return metrics
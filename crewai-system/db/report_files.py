@@ -0,0 +1,140 @@
+"""
+Chunked report file storage in GridFS
+
+Rendered PDF and Excel reports are uploaded to the report_files GridFS
+bucket straight from disk and streamed back chunk by chunk, so neither side
+ever holds a whole report in memory and reports are not limited by the
+16 MB document size.
+"""
+import os
+import hashlib
+from gridfs import GridFSBucket
+
+from db.connection import get_database, DEFAULT_DATABASE
+
+REPORT_BUCKET = "report_files"
+
+# Bytes read from GridFS per streamed piece of a download
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("REPORT_DOWNLOAD_CHUNK_SIZE", 255 * 1024))
+
+
+def get_report_bucket(database_name=DEFAULT_DATABASE):
+    """
+    Return the GridFS bucket holding report files
+
+    Args:
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        GridFSBucket: Report file bucket
+    """
+    return GridFSBucket(get_database(database_name), bucket_name=REPORT_BUCKET)
+
+
+class _HashingReader:
+    """File wrapper that hashes everything read through it"""
+
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self.sha256.update(data)
+        return data
+
+
+def upload_report_file(filepath, filename, metadata=None, database_name=DEFAULT_DATABASE):
+    """
+    Stream a rendered report from disk into GridFS
+
+    The file is hashed as it is uploaded; the digest is stored with the
+    report and served as its ETag.
+
+    Args:
+        filepath (str): Path of the rendered file
+        filename (str): Name stored with the file
+        metadata (dict): Extra metadata stored with the file
+        database_name (str): Name of the MongoDB database
+
+    Returns:
+        tuple: (GridFS file ID, file size in bytes, SHA-256 hex digest)
+    """
+    with open(filepath, 'rb') as f:
+        reader = _HashingReader(f)
+        file_id = get_report_bucket(database_name).upload_from_stream(filename, reader, metadata=metadata)
+    return file_id, os.path.getsize(filepath), reader.sha256.hexdigest()
+
+
+def delete_report_file(file_id, database_name=DEFAULT_DATABASE):
+    """Delete a report file and its chunks"""
+    get_report_bucket(database_name).delete(file_id)
+
+
+def parse_range(range_header, size):
+    """
+    Parse a single-range HTTP Range header
+
+    Multi-range and malformed headers are ignored, so the whole file is sent.
+
+    Args:
+        range_header (str): Value of the Range header, e.g. "bytes=0-1023"
+        size (int): Total file size in bytes
+
+    Returns:
+        tuple: (start, end) inclusive byte offsets, None to send the whole
+               file, or False if the range cannot be satisfied
+    """
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None
+
+    start, sep, end = range_header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not start:
+            # Suffix range: the last N bytes (an empty file has none)
+            length = int(end)
+            if length <= 0 or size == 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(start)
+        if end and int(end) < start:
+            # A last byte before the first is invalid, so it is ignored
+            return None
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        return False
+    return start, min(end, size - 1)
+
+
+def iter_report_file(file_id, start=0, end=None, database_name=DEFAULT_DATABASE, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Stream a byte range of a report file from GridFS
+
+    Args:
+        file_id: GridFS file ID
+        start (int): First byte offset
+        end (int): Last byte offset (inclusive); defaults to the end of the file
+        database_name (str): Name of the MongoDB database
+        chunk_size (int): Bytes per yielded piece
+
+    Yields:
+        bytes: Consecutive pieces of the requested range
+    """
+    grid_out = get_report_bucket(database_name).open_download_stream(file_id)
+    try:
+        end = grid_out.length - 1 if end is None else end
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = grid_out.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        grid_out.close()
@@ -3,11 +3,40 @@ Example usage of the Pharma Mind Nexus system
 """
 import requests
 import json
+import time
 from datetime import datetime
 
 # Base URL for the API
 BASE_URL = "http://localhost:4000"
 
+# Report jobs are polled once a second for at most 3 minutes
+JOB_POLL_MAX_ATTEMPTS = 180
+
+def wait_for_job(job):
+    """
+    Poll a background job until it finishes
+    
+    Args:
+        job (dict): 202 response body with job_id, status and status_url
+    
+    Returns:
+        dict: The job's result, or None if it failed or timed out
+    """
+    status = job
+    for _ in range(JOB_POLL_MAX_ATTEMPTS):
+        if status["status"] not in ("queued", "running"):
+            break
+        time.sleep(1)
+        status = requests.get(f"{BASE_URL}{job['status_url']}").json()
+        print(f"Job {job['job_id']}: {status['status']} ({status.get('progress', 0)}%)")
+    if status["status"] in ("queued", "running"):
+        print(f"Error: job {job['job_id']} did not finish within {JOB_POLL_MAX_ATTEMPTS} seconds")
+        return None
+    if status["status"] != "completed":
+        print(f"Error: {status.get('error')}")
+        return None
+    return status["result"]
+
 def demo_exim_agent():
     """Demonstrate EXIM agent usage"""
     print("=== EXIM Agent Demo ===")
@@ -166,8 +195,11 @@ def demo_report_generation():
     
     try:
         response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            data = response.json()
+        if response.status_code == 202:
+            # Reports are generated in the background; poll the job until it finishes
+            data = wait_for_job(response.json())
+            if data is None:
+                return
             print(f"Query: {data['query']}")
             print(f"Summary: {data['summary']}")
         else:
@@ -1,20 +1,12 @@
 """
 Database initialization script
 """
-import os
-from pymongo import MongoClient
+from db.connection import get_mongo_client
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
-
 def create_indexes():
     """Create indexes for better query performance"""
     try:
@@ -40,6 +32,12 @@ def create_indexes():
         db["clinical_trials"].create_index([("sponsor", 1)])
         print("Created indexes for clinical_trials collection")
         
+        # Create indexes for clinical_trials_mirror collection (_id is the NCT ID)
+        db["clinical_trials_mirror"].create_index([("status", 1)])
+        db["clinical_trials_mirror"].create_index([("phase", 1)])
+        db["clinical_trials_mirror"].create_index([("last_update_post_date", 1)])
+        print("Created indexes for clinical_trials_mirror collection")
+        
         # Create indexes for patents collection
         db["patents"].create_index([("patent_id", 1)])
         db["patents"].create_index([("assignee", 1)])
@@ -67,6 +65,10 @@ def create_indexes():
         db["reports"].create_index([("query", 1)])
         db["reports"].create_index([("generated_at", 1)])
         db["reports"].create_index([("generated_by", 1)])
+        db["reports"].create_index(
+            [("generated_by", 1), ("generated_at", -1), ("report_id", -1)],
+            name="generated_by_generated_at_report_id"
+        )  # Paginated per-user listing
         print("Created indexes for reports collection")
         
         print("All indexes created successfully")
@@ -74,9 +76,6 @@ def create_indexes():
     except Exception as e:
         print(f"Error creating indexes: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def create_text_indexes():
     """Create text indexes for full-text search"""
@@ -92,6 +91,15 @@ def create_text_indexes():
         ], name="clinical_trials_text_index")
         print("Created text index for clinical_trials collection")
         
+        db["clinical_trials_mirror"].create_index([
+            ("title", "text"),
+            ("official_title", "text"),
+            ("condition", "text"),
+            ("brief_summary", "text")
+        ], weights={"title": 5, "official_title": 3, "condition": 10, "brief_summary": 1},
+           name="clinical_trials_mirror_text_index")
+        print("Created text index for clinical_trials_mirror collection")
+        
         db["patents"].create_index([
             ("title", "text"),
             ("assignee", "text"),
@@ -104,9 +112,6 @@ def create_text_indexes():
     except Exception as e:
         print(f"Error creating text indexes: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 if __name__ == "__main__":
     print("Initializing Pharma Hub database...")
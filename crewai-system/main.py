@@ -5,6 +5,7 @@ import os
 from dotenv import load_dotenv
 from api.server import app
 from init_db import create_indexes, create_text_indexes
+from data_sources import clinicaltrials_mirror
 
 # Load environment variables
 load_dotenv()
@@ -26,9 +27,17 @@ def initialize_system():
         raise
 
 def start_server():
-    """Start the Flask server"""
+    """Start the API server (Flask by default, FastAPI/uvicorn when SERVER_MODE=async) and the mirror sync"""
     try:
         PORT = int(os.environ.get("PORT", 4000))
+        # Keep the ClinicalTrials.gov mirror in sync (when CT_MIRROR_SYNC_INTERVAL_S is set)
+        clinicaltrials_mirror.start_sync_scheduler()
+        if os.environ.get("SERVER_MODE", "flask").lower() == "async":
+            import uvicorn
+            print(f"Starting Pharma Mind Nexus async server on port {PORT}...")
+            uvicorn.run("api.async_server:app", host='0.0.0.0', port=PORT,
+                        workers=int(os.environ.get("WEB_CONCURRENCY", 1)))
+            return
         print(f"Starting Pharma Mind Nexus server on port {PORT}...")
         app.run(host='0.0.0.0', port=PORT, debug=True)
     except Exception as e:
@@ -4,19 +4,12 @@ Script to populate internal documents in the database
 import os
 import random
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from db.connection import get_mongo_client, close_mongo_client
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
-
 def populate_internal_docs():
     """Populate the database with sample internal documents"""
     client = None
@@ -90,7 +83,7 @@ def populate_internal_docs():
         print(f"Error populating internal docs: {str(e)}")
     finally:
         if client:
-            client.close()
+            close_mongo_client()
 
 if __name__ == "__main__":
     populate_internal_docs()
\ No newline at end of file
@@ -1,75 +1,144 @@
 """
 ClinicalTrials.gov loader
 """
-import requests
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from db.connection import get_mongo_client
+from data_sources import clinicaltrials_api
 from datetime import datetime
+from itertools import islice
 import json
 
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
+# Records inserted per insert_many while streaming
+LOADER_BATCH_SIZE = int(os.environ.get("LOADER_BATCH_SIZE", 500))
 
-def fetch_clinical_trials(query, max_trials=100):
+# Study modules stored for each trial
+STUDY_MODULES = ",".join([
+    "protocolSection.identificationModule",
+    "protocolSection.statusModule",
+    "protocolSection.sponsorCollaboratorsModule",
+    "protocolSection.conditionsModule",
+    "protocolSection.designModule"
+])
+
+def extract_locations(study):
+    """
+    Get the trial sites of a full study record
+    
+    Args:
+        study (dict): Study from ClinicalTrials.gov
+    
+    Returns:
+        list: {"facility", "city", "country"} per site
+    """
+    locations = study.get("protocolSection", {}).get("contactsLocationsModule", {}).get("locations", [])
+    return [
+        {"facility": location.get("facility", ""), "city": location.get("city", ""), "country": location.get("country", "")}
+        for location in locations
+    ]
+
+def study_to_record(study):
+    """
+    Transform a ClinicalTrials.gov study to the clinical_trials schema
+    
+    Args:
+        study (dict): Study from ClinicalTrials.gov
+    
+    Returns:
+        dict: Clinical trial record
+    """
+    protocol_section = study.get("protocolSection", {})
+    identification_module = protocol_section.get("identificationModule", {})
+    status_module = protocol_section.get("statusModule", {})
+    sponsor_module = protocol_section.get("sponsorCollaboratorsModule", {})
+    conditions_module = protocol_section.get("conditionsModule", {})
+    design_module = protocol_section.get("designModule", {})
+    
+    return {
+        "nct_id": identification_module.get("nctId"),
+        "title": identification_module.get("briefTitle"),
+        "condition": conditions_module.get("conditions", [""])[0] if conditions_module.get("conditions") else "",
+        "phase": ", ".join(design_module.get("phases", [])) if design_module.get("phases") else "Not Available",
+        "status": status_module.get("overallStatus"),
+        "sponsor": sponsor_module.get("leadSponsor", {}).get("name"),
+        "locations": extract_locations(study),  # Only full records carry locations
+        "raw_json": study,  # Store the original JSON for reference
+        "last_updated": datetime.utcnow().isoformat()
+    }
+
+def with_full_records(studies, chunk_size=100):
+    """
+    Replace streamed studies with their full records, a chunk at a time
+    
+    Detail requests for a chunk run concurrently within the
+    ClinicalTrials.gov rate limit; studies whose detail request fails keep
+    their search result.
+    
+    Args:
+        studies (iterable): Raw studies
+        chunk_size (int): Studies whose details are fetched together
+    
+    Yields:
+        dict: Full study records
+    """
+    studies = iter(studies)
+    while True:
+        chunk = list(islice(studies, chunk_size))
+        if not chunk:
+            return
+        nct_ids = [study.get("protocolSection", {}).get("identificationModule", {}).get("nctId") for study in chunk]
+        wanted = [nct_id for nct_id in nct_ids if nct_id]
+        full = {
+            nct_id: detail
+            for nct_id, detail in zip(wanted, clinicaltrials_api.get_study_details_many(wanted))
+            if not isinstance(detail, Exception)
+        }
+        for study, nct_id in zip(chunk, nct_ids):
+            yield full.get(nct_id, study)
+
+def iter_clinical_trials(query, max_trials=None, full_records=False):
+    """
+    Stream clinical trial records from ClinicalTrials.gov
+    
+    Result pages are followed and prefetched by clinicaltrials_api.iter_studies,
+    so any number of trials can be loaded with constant memory.
+    
+    Args:
+        query (str): Search query for clinical trials
+        max_trials (int): Maximum number of trials (None for every match)
+        full_records (bool): Also fetch every study's full record (stored as
+                             raw_json, with its locations)
+    
+    Yields:
+        dict: Clinical trial records
+    """
+    # The modules the records are built from ("fields" is passed straight to the API)
+    studies = clinicaltrials_api.iter_studies(query, filters={"fields": STUDY_MODULES}, limit=max_trials, raw=True)
+    if full_records:
+        studies = with_full_records(studies)
+    for study in studies:
+        yield study_to_record(study)
+
+def fetch_clinical_trials(query, max_trials=100, full_records=False):
     """
     Fetch clinical trials data from ClinicalTrials.gov API
     
     Args:
         query (str): Search query for clinical trials
         max_trials (int): Maximum number of trials to fetch
+        full_records (bool): Also fetch every study's full record (stored as
+                             raw_json, with its locations); detail requests run
+                             concurrently within the ClinicalTrials.gov rate limit
     
     Returns:
         list: List of clinical trial records
     """
     try:
-        # ClinicalTrials.gov API endpoint
-        base_url = "https://clinicaltrials.gov/api/v2/studies"
-        
-        # Parameters for the API request
-        params = {
-            "query.term": query,
-            "pageSize": min(max_trials, 100),  # API limit is 100 per request
-            "fields": "protocolSection.identificationModule,protocolSection.statusModule,protocolSection.sponsorCollaboratorsModule,protocolSection.conditionsModule,protocolSection.designModule"
-        }
-        
         print(f"Fetching clinical trials for query: {query}")
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        studies = data.get("studies", [])
-        
-        # Transform studies to our schema
-        records = []
-        for study in studies:
-            protocol_section = study.get("protocolSection", {})
-            identification_module = protocol_section.get("identificationModule", {})
-            status_module = protocol_section.get("statusModule", {})
-            sponsor_module = protocol_section.get("sponsorCollaboratorsModule", {})
-            conditions_module = protocol_section.get("conditionsModule", {})
-            design_module = protocol_section.get("designModule", {})
-            
-            record = {
-                "nct_id": identification_module.get("nctId"),
-                "title": identification_module.get("briefTitle"),
-                "condition": conditions_module.get("conditions", [""])[0] if conditions_module.get("conditions") else "",
-                "phase": ", ".join(design_module.get("phases", [])) if design_module.get("phases") else "Not Available",
-                "status": status_module.get("overallStatus"),
-                "sponsor": sponsor_module.get("leadSponsor", {}).get("name"),
-                "locations": [],  # Would need additional API calls to get detailed location data
-                "raw_json": study,  # Store the original JSON for reference
-                "last_updated": datetime.utcnow().isoformat()
-            }
-            records.append(record)
-        
+        records = list(iter_clinical_trials(query, max_trials, full_records))
         print(f"Fetched {len(records)} clinical trials")
         return records
         
@@ -77,38 +146,44 @@ def fetch_clinical_trials(query, max_trials=100):
         print(f"Error fetching clinical trials: {str(e)}")
         raise
 
-def load_clinical_trials_to_mongo(query, database_name="pharma_hub", max_trials=100):
+def load_clinical_trials_to_mongo(query, database_name="pharma_hub", max_trials=100, full_records=False):
     """
     Fetch and load clinical trials data into MongoDB
     
+    Records are streamed and inserted in batches of LOADER_BATCH_SIZE, so
+    max_trials=None loads every matching trial without holding them all.
+    
     Args:
         query (str): Search query for clinical trials
         database_name (str): Name of the MongoDB database
-        max_trials (int): Maximum number of trials to fetch
+        max_trials (int): Maximum number of trials to fetch (None for all)
+        full_records (bool): Fetch and store every study's full record
     """
     try:
-        # Fetch clinical trials data
-        records = fetch_clinical_trials(query, max_trials)
-        
-        if not records:
-            print("No clinical trials found for the query")
-            return
-        
-        # Connect to MongoDB and insert records
+        # Connect to MongoDB
         client = get_mongo_client()
         db = client[database_name]
         collection = db["clinical_trials"]
         
-        # Insert records
-        result = collection.insert_many(records)
-        print(f"Inserted {len(result.inserted_ids)} clinical trials into MongoDB")
+        print(f"Fetching clinical trials for query: {query}")
+        records = iter_clinical_trials(query, max_trials, full_records)
+        inserted = 0
+        while True:
+            batch = list(islice(records, LOADER_BATCH_SIZE))
+            if not batch:
+                break
+            result = collection.insert_many(batch)
+            inserted += len(result.inserted_ids)
+            print(f"Inserted {inserted} clinical trials so far")
+        
+        if not inserted:
+            print("No clinical trials found for the query")
+            return
+        print(f"Inserted {inserted} clinical trials into MongoDB")
         
     except Exception as e:
         print(f"Error loading clinical trials to MongoDB: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def update_clinical_trial(nct_id, update_data, database_name="pharma_hub"):
     """
@@ -136,9 +211,8 @@ def update_clinical_trial(nct_id, update_data, database_name="pharma_hub"):
     except Exception as e:
         print(f"Error updating clinical trial: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 # Example usage:
-# load_clinical_trials_to_mongo("diabetes", max_trials=50)
\ No newline at end of file
+# load_clinical_trials_to_mongo("diabetes", max_trials=50)
+# load_clinical_trials_to_mongo("asthma", max_trials=100, full_records=True)
+# load_clinical_trials_to_mongo("breast cancer", max_trials=None)  # every matching trial
\ No newline at end of file
@@ -1,24 +1,16 @@
 """
 Comtrade downloader & loader
 """
-import requests
 import io
 import pandas as pd
-import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from db.connection import get_mongo_client
+from data_sources import http_client
 from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
-
 def download_comtrade_csv(url, save_path=None):
     """
     Download CSV data from Comtrade API
@@ -32,7 +24,7 @@ def download_comtrade_csv(url, save_path=None):
     """
     try:
         print(f"Downloading data from: {url}")
-        r = requests.get(url)
+        r = http_client.get(url)
         r.raise_for_status()
         
         if save_path:
@@ -60,7 +52,7 @@ def download_and_load_comtrade(cmdCode="3004", reporter="356", database_name="ph
         print(f"Fetching data from Comtrade API: {url}")
         
         # Get data from API
-        resp = requests.get(url)
+        resp = http_client.get(url)
         resp.raise_for_status()
         data = resp.json()
         
@@ -95,9 +87,6 @@ def download_and_load_comtrade(cmdCode="3004", reporter="356", database_name="ph
     except Exception as e:
         print(f"Error downloading and loading Comtrade data: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def load_comtrade_csv_to_mongo(csv_path, database_name="pharma_hub"):
     """
@@ -142,9 +131,6 @@ def load_comtrade_csv_to_mongo(csv_path, database_name="pharma_hub"):
     except Exception as e:
         print(f"Error loading Comtrade CSV to MongoDB: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 # Example usage:
 # download_and_load_comtrade("3004", "356")
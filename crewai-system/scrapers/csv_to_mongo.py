@@ -1,22 +1,14 @@
 """
 Generic CSV-to-Mongo loader
 """
-import os
 import pandas as pd
-from pymongo import MongoClient
+from db.connection import get_mongo_client
 from dotenv import load_dotenv
 from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
-def get_mongo_client():
-    """Create and return a MongoDB client"""
-    MONGO_URI = os.environ.get("MONGO_URI")
-    if not MONGO_URI:
-        raise ValueError("MONGO_URI not found in environment variables")
-    return MongoClient(MONGO_URI)
-
 def load_csv_to_mongo(csv_path, collection_name, database_name="pharma_hub", transform_fn=None):
     """
     Load CSV data into MongoDB collection
@@ -60,9 +52,6 @@ def load_csv_to_mongo(csv_path, collection_name, database_name="pharma_hub", tra
     except Exception as e:
         print(f"Error loading CSV to MongoDB: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def update_record(collection_name, database_name="pharma_hub", query={}, update_data={}):
     """
@@ -92,9 +81,6 @@ def update_record(collection_name, database_name="pharma_hub", query={}, update_
     except Exception as e:
         print(f"Error updating records: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 def delete_records(collection_name, database_name="pharma_hub", query={}):
     """
@@ -120,9 +106,6 @@ def delete_records(collection_name, database_name="pharma_hub", query={}):
     except Exception as e:
         print(f"Error deleting records: {str(e)}")
         raise
-    finally:
-        if 'client' in locals():
-            client.close()
 
 # Example usage:
 # load_csv_to_mongo("data/wits_3004_2018_2023.csv", "trade_wits")
\ No newline at end of file
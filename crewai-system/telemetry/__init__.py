@@ -0,0 +1,14 @@
+"""
+Init file for telemetry module
+"""
+from .timing import start_request, end_request, current_timer, span, timed, record, log_request
+
+__all__ = [
+    "start_request",
+    "end_request",
+    "current_timer",
+    "span",
+    "timed",
+    "record",
+    "log_request"
+]
@@ -0,0 +1,214 @@
+"""
+Prometheus metrics for the API
+
+Histograms and counters are kept in process and rendered in the Prometheus
+text exposition format by GET /metrics. Upstream, agent and Mongo latencies
+are fed from the timing spans (see telemetry/timing.py), so every span
+reported for Server-Timing is also observed here, inside or outside a
+request.
+"""
+import contextvars
+import threading
+from functools import wraps
+
+from telemetry import timing
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Span prefixes that are external upstream services
+UPSTREAMS = ("clinicaltrials", "pubmed", "openalex", "google-cse", "bigquery", "pinecone")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Labelled latency histogram (values in seconds)"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        """Record one observation for the given label values"""
+        with self._lock:
+            series = self._series.setdefault(labelvalues, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        """Return the histogram in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, dict(series, counts=list(series["counts"]))) for labels, series in sorted(self._series.items())]
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                le = [("le", _number(bound))]
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {series['sum']}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {series['count']}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Labelled monotonically increasing counter"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        """Increase the counter for the given label values"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        """Return the counter in Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {value}")
+        return "\n".join(lines)
+
+
+def render_samples(name, documentation, kind, samples, labelnames=()):
+    """
+    Render values collected at scrape time from other components
+
+    Args:
+        name (str): Metric name
+        documentation (str): Help text
+        kind (str): "gauge" or "counter"
+        samples (list): [(label values tuple, value)]
+        labelnames (tuple): Label names
+
+    Returns:
+        str: Metric in Prometheus text format
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labelvalues, value in samples:
+        lines.append(f"{name}{_labels(labelnames, labelvalues)} {_number(value)}")
+    return "\n".join(lines)
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ("route", "method", "status")
+)
+upstream_request_duration = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to upstream data sources", ("upstream", "operation", "outcome")
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection", ("collection", "outcome")
+)
+agent_duration = Histogram(
+    "agent_duration_seconds", "Worker agent latency", ("agent",)
+)
+auth_duration = Histogram(
+    "auth_password_duration_seconds", "bcrypt hash/check latency including time queued for the pool", ("operation", "outcome")
+)
+mock_fallbacks = Counter(
+    "mock_fallbacks_total", "Responses served from mock data because real sources failed or were empty", ("source",)
+)
+
+REGISTRY = [http_request_duration, upstream_request_duration, mongo_command_duration, agent_duration, auth_duration, mock_fallbacks]
+
+
+def observe_span(name, elapsed_ms, error=False):
+    """Timing observer routing spans to the matching histogram"""
+    component, _, operation = name.partition(".")
+    seconds = elapsed_ms / 1000
+    outcome = "error" if error else "ok"
+    if component in UPSTREAMS:
+        upstream_request_duration.observe(seconds, component, operation, outcome)
+    elif component == "mongo":
+        mongo_command_duration.observe(seconds, operation, outcome)
+    elif component == "agent":
+        agent_duration.observe(seconds, operation)
+    elif component == "auth":
+        auth_duration.observe(seconds, operation, outcome)
+
+
+timing.add_observer(observe_span)
+
+
+def observe_request(route, method, status, elapsed_seconds):
+    """Record the latency of one API request"""
+    http_request_duration.observe(elapsed_seconds, route, method, str(status))
+
+
+# Sources that fell back to mock data while the current response was built
+# (a list shared with copied contexts, so fan-out threads report into it too)
+_fallback_sources = contextvars.ContextVar("fallback_sources", default=None)
+
+
+def track_fallbacks():
+    """
+    Start collecting the mock fallbacks of the work that follows in this context
+
+    Returns:
+        tuple: (list that fills with fallback source names, token for stop_tracking_fallbacks)
+    """
+    sources = []
+    return sources, _fallback_sources.set(sources)
+
+
+def stop_tracking_fallbacks(token):
+    """Stop collecting mock fallbacks (token from track_fallbacks)"""
+    _fallback_sources.reset(token)
+
+
+def mock_fallback(source):
+    """
+    Decorator counting every call of a mock data generator as a fallback
+
+    Args:
+        source (str): Data source name (e.g. "trials")
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            mock_fallbacks.inc(source)
+            tracked = _fallback_sources.get()
+            if tracked is not None:
+                tracked.append(source)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_registry():
+    """
+    Render all histograms and counters
+
+    Returns:
+        str: Prometheus text for the in-process registry
+    """
+    return "\n".join(metric.render() for metric in REGISTRY)
@@ -0,0 +1,184 @@
+"""
+Request-scoped timing context
+
+The API starts a RequestTimer for every request. Agents, data sources and
+the Mongo command listener report named spans into whichever timer is
+current (a context variable, so concurrent requests never mix), and the
+API returns the totals as a Server-Timing header. Outside a request the
+calls are no-ops.
+
+Span names are "<component>.<operation>", e.g. "clinicaltrials.search",
+"mongo.clinical_trials" or "agent.trials".
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Log one structured JSON record per request when enabled
+TIMING_LOG = os.environ.get("TIMING_LOG", "").lower() in ("1", "true", "yes")
+
+# Only log requests at least this slow
+TIMING_LOG_MIN_MS = float(os.environ.get("TIMING_LOG_MIN_MS", 0))
+
+_current = contextvars.ContextVar("request_timer", default=None)
+
+# Hooks called with (name, elapsed_ms, error) for every span, in or out of a request
+_observers = []
+
+
+class RequestTimer:
+    """Accumulates span durations for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = {}
+
+    def add(self, name, elapsed_ms):
+        """Add one occurrence of a span"""
+        with self._lock:
+            span = self._spans.setdefault(name, {"dur": 0.0, "count": 0})
+            span["dur"] += elapsed_ms
+            span["count"] += 1
+
+    def total_ms(self):
+        """Milliseconds since the request started"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def spans(self):
+        """
+        Get the recorded spans, slowest first
+
+        Returns:
+            list: [{"name", "dur_ms", "count"}]
+        """
+        with self._lock:
+            spans = [
+                {"name": name, "dur_ms": round(span["dur"], 1), "count": span["count"]}
+                for name, span in self._spans.items()
+            ]
+        return sorted(spans, key=lambda span: span["dur_ms"], reverse=True)
+
+    def server_timing(self):
+        """
+        Format the spans as a Server-Timing header value
+
+        Returns:
+            str: e.g. 'agent.trials;dur=812.4, clinicaltrials.detail;dur=480.2;desc="10 calls", total;dur=830.0'
+        """
+        entries = []
+        for span in self.spans():
+            entry = f"{span['name']};dur={span['dur_ms']}"
+            if span["count"] > 1:
+                entry += f';desc="{span["count"]} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={round(self.total_ms(), 1)}")
+        return ", ".join(entries)
+
+
+def start_request():
+    """
+    Start timing a request in the current context
+
+    Returns:
+        tuple: (RequestTimer, token for end_request)
+    """
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def end_request(token):
+    """Stop reporting into the timer started with the given token"""
+    _current.reset(token)
+
+
+def current_timer():
+    """Return the RequestTimer of the current request, or None"""
+    return _current.get()
+
+
+def add_observer(observer):
+    """
+    Register a callable receiving (name, elapsed_ms, error) for every span
+
+    Args:
+        observer (callable): Span observer (e.g. a metrics histogram)
+    """
+    _observers.append(observer)
+
+
+def record(name, elapsed_ms, error=False):
+    """
+    Record a span that was measured elsewhere
+
+    Args:
+        name (str): Span name
+        elapsed_ms (float): Duration in milliseconds
+        error (bool): Whether the operation failed
+    """
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, elapsed_ms)
+    for observer in _observers:
+        observer(name, elapsed_ms, error)
+
+
+@contextmanager
+def span(name):
+    """Context manager timing a block as a named span"""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record(name, (time.perf_counter() - started) * 1000, error)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as a named span
+
+    Args:
+        name (str): Span name
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def log_request(timer, method, path, status):
+    """
+    Print a structured timing record for a finished request if TIMING_LOG is on
+
+    Args:
+        timer (RequestTimer): Timer of the request
+        method (str): HTTP method
+        path (str): Request path
+        status (int): Response status code
+    """
+    total_ms = timer.total_ms()
+    if not TIMING_LOG or total_ms < TIMING_LOG_MIN_MS:
+        return
+    print(json.dumps({
+        "event": "request_timing",
+        "method": method,
+        "path": path,
+        "status": status,
+        "total_ms": round(total_ms, 1),
+        "spans": timer.spans()
+    }))
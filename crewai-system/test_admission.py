@@ -0,0 +1,83 @@
+"""
+Test script for rate limiting and load shedding (no network or MongoDB needed)
+"""
+import sys
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from api import admission
+from api.admission import RateLimiter, LoadShedder
+
+
+def test_route_bucket_limits_one_client():
+    """A client past its burst is limited; other clients are unaffected"""
+    limiter = RateLimiter(client_limit="100/100")
+    for _ in range(5):
+        assert limiter.check("user:a", "/api/master-agent", now=0.0) == 0
+    wait = limiter.check("user:a", "/api/master-agent", now=0.0)
+    assert wait > 0
+    assert limiter.check("user:b", "/api/master-agent", now=0.0) == 0
+    # master-agent refills at 0.2/s, so a token is back after 5 seconds
+    assert limiter.check("user:a", "/api/master-agent", now=5.0) == 0
+    stats = limiter.stats()["routes"]["/api/master-agent"]
+    assert stats == {"allowed": 7, "limited": 1}
+    print(f"✓ Per-route bucket limits one client (retry after {wait:.1f}s)")
+
+
+def test_client_bucket_spans_routes():
+    """The per-client bucket caps the total across routes"""
+    limiter = RateLimiter(client_limit="1/3")
+    for route in ("/api/exim", "/api/iqvia", "/api/trials"):
+        assert limiter.check("ip:10.0.0.1", route, now=0.0) == 0
+    assert limiter.check("ip:10.0.0.1", "/api/patents", now=0.0) > 0
+    assert limiter.check("ip:10.0.0.1", "/api/metrics/cache", now=0.0) == 0
+    print("✓ Per-client bucket spans routes; unlisted routes are not limited")
+
+
+def test_load_shedding_prefers_heavy_routes():
+    """Heavy routes are shed before the saturation point, cheap ones at it"""
+    depth = [0]
+    shedder = LoadShedder(heavy_fraction=0.75)
+    shedder.add_signal("queue", lambda: depth[0], 8)
+    assert shedder.check("/api/master-agent") is None
+    depth[0] = 6
+    assert shedder.check("/api/master-agent") == "queue"
+    assert shedder.check("/api/exim") is None
+    depth[0] = 8
+    assert shedder.check("/api/exim") == "queue"
+    assert shedder.check("/") is None
+    stats = shedder.stats()
+    assert stats["shed"] == {"/api/master-agent": 1, "/api/exim": 1}
+    assert stats["signals"]["queue"]["ratio"] == 1.0
+    print("✓ Heavy routes shed first under load")
+
+
+def test_preflights_and_shed_requests_keep_tokens():
+    """OPTIONS is always admitted and a shed request does not spend a rate limit token"""
+    depth = [0]
+    admission.load_shedder.add_signal("test_queue", lambda: depth[0], 10)
+    route = "/api/generate-report"
+    burst = int(admission.route_limit(route)[1])
+    try:
+        for _ in range(burst + 5):
+            assert admission.admit("ip:10.0.0.9", route, "OPTIONS") is None
+        depth[0] = 10
+        assert admission.admit("ip:10.0.0.9", route)[1] == 503
+        depth[0] = 0
+        # The whole burst is still available
+        for _ in range(burst):
+            assert admission.admit("ip:10.0.0.9", route) is None
+        assert admission.admit("ip:10.0.0.9", route)[1] == 429
+    finally:
+        depth[0] = 0
+    print("✓ Preflights and shed requests do not spend rate limit tokens")
+
+
+if __name__ == "__main__":
+    print("Testing admission control")
+    print("=" * 50)
+    test_route_bucket_limits_one_client()
+    test_client_bucket_spans_routes()
+    test_load_shedding_prefers_heavy_routes()
+    test_preflights_and_shed_requests_keep_tokens()
@@ -0,0 +1,71 @@
+"""
+Test script for batch endpoint helpers (no network or MongoDB needed)
+"""
+import sys
+import threading
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from api.batch import parse_batch_items, run_batch, batch_body
+
+
+def test_parse_items():
+    """Strings map to the primary parameter and shared filters apply to every item"""
+    items = parse_batch_items(
+        {"queries": ["asthma", {"condition": "copd", "phase": "Phase 3"}, {"key": "dm", "condition": "diabetes"}], "phase": "Phase 2"},
+        "condition",
+        shared=("phase", "top_n")
+    )
+    assert list(items) == ["asthma", "copd", "dm"]
+    assert items["asthma"] == {"condition": "asthma", "phase": "Phase 2"}
+    assert items["copd"]["phase"] == "Phase 3"
+    assert items["dm"] == {"condition": "diabetes", "phase": "Phase 2"}
+    print("✓ Batch items keyed and merged with shared filters")
+
+
+def test_parse_rejects_bad_batches():
+    """Empty, oversized and malformed batches are rejected"""
+    for data in ({}, {"queries": []}, {"queries": [["x"]]}, {"queries": ["x"] * 1000}):
+        try:
+            parse_batch_items(data, "condition")
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted {data}")
+    print("✓ Malformed batches rejected")
+
+
+def test_run_batch_bounded_with_per_item_errors():
+    """At most `concurrency` items run at once and failures stay per item"""
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def builder(params):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        if params["condition"] == "bad":
+            raise RuntimeError("upstream failed")
+        if params["condition"] == "missing":
+            return {"error": "not found"}, 404
+        return {"data": [params["condition"]]}, 200
+
+    items = {name: {"condition": name} for name in ["a", "b", "c", "d", "e", "bad", "missing"]}
+    body = batch_body(run_batch(items, builder, concurrency=2), time.perf_counter())
+    assert state["peak"] <= 2
+    assert set(body["results"]) == {"a", "b", "c", "d", "e"}
+    assert body["errors"] == {"bad": "upstream failed", "missing": "not found"}
+    assert body["count"] == 7
+    print(f"✓ Batch ran with peak concurrency {state['peak']} and per-item errors")
+
+
+if __name__ == "__main__":
+    print("Testing batch helpers")
+    print("=" * 50)
+    test_parse_items()
+    test_parse_rejects_bad_batches()
+    test_run_batch_bounded_with_per_item_errors()
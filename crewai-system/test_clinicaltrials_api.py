@@ -0,0 +1,149 @@
+"""
+Test script for the ClinicalTrials.gov search paths (upstream calls are faked, no network needed)
+"""
+import sys
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from data_sources import clinicaltrials_api
+from data_sources.throttle import Throttle
+
+ORIGINALS = (clinicaltrials_api.search_studies, clinicaltrials_api.get_study_details)
+
+
+def fake_study(nct_id):
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": f"Study {nct_id}"},
+            "statusModule": {"overallStatus": "RECRUITING"},
+            "conditionsModule": {"conditions": ["Diabetes"]},
+            "designModule": {"phases": ["PHASE2"]}
+        }
+    }
+
+
+def install_fakes(calls):
+    def search_studies(query, max_results=10, fields=None, page_token=None):
+        calls.append(("search", fields))
+        return {"studies": [fake_study(f"NCT{i:08d}") for i in range(max_results)], "nextPageToken": "next"}
+
+    def get_study_details(nct_id, fields=None):
+        calls.append(("detail", nct_id))
+        time.sleep(0.05)
+        return fake_study(nct_id)
+
+    clinicaltrials_api.search_studies = search_studies
+    clinicaltrials_api.get_study_details = get_study_details
+
+
+def restore():
+    clinicaltrials_api.search_studies, clinicaltrials_api.get_study_details = ORIGINALS
+
+
+def test_fast_path_is_one_request():
+    """A page of formatted studies comes from the search response alone"""
+    calls = []
+    install_fakes(calls)
+    try:
+        page = clinicaltrials_api.search_clinical_trials_page("diabetes", page_size=10)
+    finally:
+        restore()
+    assert [kind for kind, _ in calls] == ["search"]
+    assert calls[0][1] == list(clinicaltrials_api.STUDY_FIELDS)
+    assert len(page["studies"]) == 10 and page["next_page_token"] == "next"
+    assert page["studies"][0]["phase"] == "PHASE2" and page["studies"][0]["condition"] == "Diabetes"
+    print("✓ Fast path: 10 studies from 1 request")
+
+
+def test_deep_mode_fetches_details():
+    """deep=True still re-fetches every study"""
+    calls = []
+    install_fakes(calls)
+    try:
+        studies = clinicaltrials_api.search_clinical_trials("diabetes", max_results=3, fields=["nct_id", "title"], deep=True)
+    finally:
+        restore()
+    assert [kind for kind, _ in calls] == ["search", "detail", "detail", "detail"]
+    assert studies[2] == {"nct_id": "NCT00000002", "title": "Study NCT00000002"}
+    print("✓ Deep mode: one detail request per study")
+
+
+def test_deep_mode_is_concurrent():
+    """16 detail fetches of 50 ms each overlap instead of running back to back"""
+    calls = []
+    install_fakes(calls)
+    started = time.perf_counter()
+    try:
+        studies = clinicaltrials_api.search_clinical_trials("asthma", max_results=16, deep=True)
+    finally:
+        restore()
+    elapsed = time.perf_counter() - started
+    assert len(studies) == 16 and [s["nct_id"] for s in studies] == [f"NCT{i:08d}" for i in range(16)]
+    assert elapsed < 16 * 0.05 / 2
+    print(f"✓ 16 detail fetches in {elapsed:.2f}s")
+
+
+def test_iter_studies_follows_pages():
+    """Pages are followed through nextPageToken, prefetched and yielded lazily"""
+    pages = {None: "p2", "p2": "p3", "p3": None}
+    requested = []
+
+    def search_studies(query, max_results=10, fields=None, page_token=None, filters=None):
+        requested.append((page_token, filters))
+        start = len(requested) * 100
+        page = {"studies": [fake_study(f"NCT{start + i:08d}") for i in range(max_results)]}
+        if pages[page_token]:
+            page["nextPageToken"] = pages[page_token]
+        return page
+
+    clinicaltrials_api.search_studies = search_studies
+    try:
+        studies = clinicaltrials_api.iter_studies("asthma", ["nct_id"], {"filter.overallStatus": "RECRUITING"}, page_size=3)
+        first = next(studies)
+        time.sleep(0.05)
+        # The second page was requested while the first was being consumed
+        assert [token for token, _ in requested] == [None, "p2"]
+        rest = list(studies)
+    finally:
+        restore()
+    assert first == {"nct_id": "NCT00000100"}
+    assert len(rest) == 8 and rest[-1] == {"nct_id": "NCT00000302"}
+    assert requested[0][1] == {"filter.overallStatus": "RECRUITING"}
+
+    requested.clear()
+    clinicaltrials_api.search_studies = search_studies
+    try:
+        limited = list(clinicaltrials_api.iter_studies("asthma", limit=4, page_size=3))
+        time.sleep(0.05)
+    finally:
+        restore()
+    assert len(limited) == 4
+    # The limit was reached on the second page, so the third is never requested
+    assert [token for token, _ in requested] == [None, "p2"]
+    print("✓ iter_studies streams across pages with prefetch")
+
+
+def test_throttle_spaces_requests():
+    """After the burst, tokens are handed out at the configured rate"""
+    throttle = Throttle("test", rate=50, burst=2)
+    started = time.perf_counter()
+    for _ in range(7):
+        throttle.acquire()
+    elapsed = time.perf_counter() - started
+    # 2 immediate tokens, then 5 more at 50/s
+    assert 0.08 <= elapsed < 0.3
+    stats = throttle.stats()
+    assert stats["acquired"] == 7 and stats["waited"] == 5
+    print(f"✓ Throttle: 7 requests at 50/s with burst 2 took {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    print("Testing ClinicalTrials.gov search")
+    print("=" * 50)
+    test_fast_path_is_one_request()
+    test_deep_mode_fetches_details()
+    test_deep_mode_is_concurrent()
+    test_iter_studies_follows_pages()
+    test_throttle_spaces_requests()
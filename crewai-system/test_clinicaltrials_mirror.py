@@ -0,0 +1,92 @@
+"""
+Test script for the ClinicalTrials.gov mirror helpers (no MongoDB or network needed)
+"""
+import sys
+from datetime import datetime, timedelta
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from data_sources import clinicaltrials_mirror
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    def bulk_write(self, requests, ordered=True):
+        self.batches.append(len(requests))
+
+
+def fake_study(nct_id, posted="2026-03-02"):
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": f"Study {nct_id}"},
+            "statusModule": {"overallStatus": "RECRUITING", "lastUpdatePostDateStruct": {"date": posted}},
+            "conditionsModule": {"conditions": ["Diabetes"]},
+            "designModule": {"phases": ["PHASE2"]}
+        }
+    }
+
+
+def test_delta_filter_and_watermark():
+    """Delta syncs re-read the day before the previous sync started"""
+    assert clinicaltrials_mirror.delta_filter("2026-03-01") == {
+        "filter.advanced": "AREA[LastUpdatePostDate]RANGE[2026-03-01,MAX]"
+    }
+    assert clinicaltrials_mirror.next_watermark(datetime(2026, 3, 2, 0, 30)) == "2026-03-01"
+    assert "lastUpdatePostDateStruct" in clinicaltrials_mirror.SYNC_FIELDS
+    print("✓ Delta filter and watermark")
+
+
+def test_study_to_mirror_doc():
+    """Mirror documents are formatted studies keyed by NCT ID"""
+    synced_at = datetime(2026, 3, 2)
+    doc = clinicaltrials_mirror.study_to_mirror_doc(fake_study("NCT00000001"), synced_at)
+    assert doc["_id"] == doc["nct_id"] == "NCT00000001"
+    assert doc["condition"] == "Diabetes" and doc["phase"] == "PHASE2"
+    assert doc["last_update_post_date"] == "2026-03-02"
+    assert doc["synced_at"] == synced_at
+    assert clinicaltrials_mirror.study_to_mirror_doc({"protocolSection": {}}, synced_at) is None
+    print("✓ Study to mirror document")
+
+
+def test_page_tokens_and_age():
+    """Mirror page tokens carry an offset; API tokens are not mirror tokens"""
+    assert clinicaltrials_mirror.parse_mirror_token("mirror:20") == 20
+    assert clinicaltrials_mirror.parse_mirror_token("mirror:x") is None
+    assert clinicaltrials_mirror.parse_mirror_token("NF0g5JuEk") is None
+    assert clinicaltrials_mirror.parse_mirror_token(None) is None
+
+    now = datetime(2026, 3, 2, 12)
+    assert clinicaltrials_mirror.mirror_age_hours({}, now) is None
+    assert clinicaltrials_mirror.mirror_age_hours({"last_sync_at": now - timedelta(hours=6)}, now) == 6
+    print("✓ Page tokens and mirror age")
+
+
+def test_upsert_studies_batches():
+    """Studies are written in CT_MIRROR_BATCH_SIZE batches, skipping ones without an NCT ID"""
+    collection = FakeCollection()
+    original_client, original_size = clinicaltrials_mirror.get_mongo_client, clinicaltrials_mirror.CT_MIRROR_BATCH_SIZE
+    clinicaltrials_mirror.get_mongo_client = lambda: {"pharma_hub": {clinicaltrials_mirror.MIRROR_COLLECTION: collection}}
+    clinicaltrials_mirror.CT_MIRROR_BATCH_SIZE = 4
+    renewals = []
+    try:
+        studies = [fake_study(f"NCT{i:08d}") for i in range(10)] + [{"protocolSection": {}}]
+        written = clinicaltrials_mirror.upsert_studies(iter(studies), datetime(2026, 3, 2), lambda: renewals.append(1))
+    finally:
+        clinicaltrials_mirror.get_mongo_client = original_client
+        clinicaltrials_mirror.CT_MIRROR_BATCH_SIZE = original_size
+    assert written == 10
+    assert collection.batches == [4, 4, 2]
+    assert len(renewals) == 3
+    print("✓ Upserts are batched and renew the lease per batch")
+
+
+if __name__ == "__main__":
+    print("Testing ClinicalTrials.gov mirror")
+    print("=" * 50)
+    test_delta_filter_and_watermark()
+    test_study_to_mirror_doc()
+    test_page_tokens_and_age()
+    test_upsert_studies_batches()
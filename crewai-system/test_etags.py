@@ -0,0 +1,99 @@
+"""
+Test script for ETags and conditional requests (no network or MongoDB needed)
+"""
+import sys
+import contextvars
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from api import encoding
+from api.etags import make_etag, encoded_etag, etag_matches
+from cache.response_cache import ResponseCache, served_etag
+
+
+def test_etag_matching():
+    """If-None-Match matches lists, wildcards, weak tags and compressed variants"""
+    etag = make_etag("abc123")
+    assert etag == '"abc123"'
+    assert make_etag("abc123", "meta") == '"abc123-meta"'
+    assert make_etag(None) is None
+    assert etag_matches('"abc123"', etag)
+    assert etag_matches('"other", W/"abc123"', etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(encoded_etag(etag, "gzip"), etag)
+    assert encoded_etag(etag, "br") == '"abc123-br"'
+    assert not etag_matches('"abc123-meta"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"abc123"', None)
+    print("✓ If-None-Match comparison")
+
+
+def test_cache_entry_etag():
+    """Hits serve the stored entry's hash; a changed body gets a new one"""
+    cache = ResponseCache()
+    bodies = [{"data": [1]}, {"data": [2]}]
+
+    def lookup():
+        cache.get_or_compute("trials", {"condition": "asthma"}, lambda: (bodies[0], 200))
+        return served_etag()
+
+    first = contextvars.copy_context().run(lookup)
+    again = contextvars.copy_context().run(lookup)
+    assert first and first == again
+    cache.store("trials", next(iter(cache.local._entries)), bodies[1])
+    assert contextvars.copy_context().run(lookup) != first
+
+    def error():
+        cache.get_or_compute("trials", {"condition": "copd"}, lambda: ({"error": "down"}, 500))
+        return served_etag()
+
+    assert contextvars.copy_context().run(error) is None
+    print("✓ Cache entries carry a content hash ETag")
+
+
+def test_not_modified_etag_names_encoding():
+    """A 304 can name the same compressed representation as the 200"""
+    etag = make_etag("abc")
+    large = b"x" * encoding.COMPRESS_MIN_BYTES
+    _, content_encoding = encoding.compress(large, "gzip")
+    assert content_encoding == "gzip"
+    # choose_encoding agrees with compress without compressing anything
+    assert encoding.choose_encoding(len(large), "gzip") == content_encoding
+    assert encoding.choose_encoding(10, "gzip") is None
+    assert encoded_etag(etag, encoding.choose_encoding(len(large), "gzip")) == '"abc-gzip"'
+    assert encoded_etag(etag, encoding.choose_encoding(10, "gzip")) == etag
+    print("✓ 304 ETags follow the 200's content encoding")
+
+
+def test_negotiate_encoding_prefers_highest_quality():
+    """The client's highest q-value wins, with ties going to brotli"""
+    original = encoding.brotli
+    encoding.brotli = object()
+    try:
+        assert encoding.negotiate_encoding("gzip, br") == "br"
+        assert encoding.negotiate_encoding("br;q=0.5, gzip;q=1.0") == "gzip"
+        assert encoding.negotiate_encoding("gzip;q=0.8, br;q=0.8") == "br"
+        assert encoding.negotiate_encoding("*;q=0.5, gzip") == "gzip"
+        assert encoding.negotiate_encoding("br;q=0, gzip;q=0") is None
+        assert encoding.negotiate_encoding("identity") is None
+        assert encoding.negotiate_encoding(None) is None
+    finally:
+        encoding.brotli = original
+    # Without brotli installed only gzip can be chosen
+    encoding.brotli = None
+    try:
+        assert encoding.negotiate_encoding("br, gzip;q=0.1") == "gzip"
+        assert encoding.negotiate_encoding("br") is None
+    finally:
+        encoding.brotli = original
+    print("✓ Encoding negotiation follows q-values")
+
+
+if __name__ == "__main__":
+    print("Testing ETags")
+    print("=" * 50)
+    test_etag_matching()
+    test_cache_entry_etag()
+    test_not_modified_etag_names_encoding()
+    test_negotiate_encoding_prefers_highest_quality()
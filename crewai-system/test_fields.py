@@ -0,0 +1,46 @@
+"""
+Test script for sparse field selection (no network or MongoDB needed)
+"""
+import sys
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from api.fields import parse_fields, select_fields
+
+TRIAL_FIELDS = ["nct_id", "title", "phase", "status", "sponsor", "brief_summary"]
+
+
+def test_parse_fields():
+    """Comma-separated names are split, trimmed and de-duplicated in order"""
+    assert parse_fields(None, TRIAL_FIELDS) is None
+    assert parse_fields("", TRIAL_FIELDS) is None
+    assert parse_fields(" title, nct_id,title ", TRIAL_FIELDS) == ["title", "nct_id"]
+    print("✓ fields parameter parsed")
+
+
+def test_unknown_field_rejected():
+    """Unknown names are reported instead of silently ignored"""
+    try:
+        parse_fields("title,secret", TRIAL_FIELDS)
+    except ValueError as e:
+        assert "secret" in str(e)
+        print("✓ Unknown field rejected")
+        return
+    raise AssertionError("Unknown field accepted")
+
+
+def test_select_fields():
+    """Records keep only the requested keys, in request order"""
+    records = [{"nct_id": "NCT1", "title": "A", "brief_summary": "long text"}]
+    assert select_fields(records, ["title", "nct_id"]) == [{"title": "A", "nct_id": "NCT1"}]
+    assert select_fields(records, None) is records
+    print("✓ Records trimmed to requested fields")
+
+
+if __name__ == "__main__":
+    print("Testing field selection")
+    print("=" * 50)
+    test_parse_fields()
+    test_unknown_field_rejected()
+    test_select_fields()
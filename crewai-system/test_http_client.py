@@ -0,0 +1,100 @@
+"""
+Test script for the shared HTTP client (upstream responses are faked, no network needed)
+"""
+import sys
+import time
+from email.utils import formatdate
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+import requests
+from data_sources import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Returns queued outcomes (responses or exceptions) in order"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, timeout=None, **kwargs):
+        self.calls.append((method, url, timeout))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def fake_host(host, outcomes):
+    client = http_client.get_host_client(host)
+    client.session = FakeSession(outcomes)
+    return client
+
+
+def test_retry_after_parsing():
+    """Retry-After is read as seconds or as an HTTP date"""
+    assert http_client.retry_after_seconds(FakeResponse(429, {"Retry-After": "7"})) == 7
+    later = http_client.retry_after_seconds(FakeResponse(503, {"Retry-After": formatdate(time.time() + 60, usegmt=True)}))
+    assert 55 <= later <= 61
+    assert http_client.retry_after_seconds(FakeResponse(503)) is None
+    assert http_client.backoff_delay(0, retry_after=1.5) >= 1.5
+    assert http_client.backoff_delay(10) <= http_client.HTTP_BACKOFF_MAX_S
+    print("✓ Retry-After and backoff")
+
+
+def test_retries_then_succeeds():
+    """A 503 and a connection error are retried; the final 200 is returned"""
+    client = fake_host("retry.example", [
+        FakeResponse(503, {"Retry-After": "0"}),
+        requests.exceptions.ConnectionError("reset"),
+        FakeResponse(200)
+    ])
+    base, http_client.HTTP_BACKOFF_BASE_S = http_client.HTTP_BACKOFF_BASE_S, 0.001
+    try:
+        response = http_client.get("https://retry.example/studies", {"q": "x"})
+    finally:
+        http_client.HTTP_BACKOFF_BASE_S = base
+    assert response.status_code == 200
+    assert len(client.session.calls) == 3
+    assert client.session.calls[0][2] == (http_client.HTTP_CONNECT_TIMEOUT_S, http_client.HTTP_READ_TIMEOUT_S)
+    stats = http_client.get_http_metrics()["retry.example"]
+    assert stats["requests"] == 3 and stats["retries"] == 2 and stats["in_flight"] == 0
+    print("✓ Transient failures retried with timeouts set")
+
+
+def test_gives_up_and_skips_long_retry_after():
+    """Errors past the retry budget surface; a long Retry-After is not waited for"""
+    client = fake_host("down.example", [requests.exceptions.Timeout("slow")] * 2)
+    try:
+        http_client.get("https://down.example/", retries=1)
+        raise AssertionError("expected a timeout")
+    except requests.exceptions.Timeout:
+        pass
+    assert len(client.session.calls) == 2
+
+    client = fake_host("busy.example", [FakeResponse(429, {"Retry-After": "3600"})])
+    assert http_client.get("https://busy.example/").status_code == 429
+    assert len(client.session.calls) == 1
+
+    client = fake_host("post.example", [FakeResponse(503)])
+    assert http_client.request("POST", "https://post.example/").status_code == 503
+    print("✓ Retry budget, long Retry-After and non-idempotent methods respected")
+
+
+if __name__ == "__main__":
+    print("Testing shared HTTP client")
+    print("=" * 50)
+    test_retry_after_parsing()
+    test_retries_then_succeeds()
+    test_gives_up_and_skips_long_retry_after()
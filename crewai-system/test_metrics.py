@@ -0,0 +1,52 @@
+"""
+Test script for the Prometheus metrics registry (no network or MongoDB needed)
+"""
+import sys
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from telemetry import metrics, timing
+
+
+def test_spans_feed_histograms():
+    """Upstream and Mongo spans land in their histograms"""
+    timing.record("clinicaltrials.detail", 120.0)
+    timing.record("mongo.reports", 3.0, error=True)
+    text = metrics.render_registry()
+    assert 'upstream_request_duration_seconds_count{upstream="clinicaltrials",operation="detail",outcome="ok"} 1' in text
+    assert 'mongo_command_duration_seconds_bucket{collection="reports",outcome="error",le="0.005"} 1' in text
+    print("✓ Spans observed in upstream and Mongo histograms")
+
+
+def test_histogram_buckets_are_cumulative():
+    """Bucket counts include every smaller bucket"""
+    histogram = metrics.Histogram("test_seconds", "Test", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "/api/trials")
+    text = histogram.render()
+    assert 'test_seconds_bucket{route="/api/trials",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{route="/api/trials",le="1.0"} 2' in text
+    assert 'test_seconds_bucket{route="/api/trials",le="+Inf"} 3' in text
+    assert 'test_seconds_count{route="/api/trials"} 3' in text
+    print("✓ Histogram buckets are cumulative")
+
+
+def test_mock_fallbacks_counted():
+    """Every call of a decorated mock generator is counted"""
+    @metrics.mock_fallback("trials")
+    def get_mock():
+        return []
+
+    get_mock()
+    get_mock()
+    assert 'mock_fallbacks_total{source="trials"} 2' in metrics.render_registry()
+    print("✓ Mock fallbacks counted")
+
+
+if __name__ == "__main__":
+    print("Testing Prometheus metrics")
+    print("=" * 50)
+    test_spans_feed_histograms()
+    test_histogram_buckets_are_cumulative()
+    test_mock_fallbacks_counted()
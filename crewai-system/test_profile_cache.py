@@ -0,0 +1,56 @@
+"""
+Test script for the user profile cache (no MongoDB needed)
+"""
+import sys
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from cache.profile_cache import ProfileCache
+
+
+PROFILE = {"id": "u1", "name": "Ada", "email": "ada@example.com", "role": "analyst"}
+
+
+def test_hit_after_set():
+    """A cached profile is served until it is invalidated"""
+    cache = ProfileCache(ttl=60)
+    assert cache.get("u1") is None
+    cache.set("u1", PROFILE)
+    assert cache.get("u1") == PROFILE
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["invalidations"] == 1
+    print(f"✓ Hit after set, miss after invalidate (hit ratio {stats['hit_ratio']})")
+
+
+def test_entries_expire():
+    """Entries older than the TTL are treated as misses"""
+    cache = ProfileCache(ttl=0.05)
+    cache.set("u1", PROFILE)
+    time.sleep(0.1)
+    assert cache.get("u1") is None
+    assert cache.stats()["entries"] == 0
+    print("✓ Expired profile dropped")
+
+
+def test_bounded_and_copied():
+    """The cache evicts least recently used users and hands out copies"""
+    cache = ProfileCache(ttl=60, max_entries=2)
+    for user_id in ("a", "b", "c"):
+        cache.set(user_id, dict(PROFILE, id=user_id))
+    assert cache.get("a") is None
+    profile = cache.get("c")
+    profile["name"] = "changed"
+    assert cache.get("c")["name"] == "Ada"
+    print("✓ Oldest entry evicted and callers cannot mutate cached profiles")
+
+
+if __name__ == "__main__":
+    print("Testing user profile cache")
+    print("=" * 50)
+    test_hit_after_set()
+    test_entries_expire()
+    test_bounded_and_copied()
@@ -0,0 +1,47 @@
+"""
+Test script for report download range handling (no MongoDB needed)
+"""
+import sys
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from db.report_files import parse_range
+
+
+def test_whole_file_without_range():
+    """Missing, malformed and multi-range headers send the whole file"""
+    assert parse_range(None, 1000) is None
+    assert parse_range("items=0-10", 1000) is None
+    assert parse_range("bytes=0-10,20-30", 1000) is None
+    assert parse_range("bytes=abc-", 1000) is None
+    assert parse_range("bytes=500-100", 1000) is None
+    print("✓ Whole file sent when no usable range is given")
+
+
+def test_byte_ranges():
+    """Explicit, open-ended and suffix ranges"""
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    print("✓ Byte ranges parsed")
+
+
+def test_unsatisfiable_ranges():
+    """Ranges outside the file are rejected"""
+    assert parse_range("bytes=1000-", 1000) is False
+    assert parse_range("bytes=-0", 1000) is False
+    # An empty file has no satisfiable range
+    assert parse_range("bytes=-100", 0) is False
+    assert parse_range("bytes=0-", 0) is False
+    print("✓ Unsatisfiable ranges rejected")
+
+
+if __name__ == "__main__":
+    print("Testing report download ranges")
+    print("=" * 50)
+    test_whole_file_without_range()
+    test_byte_ranges()
+    test_unsatisfiable_ranges()
@@ -0,0 +1,166 @@
+"""
+Test script for the tiered response cache (no network or MongoDB needed)
+"""
+import sys
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from cache.response_cache import ResponseCache, LRUTier, make_key, CACHE_FALLBACK_TTL
+from telemetry.metrics import mock_fallback
+
+
+def test_equivalent_params_share_key():
+    """Defaults, case and whitespace should not create separate entries"""
+    defaults = {"hs_code": "3004", "top_n": 10}
+    assert make_key("exim", {}, defaults) == make_key("exim", {"hs_code": "3004", "top_n": "10"}, defaults)
+    assert make_key("trials", {"condition": " Diabetes  Type 2"}) == make_key("trials", {"condition": "diabetes type 2"})
+    assert make_key("trials", {"condition": "diabetes"}) != make_key("patents", {"condition": "diabetes"})
+    # Identifiers are not numbers: a leading zero matters
+    assert make_key("exim", {"hs_code": "0304"}) != make_key("exim", {"hs_code": "304"})
+    print("✓ Equivalent parameters share a cache key")
+
+
+def test_hit_and_miss_counters():
+    """Second identical call is served from cache"""
+    cache = ResponseCache()
+    calls = []
+
+    @cache.cached("trials", defaults={"top_n": 10})
+    def builder(params):
+        calls.append(params)
+        return {"data": [params.get("condition")]}, 200
+
+    builder({"condition": "asthma"})
+    builder({"condition": "asthma", "top_n": "10"})
+    stats = cache.stats()["sources"]["trials"]
+    assert len(calls) == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    print(f"✓ Cache hit on repeat call, hit ratio {stats['hit_ratio']}")
+
+
+def test_errors_not_cached():
+    """Non-200 responses are recomputed every time"""
+    cache = ResponseCache()
+    calls = []
+
+    @cache.cached("web-intel")
+    def builder(params):
+        calls.append(params)
+        return {"error": "query parameter is required"}, 400
+
+    builder({})
+    builder({})
+    assert len(calls) == 2
+    print("✓ Error responses are not cached")
+
+
+def test_mock_fallbacks_cached_briefly():
+    """Responses built from mock data expire after CACHE_FALLBACK_TTL with no stale window"""
+    cache = ResponseCache()
+
+    @mock_fallback("trials")
+    def mock_trials():
+        return [{"nct_id": "NCT00000000"}]
+
+    @cache.cached("trials")
+    def builder(params):
+        return {"data": mock_trials()}, 200
+
+    builder({"condition": "asthma"})
+    entry = next(iter(cache.local._entries.values()))
+    assert entry.fresh_until - entry.created_at == CACHE_FALLBACK_TTL
+    assert entry.stale_until == entry.fresh_until
+    assert cache.stats()["sources"]["trials"]["fallbacks"] == 1
+
+    # Fallbacks flagged only in the body are caught too
+    cache.get_or_compute("patents", {"query": "x"}, lambda: ({"data": [], "source": "Mock Data"}, 200))
+    assert cache.stats()["sources"]["patents"]["fallbacks"] == 1
+    print(f"✓ Mock fallbacks cached for {CACHE_FALLBACK_TTL}s only")
+
+
+def test_stale_while_revalidate():
+    """A stale entry is served immediately and refreshed in the background"""
+    cache = ResponseCache()
+    version = [0]
+
+    def compute():
+        version[0] += 1
+        return {"version": version[0]}, 200
+
+    cache.get_or_compute("iqvia", {}, compute)
+    for entry in cache.local._entries.values():
+        entry.fresh_until = time.time() - 1
+
+    body, _ = cache.get_or_compute("iqvia", {}, compute)
+    assert body["version"] == 1
+
+    time.sleep(0.2)
+    body, _ = cache.get_or_compute("iqvia", {}, compute)
+    assert body["version"] == 2
+    print("✓ Stale entry served while refresh ran in the background")
+
+
+def test_lru_byte_bound():
+    """Oldest entries are evicted once the byte budget is exceeded"""
+    cache = ResponseCache(local=LRUTier(max_bytes=100))
+    for i in range(10):
+        cache.store("exim", f"k{i}", {"payload": "x" * 20})
+    stats = cache.local.stats()
+    assert stats["bytes"] <= 100
+    assert stats["evictions"] > 0
+    print(f"✓ LRU stayed within {stats['max_bytes']} bytes ({stats['entries']} entries)")
+
+
+def test_batch_lookup_shares_keys():
+    """Batch lookups reuse single-item entries and compute only the misses together"""
+    cache = ResponseCache()
+    defaults = {"hs_code": "3004", "top_n": 10}
+    cache.get_or_compute("exim", {"hs_code": "3002"}, lambda: ({"data": ["single"]}, 200), defaults)
+    batches = []
+
+    def compute_many(missing):
+        batches.append(sorted(missing))
+        return {key: ({"data": [key]}, 200) for key in missing}
+
+    outcomes = cache.get_many_or_compute("exim", {"3002": {"hs_code": "3002"}, "3004": {"hs_code": "3004", "top_n": 10}}, compute_many, defaults)
+    assert outcomes["3002"] == ({"data": ["single"]}, 200)
+    assert batches == [["3004"]]
+    body, _ = cache.get_or_compute("exim", {"hs_code": "3004"}, lambda: ({"data": ["recomputed"]}, 200), defaults)
+    assert body == {"data": ["3004"]}
+    print("✓ Batch and single-item lookups share cache entries")
+
+
+def test_prefetch_warms_entry():
+    """A prefetched response is served as a hit and is not computed twice"""
+    cache = ResponseCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"data": ["page 2"]}, 200
+
+    cache.prefetch("trials-page", {"cursor": "abc"}, compute)
+    deadline = time.time() + 2
+    while not cache.local.stats()["entries"] and time.time() < deadline:
+        time.sleep(0.01)
+    cache.prefetch("trials-page", {"cursor": "abc"}, compute)
+    body, _ = cache.get_or_compute("trials-page", {"cursor": "abc"}, compute)
+    assert body == {"data": ["page 2"]} and len(calls) == 1
+    stats = cache.stats()["sources"]["trials-page"]
+    assert stats["prefetches"] == 1 and stats["hits"] == 1
+    print("✓ Prefetched page served from cache")
+
+
+if __name__ == "__main__":
+    print("Testing response cache")
+    print("=" * 50)
+    test_equivalent_params_share_key()
+    test_hit_and_miss_counters()
+    test_errors_not_cached()
+    test_mock_fallbacks_cached_briefly()
+    test_stale_while_revalidate()
+    test_lru_byte_bound()
+    test_batch_lookup_shares_keys()
+    test_prefetch_warms_entry()
@@ -0,0 +1,121 @@
+"""
+Test script for single-flight coalescing of data source calls (no network needed)
+"""
+import sys
+import threading
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from data_sources.single_flight import SingleFlight, single_flight, get_single_flight_metrics
+
+
+def run_concurrently(fn, count):
+    """Call fn from several threads at once and collect results or errors"""
+    results = []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_calls_share_one_execution():
+    """Concurrent identical calls run the upstream function once"""
+    calls = []
+
+    @single_flight
+    def search(query, max_results=10):
+        calls.append(query)
+        time.sleep(0.2)
+        return [{"title": query}]
+
+    results = run_concurrently(lambda: search("diabetes", max_results=10), 5)
+    assert len(calls) == 1
+    assert all(r == [{"title": "diabetes"}] for r in results)
+    print(f"✓ 5 concurrent calls, {len(calls)} upstream execution")
+
+
+def test_waiter_receives_leader_result():
+    """A caller arriving mid-flight is counted as a waiter and gets the leader's result"""
+    group = SingleFlight()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return "ok"
+
+    leader = threading.Thread(target=lambda: group.do("k", slow))
+    leader.start()
+    started.wait()
+    assert group.stats()["in_flight"] == {"k": 0}
+    assert group.do("k", lambda: "second") == "ok"
+    leader.join()
+    print("✓ Waiter received the leader's result")
+
+
+def test_errors_propagate_to_waiters():
+    """Every waiter sees the leader's exception"""
+    @single_flight
+    def failing(query):
+        time.sleep(0.2)
+        raise RuntimeError("upstream unavailable")
+
+    results = run_concurrently(lambda: failing("asthma"), 3)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    print("✓ Leader error propagated to all waiters")
+
+
+def test_metrics():
+    """Coalesced calls are counted"""
+    metrics = get_single_flight_metrics()
+    assert metrics["coalesced"] >= 4
+    assert metrics["in_flight"] == {}
+    print(f"✓ Metrics: {metrics}")
+
+
+def test_leader_changes_do_not_reach_waiters():
+    """The leader's caller may modify its result without affecting waiters"""
+    group = SingleFlight()
+    started = threading.Event()
+    waiter_result = []
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return {"data": [1, 2, 3]}
+
+    def waiter():
+        started.wait()
+        waiter_result.append(group.do("k", slow))
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    leader_result = group.do("k", slow)
+    leader_result["data"].clear()
+    leader_result["annotated"] = True
+    thread.join()
+    assert waiter_result == [{"data": [1, 2, 3]}]
+    print("✓ Leader's changes to its result do not reach waiters")
+
+
+if __name__ == "__main__":
+    print("Testing single-flight coalescing")
+    print("=" * 50)
+    test_identical_calls_share_one_execution()
+    test_waiter_receives_leader_result()
+    test_errors_propagate_to_waiters()
+    test_leader_changes_do_not_reach_waiters()
+    test_metrics()
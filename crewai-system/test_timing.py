@@ -0,0 +1,68 @@
+"""
+Test script for the request-scoped timing context (no network needed)
+"""
+import sys
+import threading
+import time
+
+# Add the current directory to the path
+sys.path.insert(0, '.')
+
+from telemetry.timing import start_request, end_request, span, timed, record, current_timer
+
+
+def test_spans_aggregate_into_server_timing():
+    """Repeated spans are summed and counted in the header"""
+    timer, token = start_request()
+    try:
+        @timed("clinicaltrials.detail")
+        def detail():
+            time.sleep(0.01)
+
+        for _ in range(3):
+            detail()
+        with span("clinicaltrials.search"):
+            time.sleep(0.02)
+    finally:
+        end_request(token)
+
+    header = timer.server_timing()
+    assert 'clinicaltrials.detail;dur=' in header and 'desc="3 calls"' in header
+    assert header.startswith("clinicaltrials.")
+    assert header.split(", ")[-1].startswith("total;dur=")
+    print(f"✓ Server-Timing: {header}")
+
+
+def test_no_timer_outside_requests():
+    """Spans outside a request are ignored"""
+    assert current_timer() is None
+    record("mongo.users", 1.0)
+    print("✓ Spans without a request are no-ops")
+
+
+def test_concurrent_requests_do_not_mix():
+    """Each thread reports into its own request's timer"""
+    timers = {}
+
+    def handle(name):
+        timer, token = start_request()
+        record(f"agent.{name}", 5.0)
+        end_request(token)
+        timers[name] = timer
+
+    threads = [threading.Thread(target=handle, args=(name,)) for name in ("trials", "patents")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [s["name"] for s in timers["trials"].spans()] == ["agent.trials"]
+    assert [s["name"] for s in timers["patents"].spans()] == ["agent.patents"]
+    print("✓ Concurrent requests keep separate timers")
+
+
+if __name__ == "__main__":
+    print("Testing request timing")
+    print("=" * 50)
+    test_spans_aggregate_into_server_timing()
+    test_no_timer_outside_requests()
+    test_concurrent_requests_do_not_mix()
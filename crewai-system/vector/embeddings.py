@@ -6,6 +6,7 @@ import pinecone
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import numpy as np
+from telemetry.timing import span
 
 # Load environment variables
 load_dotenv()
@@ -140,7 +141,8 @@ def search_similar_texts(query_text, top_k=5, index=None, model=None):
         
         # Search in Pinecone
         print(f"Searching for similar texts to: {query_text}")
-        results = index.query(vector=query_embedding, top_k=top_k, include_metadata=True)
+        with span("pinecone.query"):
+            results = index.query(vector=query_embedding, top_k=top_k, include_metadata=True)
         
         # Format results
         similar_docs = []
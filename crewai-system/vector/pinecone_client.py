@@ -4,6 +4,7 @@ Pinecone client for vector operations
 import os
 import pinecone
 from dotenv import load_dotenv
+from telemetry.timing import span
 
 # Load environment variables
 load_dotenv()
@@ -63,11 +64,12 @@ class PineconeClient:
         """
         try:
             print(f"Querying Pinecone with vector of dimension {len(vector)}")
-            response = self.index.query(
-                vector=vector,
-                top_k=top_k,
-                include_metadata=include_metadata
-            )
+            with span("pinecone.query"):
+                response = self.index.query(
+                    vector=vector,
+                    top_k=top_k,
+                    include_metadata=include_metadata
+                )
             return response
         except Exception as e:
             print(f"Error querying vectors: {str(e)}")
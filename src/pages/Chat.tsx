@@ -30,6 +30,9 @@ export default function Chat() {
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const { toast } = useToast();
   const API = (import.meta.env && import.meta.env.VITE_API_URL) || 'http://localhost:4000';
+  // Report jobs are polled once a second for at most 3 minutes
+  const REPORT_POLL_INTERVAL_MS = 1000;
+  const REPORT_POLL_MAX_ATTEMPTS = 180;
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -55,71 +58,79 @@ export default function Chat() {
     const currentInput = input;
 
     try {
-      // Define endpoints with their specific parameters
-      const endpoints = [
-        { 
-          name: 'exim', 
-          params: (query: string) => `hs_code=3004&top_n=10` // Default HS code for pharmaceutical products
-        },
-        { 
-          name: 'trials', 
-          params: (query: string) => `condition=${encodeURIComponent(query)}&top_n=10`
-        },
-        { 
-          name: 'patents', 
-          params: (query: string) => `query=${encodeURIComponent(query)}&top_n=10`
-        },
-        { 
-          name: 'web-intel', 
-          params: (query: string) => `query=${encodeURIComponent(query)}&num_results=5`
-        },
-        { 
-          name: 'internal-docs', 
-          params: (query: string) => `query=${encodeURIComponent(query)}&top_n=5`
-        },
-        { 
-          name: 'iqvia', 
-          params: (query: string) => `therapy_area=${encodeURIComponent(query)}` // Or empty for general market
-        }
-      ];
-      
-      const promises = endpoints.map(endpoint =>
-        fetch(`${API}/api/${endpoint.name}?${endpoint.params(currentInput)}`)
-          .then(res => {
-            if (!res.ok) {
-              return res.json().then(err => { throw new Error(err.error || `API Error on ${endpoint.name}`) });
-            }
-            return res.json();
-          })
-      );
-      
-      const responses = await Promise.allSettled(promises);
+      // One round-trip: the server fans out to every agent in parallel and
+      // streams each section back (NDJSON) as soon as it is ready
+      const res = await fetch(`${API}/api/search/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'application/x-ndjson' },
+        body: JSON.stringify({ query: currentInput })
+      });
+      if (!res.ok || !res.body) {
+        const err = await res.json().catch(() => ({}));
+        throw new Error(err.error || 'API Error on search');
+      }
+
+      const aiMessageId = (Date.now() + 1).toString();
       const newResults = {};
       let hasResults = false;
 
-      responses.forEach((result, i) => {
-        const endpointName = endpoints[i].name;
-        // Format endpoint name for display
-        const key = endpointName
+      const applyEvent = (event) => {
+        if (event.event === 'summary') {
+          console.debug('Search timings (ms):', event.timings_ms);
+          return;
+        }
+        // Format section name for display
+        const key = event.section
           .replace(/-/g, ' ')
           .replace(/\b\w/g, l => l.toUpperCase());
-          
-        if (result.status === 'fulfilled' && result.value) {
-          newResults[key] = result.value;
+
+        if (event.status === 'ok') {
+          newResults[key] = event.data;
           hasResults = true;
-        } else if (result.status === 'rejected') {
+        } else if (event.status === 'timeout') {
+          newResults[key] = { error: 'Timed out' };
+        } else {
           newResults[key] = { error: 'Failed to fetch data' };
-          console.error(`Failed to fetch from ${endpointName}:`, result.reason);
+          console.error(`Failed to fetch from ${event.section}:`, event.error);
         }
-      });
+        if (!hasResults) return;
 
-      const aiMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        role: "assistant",
-        content: hasResults ? newResults : "No relevant data found for your query.",
-        timestamp: new Date(),
+        // Render partial results immediately, updating the same message as sections arrive
+        const aiMessage: Message = {
+          id: aiMessageId,
+          role: "assistant",
+          content: { ...newResults },
+          timestamp: new Date(),
+        };
+        setMessages((prev) =>
+          prev.some((m) => m.id === aiMessageId)
+            ? prev.map((m) => (m.id === aiMessageId ? aiMessage : m))
+            : [...prev, aiMessage]
+        );
       };
-      setMessages((prev) => [...prev, aiMessage]);
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+        lines.filter((line) => line.trim()).forEach((line) => applyEvent(JSON.parse(line)));
+      }
+      if (buffer.trim()) applyEvent(JSON.parse(buffer));
+
+      if (!hasResults) {
+        const aiMessage: Message = {
+          id: aiMessageId,
+          role: "assistant",
+          content: "No relevant data found for your query.",
+          timestamp: new Date(),
+        };
+        setMessages((prev) => [...prev, aiMessage]);
+      }
 
     } catch (error) {
       console.error("Error fetching search results:", error);
@@ -144,9 +155,13 @@ export default function Chat() {
 
     setIsLoading(true);
     try {
+      const token = localStorage.getItem('token');
       const res = await fetch(`${API}/api/generate-report`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
+        },
         body: JSON.stringify({ 
           query: input, 
           results: lastMessage.content,
@@ -159,8 +174,25 @@ export default function Chat() {
         throw new Error(errorData.error || 'Failed to generate report');
       }
 
+      // Reports are generated in the background; poll the job until it finishes
+      const job = await res.json();
+      let data: any = null;
+      for (let attempt = 0; !data; attempt++) {
+        if (attempt >= REPORT_POLL_MAX_ATTEMPTS) {
+          throw new Error('Report generation timed out, please try again');
+        }
+        await new Promise((resolve) => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+        const statusRes = await fetch(`${API}${job.status_url}`);
+        const status = await statusRes.json();
+        if (!statusRes.ok || status.status === 'failed') {
+          throw new Error(status.error || 'Failed to generate report');
+        }
+        if (status.status === 'completed') {
+          data = status.result;
+        }
+      }
+
       if (reportType === 'text') {
-        const data = await res.json();
         // Create a new message with the text report
         const reportMessage: Message = {
           id: (Date.now() + 2).toString(),
@@ -171,7 +203,6 @@ export default function Chat() {
         setMessages((prev) => [...prev, reportMessage]);
       } else {
         // Handle PDF and Excel downloads
-        const data = await res.json();
         if (data.download_url) {
           // Trigger download by navigating to the download URL
           window.open(`${API}${data.download_url}`, '_blank');
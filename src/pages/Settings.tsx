@@ -107,6 +107,7 @@ export default function Settings() {
                     const data = await res.json();
                     if (!res.ok) throw new Error(data.msg || 'Failed to update');
                     localStorage.setItem('user', JSON.stringify(data.user));
+                    if (data.token) localStorage.setItem('token', data.token);
                     toast({ title: 'Profile Saved', description: 'Your profile has been updated' });
                   } catch (err: any) {
                     toast({ title: 'Update Failed', description: err.message || 'Could not update profile' });